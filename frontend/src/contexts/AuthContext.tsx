@@ -7,7 +7,12 @@ import React, {
   useEffect,
   ReactNode,
 } from "react";
-import { loginUser, signupUser } from "@/lib/api/services/userServices";
+import {
+  loginUser,
+  logoutUser,
+  refreshToken,
+  signupUser,
+} from "@/lib/api/services/userServices";
 import { useRouter } from "next/navigation";
 
 interface User {
@@ -23,8 +28,13 @@ interface User {
 interface TokenData {
   token: string;
   expiresAt: number;
+  refreshToken?: string;
+  refreshExpiresAt?: number;
 }
 
+// Renew the access token this long before it expires
+const REFRESH_MARGIN_MS = 30000;
+
 interface AuthContextType {
   user: User | null;
   isAuthenticated: boolean;
@@ -65,8 +75,13 @@ export const AuthProvider = ({ children }: AuthProviderProps) => {
   const router = useRouter();
 
   // Token management functions
-  const saveToken = (token: string, expiresAt: number) => {
-    const tokenData: TokenData = { token, expiresAt };
+  const saveToken = (
+    token: string,
+    expiresAt: number,
+    refreshToken?: string,
+    refreshExpiresAt?: number
+  ) => {
+    const tokenData: TokenData = { token, expiresAt, refreshToken, refreshExpiresAt };
     const tokenDataString = JSON.stringify(tokenData);
     localStorage.setItem("tokenData", tokenDataString);
     setToken(token);
@@ -94,8 +109,10 @@ export const AuthProvider = ({ children }: AuthProviderProps) => {
 
       if (isExpired) {
         console.log("AuthContext: Token expired");
-        localStorage.removeItem("tokenData");
-        localStorage.removeItem("user");
+        if (!tokenData.refreshToken || now >= (tokenData.refreshExpiresAt ?? 0)) {
+          localStorage.removeItem("tokenData");
+          localStorage.removeItem("user");
+        }
         return null;
       }
       console.log("AuthContext: Token retrieved successfully");
@@ -107,6 +124,32 @@ export const AuthProvider = ({ children }: AuthProviderProps) => {
     }
   };
 
+  const getRefreshToken = (): string | null => {
+    const tokenDataStr = localStorage.getItem("tokenData");
+    if (!tokenDataStr) return null;
+    try {
+      const tokenData: TokenData = JSON.parse(tokenDataStr);
+      if (!tokenData.refreshToken || Date.now() >= (tokenData.refreshExpiresAt ?? 0)) {
+        return null;
+      }
+      return tokenData.refreshToken;
+    } catch {
+      return null;
+    }
+  };
+
+  const applyTokenResponse = (data: {
+    user: User;
+    token: string;
+    expires_at: number;
+    refresh_token: string;
+    refresh_expires_at: number;
+  }) => {
+    setUser(data.user);
+    localStorage.setItem("user", JSON.stringify(data.user));
+    saveToken(data.token, data.expires_at, data.refresh_token, data.refresh_expires_at);
+  };
+
   const clearToken = () => {
     localStorage.removeItem("tokenData");
     localStorage.removeItem("user");
@@ -115,39 +158,99 @@ export const AuthProvider = ({ children }: AuthProviderProps) => {
     router.push("/auth/login");
   };
 
-  useEffect(() => {
-    // Check if user is logged in on app start
-    console.log("AuthContext: Initializing on app start");
-    const currentToken = getToken();
+  // Take over what another tab stored, if its access token is still good for a while
+  const adoptStoredToken = (): boolean => {
+    const tokenDataStr = localStorage.getItem("tokenData");
     const userData = localStorage.getItem("user");
-    if (currentToken && userData) {
+    if (!tokenDataStr || !userData) return false;
+    try {
+      const tokenData: TokenData = JSON.parse(tokenDataStr);
+      if (tokenData.expiresAt - Date.now() <= REFRESH_MARGIN_MS) return false;
+      setUser(JSON.parse(userData));
+      setToken(tokenData.token);
+      return true;
+    } catch {
+      return false;
+    }
+  };
+
+  // Exchange the refresh token for a new access token; no password needed
+  const renewToken = async (): Promise<boolean> => {
+    const renew = async (): Promise<boolean> => {
+      // Another tab may have renewed while this one waited for the lock
+      if (adoptStoredToken()) {
+        console.log("AuthContext: Using the token another tab refreshed");
+        return true;
+      }
+      const currentRefreshToken = getRefreshToken();
+      if (!currentRefreshToken) return false;
       try {
-        const parsedUser = JSON.parse(userData);
-        setUser(parsedUser);
-        setToken(currentToken);
-        console.log("AuthContext: User restored from localStorage");
+        const response = await refreshToken({ refresh_token: currentRefreshToken });
+        applyTokenResponse(response.data);
+        console.log("AuthContext: Token refreshed");
+        return true;
       } catch (error) {
-        console.error("AuthContext: Error parsing user data:", error);
-        clearToken();
+        console.error("AuthContext: Token refresh failed:", error);
+        return false;
       }
-    } else {
-      console.log("AuthContext: No valid token or user data found");
+    };
+    // Every tab shares one refresh token, and presenting it a second time counts as reuse,
+    // which revokes the whole login: only one tab at a time may refresh
+    if (typeof navigator !== "undefined" && navigator.locks) {
+      return navigator.locks.request("auth-token-refresh", renew);
     }
-    setIsLoading(false);
-  }, []);
+    return renew();
+  };
 
-  // Check token expiration every minute
   useEffect(() => {
-    const interval = setInterval(() => {
+    // Check if user is logged in on app start
+    console.log("AuthContext: Initializing on app start");
+    const restore = async () => {
       const currentToken = getToken();
-      if (!currentToken && user) {
-        // Token expired but user state still exists, clear everything
+      const userData = localStorage.getItem("user");
+      if (currentToken && userData) {
+        try {
+          const parsedUser = JSON.parse(userData);
+          setUser(parsedUser);
+          setToken(currentToken);
+          console.log("AuthContext: User restored from localStorage");
+        } catch (error) {
+          console.error("AuthContext: Error parsing user data:", error);
+          clearToken();
+        }
+      } else if (!(await renewToken())) {
+        console.log("AuthContext: No valid token or user data found");
+      }
+      setIsLoading(false);
+    };
+    restore();
+  }, []);
+
+  // Pick up a token another tab refreshed, so this tab's renewal timer moves along with it
+  useEffect(() => {
+    const onStorage = (event: StorageEvent) => {
+      if (event.key === "tokenData" && event.newValue) {
+        adoptStoredToken();
+      }
+    };
+    window.addEventListener("storage", onStorage);
+    return () => window.removeEventListener("storage", onStorage);
+  }, []);
+
+  // Renew the access token shortly before it expires; log out if that fails
+  useEffect(() => {
+    if (!token) return;
+    const tokenDataStr = localStorage.getItem("tokenData");
+    const expiresAt = tokenDataStr ? JSON.parse(tokenDataStr).expiresAt : 0;
+    const delay = Math.max(expiresAt - Date.now() - REFRESH_MARGIN_MS, 0);
+    const timeout = setTimeout(async () => {
+      if (!(await renewToken()) && user) {
         clearToken();
       }
-    }, 60000); // Check every minute
+    }, delay);
 
-    return () => clearInterval(interval);
-  }, [user]);
+    return () => clearTimeout(timeout);
+  }, [token, user]);
 
   const redirectToDashboard = (role: "admin" | "tenant" | "user") => {
     if (role === "admin") {
@@ -171,11 +274,8 @@ export const AuthProvider = ({ children }: AuthProviderProps) => {
           expires_at,
         });
 
-        setUser(userData);
-        localStorage.setItem("user", JSON.stringify(userData));
-
-        // Save token with expiration (expires_at is already in milliseconds)
-        saveToken(token, expires_at);
+        // Save tokens with expiration (expires_at is already in milliseconds)
+        applyTokenResponse(response.data);
         redirectToDashboard(userData.role);
       }
     } catch (error) {
@@ -215,6 +315,12 @@ export const AuthProvider = ({ children }: AuthProviderProps) => {
   };
 
   const logout = () => {
+    const currentRefreshToken = getRefreshToken();
+    if (currentRefreshToken) {
+      logoutUser({ refresh_token: currentRefreshToken }).catch((error) =>
+        console.error("AuthContext: Logout error:", error)
+      );
+    }
     clearToken();
   };
 
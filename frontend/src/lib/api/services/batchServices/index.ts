@@ -0,0 +1,18 @@
+import axoisInstance from "../../axois";
+
+export interface BatchSubRequest {
+  id?: string;
+  method?: "GET" | "POST" | "PUT" | "PATCH" | "DELETE";
+  path: string;
+  body?: unknown;
+}
+
+export interface BatchSubResponse<T = unknown> {
+  id: string | null;
+  status: number;
+  body: T;
+}
+
+// Send several API requests in one round trip; responses come back in the same order
+export const batchRequests = (requests: BatchSubRequest[]) =>
+  axoisInstance.post<{ responses: BatchSubResponse[] }>("/api/v1/batch", { requests });
@@ -0,0 +1,24 @@
+import axoisInstance from "../../axois";
+
+export type ChangeEventType =
+  | "file.created"
+  | "file.deleted"
+  | "user.created"
+  | "user.role_changed"
+  | "user.deleted";
+
+// Subscribe to change events for the current user. `onReady` fires on every (re)connect:
+// refetch lists there, then apply each change as a delta.
+export const subscribeToChanges = (
+  token: string,
+  onChange: (type: ChangeEventType, data: any) => void,
+  onReady?: () => void
+) => {
+  const query = new URLSearchParams({ access_token: token });
+  const source = new EventSource(`${axoisInstance.defaults.baseURL ?? ""}/api/v1/events/stream?${query}`);
+  source.addEventListener("ready", () => onReady?.());
+  (["file.created", "file.deleted", "user.created", "user.role_changed", "user.deleted"] as ChangeEventType[]).forEach(
+    (type) => source.addEventListener(type, (event) => onChange(type, JSON.parse((event as MessageEvent).data)))
+  );
+  return source;
+};
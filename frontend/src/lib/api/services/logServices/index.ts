@@ -0,0 +1,34 @@
+import axoisInstance from "../../axois";
+
+export interface AuditEvent {
+  id: number;
+  created_at: string;
+  level: "INFO" | "WARNING" | "ERROR";
+  source: string;
+  action: string;
+  message: string;
+  user_id: number | null;
+  details: Record<string, unknown> | null;
+}
+
+export interface AuditEventListResponse {
+  events: AuditEvent[];
+  next_cursor: string | null;
+}
+
+// Get audit events, newest first
+export const getLogs = (params: {
+  level?: "INFO" | "WARNING" | "ERROR";
+  source?: string;
+  user_id?: number;
+  start?: string;
+  end?: string;
+  cursor?: string;
+  limit?: number;
+} = {}) => axoisInstance.get<AuditEventListResponse>("/api/v1/logs/", { params });
+
+// Live tail; EventSource can't send headers, so the token goes in the query string
+export const streamLogs = (token: string, params: { level?: string; source?: string } = {}) => {
+  const query = new URLSearchParams({ access_token: token, ...params });
+  return new EventSource(`${axoisInstance.defaults.baseURL ?? ""}/api/v1/logs/stream?${query}`);
+};
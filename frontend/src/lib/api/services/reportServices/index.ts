@@ -0,0 +1,16 @@
+import axoisInstance from "../../axois";
+import { FileResponse } from "../fileServices";
+
+export interface ReportRenderResponse {
+  message: string;
+  cached: boolean;
+  file: FileResponse;
+}
+
+// Render a medical report to PDF on the server; the PDF is saved to the user's files
+export const renderReport = (report: object) =>
+  axoisInstance.post<ReportRenderResponse>("/api/v1/reports/render", report);
+
+// Render many reports at once; resolves to a ZIP archive of PDFs
+export const renderReportBatch = (reports: object[]) =>
+  axoisInstance.post<Blob>("/api/v1/reports/render/batch", { reports }, { responseType: "blob" });
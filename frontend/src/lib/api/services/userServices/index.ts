@@ -6,7 +6,11 @@ export const loginUser = (data: { email: string; password: string }) => {
 };
 
 export const refreshToken = (data: { refresh_token: string }) => {
-  return axoisInstance.post("/auth/refresh", data);
+  return axoisInstance.post("/api/v1/users/refresh", data);
+};
+
+export const logoutUser = (data: { refresh_token: string }) => {
+  return axoisInstance.post("/api/v1/users/logout", data);
 };
 
 export const forgetPassword = (data: { email: string | null }) => {
@@ -26,5 +30,11 @@ export const signupUser = (data: { name: string; email: string; password: string
 };
 
 export const getAllUsers = () => axoisInstance.get("/api/v1/users/");
+export const searchUsers = (params: {
+  q: string;
+  role?: 'admin' | 'tenant' | 'user';
+  is_active?: boolean;
+  limit?: number;
+}) => axoisInstance.get("/api/v1/users/search", { params });
 export const deleteUser = (id: string) =>
   axoisInstance.delete(`/api/v1/users/${id}`);
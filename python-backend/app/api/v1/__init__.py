@@ -1,6 +1,12 @@
 from fastapi import APIRouter
-from app.api.v1.routes import user, file
+from app.api.v1.routes import user, file, analytics, logs, report, batch, events, admission
 
 api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(user.router, prefix="/users", tags=["Users"])
 api_router.include_router(file.router, prefix="/files", tags=["Files"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+api_router.include_router(logs.router, prefix="/logs", tags=["Logs"])
+api_router.include_router(report.router, prefix="/reports", tags=["Reports"])
+api_router.include_router(batch.router, prefix="/batch", tags=["Batch"])
+api_router.include_router(events.router, prefix="/events", tags=["Events"])
+api_router.include_router(admission.router, prefix="/admission", tags=["Admission"])
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from typing import Dict
+from app.core.admission import admission
+from app.models.user import User
+from app.services.user_service import require_admin
+
+router = APIRouter()
+
+@router.get("/stats")
+def get_admission_stats(admin: User = Depends(require_admin)) -> Dict[str, dict]:
+    """Per route class: limits, requests in flight and queued, and shed counts (this worker only)"""
+    return admission.stats()
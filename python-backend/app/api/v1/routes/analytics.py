@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from datetime import date, datetime, timedelta
+from app.core.database import get_db
+from app.models.file import FileType
+from app.models.user import User, UserRole
+from app.services.user_service import require_admin
+from app.services.analytics_service import (
+    get_upload_stats, get_signup_stats, get_activity_stats, get_top_storage_users
+)
+from app.schemas.analytics import (
+    UploadAnalyticsResponse, SignupAnalyticsResponse, ActiveUserAnalyticsResponse,
+    StorageAnalyticsResponse, UserStorage
+)
+
+router = APIRouter()
+
+MAX_RANGE_DAYS = 366
+
+def _date_range(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    """Default to the last 30 days and reject inverted or oversized ranges"""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range is limited to {MAX_RANGE_DAYS} days"
+        )
+    return start, end
+
+@router.get("/uploads", response_model=UploadAnalyticsResponse)
+def upload_analytics(
+    start: Optional[date] = Query(None, description="First day (default: 30 days ago)"),
+    end: Optional[date] = Query(None, description="Last day (default: today)"),
+    file_type: Optional[FileType] = None,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Uploads and uploaded bytes per day and file type"""
+    start, end = _date_range(start, end)
+    return UploadAnalyticsResponse(start=start, end=end, days=get_upload_stats(db, start, end, file_type))
+
+@router.get("/signups", response_model=SignupAnalyticsResponse)
+def signup_analytics(
+    start: Optional[date] = Query(None, description="First day (default: 30 days ago)"),
+    end: Optional[date] = Query(None, description="Last day (default: today)"),
+    role: Optional[UserRole] = None,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """New users per day and role"""
+    start, end = _date_range(start, end)
+    return SignupAnalyticsResponse(start=start, end=end, days=get_signup_stats(db, start, end, role))
+
+@router.get("/active-users", response_model=ActiveUserAnalyticsResponse)
+def active_user_analytics(
+    start: Optional[date] = Query(None, description="First day (default: 30 days ago)"),
+    end: Optional[date] = Query(None, description="Last day (default: today)"),
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Distinct authenticated users per day"""
+    start, end = _date_range(start, end)
+    return ActiveUserAnalyticsResponse(start=start, end=end, days=get_activity_stats(db, start, end))
+
+@router.get("/storage", response_model=StorageAnalyticsResponse)
+def storage_analytics(
+    limit: int = Query(10, ge=1, le=100, description="Number of users to return"),
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Users storing the most bytes"""
+    rows = get_top_storage_users(db, limit)
+    return StorageAnalyticsResponse(users=[
+        UserStorage(user_id=user_id, file_count=file_count, total_bytes=total_bytes)
+        for user_id, file_count, total_bytes in rows
+    ])
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from fastapi.middleware.asyncexitstack import AsyncExitStackMiddleware
+from starlette.middleware.exceptions import ExceptionMiddleware
+from app.core.admission import AdmissionControlMiddleware
+from app.core.config import BATCH_MAX_REQUESTS, BATCH_CONCURRENCY, BATCH_SUBREQUEST_TIMEOUT_SECONDS
+from app.core.database import SessionLocal, batch_session, get_db
+from app.models.user import User
+from app.services.user_service import batch_user, get_current_user
+from app.schemas.batch import BatchRequest, BatchSubRequest, BatchSubResponse, BatchResponse
+
+router = APIRouter()
+
+API_PREFIX = "/api/v1"
+READ_METHODS = {"GET"}
+
+async def _dispatch(request: Request, app, sub: BatchSubRequest) -> BatchSubResponse:
+    """Run one sub-request through the routers in-process and capture its response."""
+    path, _, query_string = sub.path.partition("?")
+    if not path.startswith("/"):
+        return BatchSubResponse(id=sub.id, status=400, body={"detail": "Path must start with /"})
+    if not path.startswith(API_PREFIX + "/"):
+        path = API_PREFIX + path
+    if path.rstrip("/") == API_PREFIX + "/batch":
+        return BatchSubResponse(id=sub.id, status=400, body={"detail": "Batches can't be nested"})
+
+    body = json.dumps(sub.body).encode() if sub.body is not None else b""
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    authorization = request.headers.get("authorization")
+    if authorization:
+        headers.append((b"authorization", authorization.encode()))
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": "1.1",
+        "method": sub.method,
+        "scheme": request.url.scheme,
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": request.scope.get("root_path", ""),
+        "query_string": query_string.encode(),
+        "headers": headers,
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+        "app": request.app,
+    }
+
+    status_code = 500
+    response_headers = {}
+    chunks: List[bytes] = []
+    done = asyncio.Event()
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code, response_headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers = {key.decode().lower(): value.decode() for key, value in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    try:
+        await asyncio.wait_for(app(scope, receive, send), BATCH_SUBREQUEST_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return BatchSubResponse(id=sub.id, status=504, body={"detail": "Sub-request timed out"})
+    except Exception as e:
+        print(f"📦 batch: {sub.method} {path} failed: {e}")
+        return BatchSubResponse(id=sub.id, status=500, body={"detail": "Internal Server Error"})
+    finally:
+        done.set()
+
+    content = b"".join(chunks)
+    if not content:
+        response_body = None
+    elif "application/json" in response_headers.get("content-type", ""):
+        response_body = json.loads(content)
+    else:
+        response_body = content.decode("utf-8", errors="replace")
+    return BatchSubResponse(id=sub.id, status=status_code, body=response_body)
+
+@router.post("", response_model=BatchResponse)
+async def batch(
+    batch_request: BatchRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Run several API requests in one round trip.
+
+    The caller is authenticated once and every sub-request runs as that user. Consecutive
+    GETs run concurrently; any other method waits for the requests before it and runs on
+    its own, so writes keep their order. Responses come back in request order.
+    """
+    if len(batch_request.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many requests; at most {BATCH_MAX_REQUESTS} per batch"
+        )
+    print(f"📦 batch: User ID: {current_user.id}, Requests: {len(batch_request.requests)}")
+
+    # Sub-requests reuse the already-authenticated user; detach it so it can be read from any session's thread
+    db.expunge(current_user)
+
+    # A Session can't be used concurrently, so the batch holds a few and lends one to each running sub-request
+    sessions: asyncio.Queue = asyncio.Queue()
+    sessions.put_nowait(db)
+    extra_sessions: List[Session] = []
+    for _ in range(min(BATCH_CONCURRENCY, len(batch_request.requests)) - 1):
+        extra = SessionLocal()
+        extra_sessions.append(extra)
+        sessions.put_nowait(extra)
+
+    # Wrap the routers the way FastAPI does (exception handlers, exit stack for yield
+    # dependencies) but skip the outer middleware, which already ran for the batch itself.
+    # Admission control is the exception: the batch wasn't admitted as a whole, so every
+    # sub-request takes a slot in its own class (an upload waits for, or is shed by, the upload gate)
+    app = AdmissionControlMiddleware(ExceptionMiddleware(
+        AsyncExitStackMiddleware(request.app.router), handlers=request.app.exception_handlers
+    ))
+
+    async def run(sub: BatchSubRequest) -> BatchSubResponse:
+        session = await sessions.get()
+        try:
+            batch_session.set(session)
+            batch_user.set(current_user)
+            return await _dispatch(request, app, sub)
+        finally:
+            session.rollback()  # End the sub-request's transaction before the session is reused
+            sessions.put_nowait(session)
+
+    responses: List[BatchSubResponse] = []
+    reads = []
+    try:
+        for sub in batch_request.requests:
+            if sub.method in READ_METHODS:
+                reads.append(asyncio.create_task(run(sub)))
+                continue
+            if reads:
+                responses.extend(await asyncio.gather(*reads))
+                reads = []
+            responses.append(await asyncio.create_task(run(sub)))
+        if reads:
+            responses.extend(await asyncio.gather(*reads))
+    finally:
+        for extra in extra_sessions:
+            extra.close()
+
+    return BatchResponse(responses=responses)
@@ -0,0 +1,44 @@
+import asyncio
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.sse import HEARTBEAT_SECONDS, SSE_HEADERS, format_sse, heartbeat
+from app.models.user import User, UserRole
+from app.services.user_service import get_current_user_for_stream
+from app.services.change_events import change_bus
+
+router = APIRouter()
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    current_user: User = Depends(get_current_user_for_stream),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-Sent Events stream of changes relevant to the current user: their own files
+    (file.created, file.deleted) and their own account, plus every user.* change for admins.
+    A `ready` event is sent first; refetch lists after it so nothing between the last
+    fetch and the subscription is missed, then apply the events as deltas.
+    """
+    user_id = current_user.id
+    is_admin = current_user.role == UserRole.admin
+    # Give the connection back now; the stream itself never queries the database
+    db.close()
+
+    async def events():
+        queue = change_bus.subscribe(user_id, is_admin)
+        try:
+            yield format_sse({"user_id": user_id}, event="ready")
+            while not await request.is_disconnected():
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield heartbeat()
+                    continue
+                yield format_sse(change["data"], event=change["type"])
+        finally:
+            change_bus.unsubscribe(user_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
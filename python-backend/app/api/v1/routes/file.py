@@ -1,15 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File as FastAPIFile
-from fastapi.responses import FileResponse as FastAPIFileResponse
+import mimetypes
+from urllib.parse import quote
+from fastapi import (
+    APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, UploadFile, File as FastAPIFile
+)
+from fastapi.responses import FileResponse as FastAPIFileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.core.database import get_db
+from app.core.etag import not_modified, weak_etag
+from app.core.replicas import get_read_db
 from app.services.file_service import FileService
+from app.services.collection_versions import get_version, user_files
 from app.services.user_service import get_current_user
 from app.models.user import User
-from app.schemas.file import FileResponse, FileUploadResponse, FileListResponse
+from app.services.usage_service import QuotaExceededError, get_usage
+from app.services.audit_log import audit_log, INFO, WARNING
+from app.services.archive_service import (
+    UnsupportedArchiveError, index_archive_job, get_archive_entries, get_archive_entry, stream_archive_entry
+)
+from app.core.config import (
+    UPLOAD_BATCH_MAX_FILES, USER_STORAGE_QUOTA_BYTES, RATE_LIMIT_UPLOAD_PER_USER, RATE_LIMIT_UPLOAD_PER_IP
+)
+from app.services.rate_limit import limit_per_user
+from app.models.file import File, FileType
+from app.schemas.file import (
+    FileResponse, FileUploadResponse, FileListResponse, FileSearchResponse, BatchUploadItem, BatchUploadResponse,
+    FileTypeUsage, StorageUsageResponse, ArchiveEntryResponse, ArchiveEntryListResponse
+)
 
 router = APIRouter()
 
+# Shared by single and batch uploads
+upload_rate_limit = limit_per_user("upload", RATE_LIMIT_UPLOAD_PER_USER, RATE_LIMIT_UPLOAD_PER_IP)
+
+def build_file_response(file: File) -> FileResponse:
+    """Build the API representation of a stored file."""
+    return FileResponse(
+        id=file.id,
+        filename=file.filename,
+        original_filename=file.original_filename,
+        file_type=file.file_type,
+        file_extension=file.file_extension,
+        file_size=file.file_size,
+        file_path=file.file_path,
+        mime_type=file.mime_type,
+        user_id=file.user_id,
+        created_at=file.created_at,
+        updated_at=file.updated_at,
+        url=f"/api/v1/files/{file.id}/download"
+    )
+
 @router.get("/test-auth")
 async def test_file_auth(current_user: User = Depends(get_current_user)):
     """Test authentication for file endpoints"""
@@ -21,8 +61,9 @@ async def test_file_auth(current_user: User = Depends(get_current_user)):
         "user_role": current_user.role
     }
 
-@router.post("/upload", response_model=FileUploadResponse)
+@router.post("/upload", response_model=FileUploadResponse, dependencies=[Depends(upload_rate_limit)])
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = FastAPIFile(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -35,107 +76,185 @@ async def upload_file(
     print(f"📁 upload_file: File: {file.filename}, Type: {file.content_type}, Size: {file.size}")
     print(f"📁 upload_file: User email: {current_user.email}, Role: {current_user.role}")
     
-    file_service = FileService(db)
+    file_service = FileService(db, current_user.tenant_id)
     
     try:
         uploaded_file = await file_service.upload_file(file, current_user.id)
         print(f"📁 upload_file: File uploaded successfully, ID: {uploaded_file.id}")
         
-        # Create FileResponse with URL
-        file_response = FileResponse(
-            id=uploaded_file.id,
-            filename=uploaded_file.filename,
-            original_filename=uploaded_file.original_filename,
-            file_type=uploaded_file.file_type,
-            file_extension=uploaded_file.file_extension,
-            file_size=uploaded_file.file_size,
-            file_path=uploaded_file.file_path,
-            mime_type=uploaded_file.mime_type,
-            user_id=uploaded_file.user_id,
-            created_at=uploaded_file.created_at,
-            updated_at=uploaded_file.updated_at,
-            url=f"/api/v1/files/{uploaded_file.id}/download"
+        if uploaded_file.file_type == FileType.ARCHIVE:
+            background_tasks.add_task(index_archive_job, uploaded_file.id, uploaded_file.tenant_id)
+        audit_log.record(
+            INFO, "files", "upload",
+            f"File uploaded: {uploaded_file.original_filename}", user_id=current_user.id,
+            details={"file_id": uploaded_file.id, "file_size": uploaded_file.file_size}
         )
         
         return FileUploadResponse(
             message="File uploaded successfully",
-            file=file_response
+            file=build_file_response(uploaded_file)
+        )
+    except QuotaExceededError as e:
+        print(f"📁 upload_file: Quota exceeded for user {current_user.id}")
+        audit_log.record(
+            WARNING, "files", "quota_exceeded",
+            f"Upload rejected, storage quota exceeded: {file.filename}", user_id=current_user.id
         )
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print(f"📁 upload_file: Error: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@router.post("/upload/batch", response_model=BatchUploadResponse, dependencies=[Depends(upload_rate_limit)])
+async def upload_files_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = FastAPIFile(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload many files in a single multipart request (repeat the `files` field).
+    Each file is reported individually; a failed file does not fail the batch.
+    """
+    print(f"📁 upload_files_batch: User ID: {current_user.id}, Files: {len(files)}")
+    
+    if len(files) > UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files in one batch (max {UPLOAD_BATCH_MAX_FILES})"
+        )
+    
+    file_service = FileService(db, current_user.tenant_id)
+    results = await file_service.upload_files(files, current_user.id)
+    
+    items = [
+        BatchUploadItem(
+            original_filename=upload.filename,
+            success=uploaded_file is not None,
+            error=error,
+            file=build_file_response(uploaded_file) if uploaded_file is not None else None
+        )
+        for upload, uploaded_file, error in results
+    ]
+    uploaded = sum(1 for item in items if item.success)
+    
+    for _, uploaded_file, _ in results:
+        if uploaded_file is not None and uploaded_file.file_type == FileType.ARCHIVE:
+            background_tasks.add_task(index_archive_job, uploaded_file.id, uploaded_file.tenant_id)
+    print(f"📁 upload_files_batch: Uploaded {uploaded} of {len(items)} files")
+    audit_log.record(
+        INFO if uploaded == len(items) else WARNING, "files", "batch_upload",
+        f"Batch upload: {uploaded} of {len(items)} files stored", user_id=current_user.id,
+        details={"uploaded": uploaded, "failed": len(items) - uploaded}
+    )
+    
+    return BatchUploadResponse(
+        message="Batch upload completed",
+        uploaded=uploaded,
+        failed=len(items) - uploaded,
+        results=items
+    )
+
 @router.get("/", response_model=FileListResponse)
 async def get_user_files(
+    request: Request,
+    response: Response,
     file_type: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all files for the authenticated user, optionally filtered by file type.
     File types: image, document, video, audio, archive, other
+    Conditional: If-None-Match gets 304 while none of the user's files have changed.
     """
+    collection = user_files(current_user.id)
+    unchanged = not_modified(request, response, weak_etag(collection, get_version(db, collection)))
+    if unchanged is not None:
+        return unchanged
     print(f"📁 get_user_files: User ID: {current_user.id}, File type filter: {file_type}")
     print(f"📁 get_user_files: User email: {current_user.email}, Role: {current_user.role}")
     
-    file_service = FileService(db)
+    file_service = FileService(db, current_user.tenant_id)
     files = file_service.get_user_files(current_user.id, file_type)
     
     print(f"📁 get_user_files: Found {len(files)} files")
     
     # Convert File objects to FileResponse with URLs
-    file_responses = []
-    for file in files:
-        file_response = FileResponse(
-            id=file.id,
-            filename=file.filename,
-            original_filename=file.original_filename,
-            file_type=file.file_type,
-            file_extension=file.file_extension,
-            file_size=file.file_size,
-            file_path=file.file_path,
-            mime_type=file.mime_type,
-            user_id=file.user_id,
-            created_at=file.created_at,
-            updated_at=file.updated_at,
-            url=f"/api/v1/files/{file.id}/download"
-        )
-        file_responses.append(file_response)
+    file_responses = [build_file_response(file) for file in files]
     
     return FileListResponse(
         files=file_responses,
         total=len(file_responses)
     )
 
+@router.get("/search", response_model=FileSearchResponse)
+async def search_files(
+    q: str = Query(..., min_length=1, max_length=255, description="Text to look for in file names"),
+    file_type: Optional[FileType] = None,
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Search the authenticated user's files by name, best matches first.
+    """
+    file_service = FileService(db, current_user.tenant_id)
+    try:
+        files, next_cursor = file_service.search_files(current_user.id, q, file_type, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return FileSearchResponse(
+        files=[build_file_response(file) for file in files],
+        next_cursor=next_cursor
+    )
+
+@router.get("/usage", response_model=StorageUsageResponse)
+async def get_storage_usage(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get how much the authenticated user stores, in total and per file type.
+    Served from the usage counters, so the cost does not grow with the number of files.
+    """
+    rows = get_usage(db, current_user.id)
+    
+    return StorageUsageResponse(
+        user_id=current_user.id,
+        file_count=sum(row.file_count for row in rows),
+        total_bytes=sum(row.total_bytes for row in rows),
+        quota_bytes=USER_STORAGE_QUOTA_BYTES or None,
+        by_type=[
+            FileTypeUsage(file_type=row.file_type, file_count=row.file_count, total_bytes=row.total_bytes)
+            for row in rows
+        ]
+    )
+
 @router.get("/{file_id}", response_model=FileResponse)
 async def get_file_info(
     file_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get information about a specific file owned by the authenticated user.
+    Conditional: If-None-Match gets 304 while the file is unchanged.
     """
-    file_service = FileService(db)
+    file_service = FileService(db, current_user.tenant_id)
     file = file_service.get_file_by_id(file_id, current_user.id)
     
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
-        id=file.id,
-        filename=file.filename,
-        original_filename=file.original_filename,
-        file_type=file.file_type,
-        file_extension=file.file_extension,
-        file_size=file.file_size,
-        file_path=file.file_path,
-        mime_type=file.mime_type,
-        user_id=file.user_id,
-        created_at=file.created_at,
-        updated_at=file.updated_at,
-        url=f"/api/v1/files/{file.id}/download"
-    )
+    unchanged = not_modified(request, response, weak_etag(file.id, file.updated_at or file.created_at))
+    if unchanged is not None:
+        return unchanged
+    return build_file_response(file)
 
 @router.get("/{file_id}/download")
 async def download_file(
@@ -146,7 +265,7 @@ async def download_file(
     """
     Download a file owned by the authenticated user.
     """
-    file_service = FileService(db)
+    file_service = FileService(db, current_user.tenant_id)
     file_path = file_service.get_file_path(file_id, current_user.id)
     
     if not file_path:
@@ -160,6 +279,71 @@ async def download_file(
         media_type=file.mime_type
     )
 
+@router.get("/{file_id}/entries", response_model=ArchiveEntryListResponse)
+def get_archive_entries_endpoint(
+    file_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    List the members of an uploaded ZIP/TAR archive without downloading it.
+    """
+    file_service = FileService(db, current_user.tenant_id)
+    file = file_service.get_file_by_id(file_id, current_user.id)
+    
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+    if file.file_type != FileType.ARCHIVE:
+        raise HTTPException(status_code=400, detail="File is not an archive")
+    
+    try:
+        entries = get_archive_entries(db, file)
+    except UnsupportedArchiveError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return ArchiveEntryListResponse(
+        file_id=file.id,
+        entries=[
+            ArchiveEntryResponse(
+                id=entry.id,
+                name=entry.name,
+                size=entry.size,
+                compressed_size=entry.compressed_size,
+                is_dir=entry.is_dir,
+                url=None if entry.is_dir else f"/api/v1/files/{file.id}/entries/{entry.id}/download"
+            )
+            for entry in entries
+        ],
+        total=len(entries)
+    )
+
+@router.get("/{file_id}/entries/{entry_id}/download")
+async def download_archive_entry(
+    file_id: int,
+    entry_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download a single member of an archive, read directly from its offset.
+    """
+    file_service = FileService(db, current_user.tenant_id)
+    file = file_service.get_file_by_id(file_id, current_user.id)
+    entry = get_archive_entry(db, file_id, entry_id) if file else None
+    
+    if not entry or entry.is_dir:
+        raise HTTPException(status_code=404, detail="Archive entry not found")
+    
+    filename = entry.name.rstrip("/").rsplit("/", 1)[-1]
+    return StreamingResponse(
+        stream_archive_entry(file, entry),
+        media_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        headers={
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+            "Content-Length": str(entry.size)
+        }
+    )
+
 @router.delete("/{file_id}")
 async def delete_file(
     file_id: int,
@@ -169,44 +353,32 @@ async def delete_file(
     """
     Delete a file owned by the authenticated user.
     """
-    file_service = FileService(db)
+    file_service = FileService(db, current_user.tenant_id)
     success = file_service.delete_file(file_id, current_user.id)
     
     if not success:
         raise HTTPException(status_code=404, detail="File not found")
     
+    audit_log.record(
+        INFO, "files", "delete", f"File {file_id} deleted", user_id=current_user.id,
+        details={"file_id": file_id}
+    )
     return {"message": "File deleted successfully"}
 
 @router.get("/types/{file_type}", response_model=FileListResponse)
 async def get_files_by_type(
     file_type: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all files of a specific type for the authenticated user.
     """
-    file_service = FileService(db)
+    file_service = FileService(db, current_user.tenant_id)
     files = file_service.get_user_files(current_user.id, file_type)
     
     # Convert File objects to FileResponse with URLs
-    file_responses = []
-    for file in files:
-        file_response = FileResponse(
-            id=file.id,
-            filename=file.filename,
-            original_filename=file.original_filename,
-            file_type=file.file_type,
-            file_extension=file.file_extension,
-            file_size=file.file_size,
-            file_path=file.file_path,
-            mime_type=file.mime_type,
-            user_id=file.user_id,
-            created_at=file.created_at,
-            updated_at=file.updated_at,
-            url=f"/api/v1/files/{file.id}/download"
-        )
-        file_responses.append(file_response)
+    file_responses = [build_file_response(file) for file in files]
     
     return FileListResponse(
         files=file_responses,
@@ -0,0 +1,100 @@
+import asyncio
+import base64
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.core.sse import HEARTBEAT_SECONDS, SSE_HEADERS, format_sse, heartbeat
+from app.models.user import User, UserRole
+from app.services.user_service import require_admin, get_current_user_for_stream
+from app.services.audit_log import audit_log, query_events
+from app.schemas.audit import AuditEventResponse, AuditEventListResponse
+
+router = APIRouter()
+
+def _encode_cursor(created_at: datetime, event_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at.isoformat(), event_id]).encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(event_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+@router.get("/", response_model=AuditEventListResponse)
+def get_logs(
+    level: Optional[str] = Query(None, description="INFO, WARNING or ERROR"),
+    source: Optional[str] = Query(None, description="e.g. auth, files, user_management"),
+    action: Optional[str] = None,
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = Query(None, description="Only events at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only events before this time"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200, description="Number of records to return"),
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Get audit events, newest first"""
+    before = _decode_cursor(cursor) if cursor else None
+    events = query_events(
+        db, level=level.upper() if level else None, source=source, action=action,
+        user_id=user_id, start=start, end=end, before=before, limit=limit
+    )
+    next_cursor = _encode_cursor(events[-1].created_at, events[-1].id) if len(events) == limit else None
+    return AuditEventListResponse(
+        events=[AuditEventResponse.model_validate(event) for event in events],
+        next_cursor=next_cursor
+    )
+
+@router.get("/stream")
+async def stream_logs(
+    request: Request,
+    level: Optional[str] = Query(None, description="Only stream events of this level"),
+    source: Optional[str] = Query(None, description="Only stream events from this source"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user_for_stream),
+    db: Session = Depends(get_db)
+):
+    """
+    Live tail of audit events as Server-Sent Events, fed from memory.
+    Reconnecting clients get what they missed from the in-memory ring buffer via Last-Event-ID;
+    an id issued by another worker or before a restart replays the whole ring instead.
+    """
+    if current_user.role != UserRole.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    # Give the connection back now; the stream itself never queries the database
+    db.close()
+
+    level = level.upper() if level else None
+
+    def wanted(event: dict) -> bool:
+        return (level is None or event["level"] == level) and (source is None or event["source"] == source)
+
+    async def events():
+        queue = audit_log.subscribe()
+        last_seq = audit_log.resume_point(last_event_id)
+        try:
+            for event in audit_log.recent(last_seq):
+                last_seq = event["seq"]
+                if wanted(event):
+                    yield format_sse(event, event="audit", event_id=audit_log.event_id(event))
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield heartbeat()
+                    continue
+                # Events recorded while the backlog was being sent arrive twice
+                if event["seq"] <= last_seq:
+                    continue
+                last_seq = event["seq"]
+                if wanted(event):
+                    yield format_sse(event, event="audit", event_id=audit_log.event_id(event))
+        finally:
+            audit_log.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
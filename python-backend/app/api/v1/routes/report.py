@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.core.config import REPORT_BATCH_MAX, RATE_LIMIT_REPORT_PER_USER
+from app.core.database import get_db
+from app.core.process_pool import PoolSaturatedError
+from app.models.user import User
+from app.services.user_service import get_current_user
+from app.services.usage_service import QuotaExceededError
+from app.services.audit_log import audit_log, INFO
+from app.services.report_service import render_report, stream_report_batch
+from app.services.rate_limit import limit_per_user
+from app.schemas.report import MedicalReport, ReportBatchRequest, ReportRenderResponse
+from app.api.v1.routes.file import build_file_response
+
+router = APIRouter()
+
+report_rate_limit = limit_per_user("report", RATE_LIMIT_REPORT_PER_USER)
+
+@router.post("/render", response_model=ReportRenderResponse, dependencies=[Depends(report_rate_limit)])
+async def render_report_endpoint(
+    report: MedicalReport,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Render a medical report to PDF and store it as one of the user's files.
+    Rendering the same report again returns the stored file without re-rendering.
+    """
+    print(f"📄 render_report_endpoint: User ID: {current_user.id}, Patient: {report.patient_id}")
+    try:
+        stored, cached = await render_report(db, current_user, report.model_dump(mode="json"))
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    if not cached:
+        audit_log.record(
+            INFO, "reports", "render",
+            f"Report rendered: {stored.original_filename}", user_id=current_user.id,
+            details={"file_id": stored.id}
+        )
+    return ReportRenderResponse(
+        message="Report already rendered" if cached else "Report rendered successfully",
+        cached=cached,
+        file=build_file_response(stored)
+    )
+
+@router.post("/render/batch", dependencies=[Depends(report_rate_limit)])
+async def render_report_batch_endpoint(
+    request: ReportBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Render many reports in parallel and stream them back as a single ZIP archive.
+    Batch output is returned only; it is not stored as files.
+    """
+    if len(request.reports) > REPORT_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many reports; at most {REPORT_BATCH_MAX} per request"
+        )
+    print(f"📄 render_report_batch_endpoint: User ID: {current_user.id}, Reports: {len(request.reports)}")
+    audit_log.record(
+        INFO, "reports", "batch_render",
+        f"Batch render of {len(request.reports)} reports", user_id=current_user.id
+    )
+    reports = [report.model_dump(mode="json") for report in request.reports]
+    return StreamingResponse(
+        stream_report_batch(db, current_user.id, reports),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="medical-reports.zip"'}
+    )
@@ -1,49 +1,120 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from app.core.config import RATE_LIMIT_AUTH_PER_IP, RATE_LIMIT_REFRESH_PER_IP
 from app.core.database import get_db
+from app.core.etag import not_modified, weak_etag
+from app.core.replicas import get_read_db
+from app.core.process_pool import PoolSaturatedError
 from app.models.user import UserRole
-from app.schemas.user import UserCreate, UserResponse, UserLogin, TokenData
+from app.schemas.user import UserCreate, UserResponse, UserLogin, TokenData, RefreshRequest
 from app.services.user_service import (
     create_user, get_user_by_id, get_user_by_email, get_users, get_users_by_role,
-    update_user_role, authenticate_user, create_access_token, delete_user
+    search_users, update_user_role, authenticate_user, create_access_token, delete_user
 )
+from app.services.collection_versions import USERS, get_version
+from app.services.refresh_token_service import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+from app.services.rate_limit import limit_per_ip
+from app.services.analytics_service import mark_active
+from app.services.audit_log import audit_log, INFO, WARNING
 
 router = APIRouter()
 
-@router.post("/authenticate", response_model=TokenData)
+# Per IP: these run before anyone is authenticated
+auth_rate_limit = limit_per_ip("auth", RATE_LIMIT_AUTH_PER_IP)
+refresh_rate_limit = limit_per_ip("refresh", RATE_LIMIT_REFRESH_PER_IP)
+
+@router.post("/authenticate", response_model=TokenData, dependencies=[Depends(auth_rate_limit)])
 def authenticate_user_endpoint(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Authenticate user and return token"""
     print(f"🔐 authenticate_user_endpoint: Login attempt for email: {user_credentials.email}")
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    try:
+        user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     if not user:
         print(f"🔐 authenticate_user_endpoint: Authentication failed for email: {user_credentials.email}")
+        audit_log.record(
+            WARNING, "auth", "login_failed",
+            f"Failed login attempt for user {user_credentials.email}",
+            details={"email": user_credentials.email}
+        )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    # Create access token
+    mark_active(user.id)
+    audit_log.record(INFO, "auth", "login", f"User {user.email} logged in successfully", user_id=user.id)
+    
+    # Create access token, plus a refresh token so the client can renew it without the password
     token, expires_at = create_access_token(data={"sub": user.email})
+    refresh_token, refresh_expires_at = issue_refresh_token(db, user.id)
+    db.commit()
     print(f"🔐 authenticate_user_endpoint: Token created for user {user.email}, expires_at: {expires_at}")
     return TokenData(
         user=user,
         token=token,
-        expires_at=expires_at
+        expires_at=expires_at,
+        refresh_token=refresh_token,
+        refresh_expires_at=refresh_expires_at
+    )
+
+@router.post("/refresh", response_model=TokenData, dependencies=[Depends(refresh_rate_limit)])
+def refresh_token_endpoint(request: RefreshRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access token and a new refresh token"""
+    rotated = rotate_refresh_token(db, request.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    user, refresh_token, refresh_expires_at = rotated
+    mark_active(user.id)
+    token, expires_at = create_access_token(data={"sub": user.email})
+    return TokenData(
+        user=user,
+        token=token,
+        expires_at=expires_at,
+        refresh_token=refresh_token,
+        refresh_expires_at=refresh_expires_at
     )
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout_endpoint(request: RefreshRequest, db: Session = Depends(get_db)):
+    """Revoke the refresh token (and every token rotated from the same login)"""
+    revoke_refresh_token(db, request.refresh_token)
+
 @router.get("/role/{role}", response_model=List[UserResponse])
 def get_users_by_role_endpoint(
     role: UserRole,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Get users by role with pagination"""
+    """Get users by role with pagination (conditional: If-None-Match gets 304 while no user has changed)"""
+    unchanged = not_modified(request, response, weak_etag(USERS, get_version(db, USERS)))
+    if unchanged is not None:
+        return unchanged
     users = get_users_by_role(db, role, skip=skip, limit=limit)
     return users
 
-@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.get("/search", response_model=List[UserResponse])
+def search_users_endpoint(
+    q: str = Query(..., min_length=1, max_length=255, description="Name or email prefix to search for"),
+    role: Optional[UserRole] = Query(None, description="Only return users with this role"),
+    is_active: Optional[bool] = Query(None, description="Only return active/inactive users"),
+    limit: int = Query(10, ge=1, le=50, description="Number of records to return"),
+    db: Session = Depends(get_read_db)
+):
+    """Search users by name or email for type-ahead"""
+    return search_users(db, q, role=role, is_active=is_active, limit=limit)
+
+@router.post(
+    "/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(auth_rate_limit)]
+)
 def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
     """Create a new user"""
     # Check if user with email already exists
@@ -54,27 +125,48 @@ def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
             detail="User with this email already exists"
         )
     
-    return create_user(db=db, user=user)
+    try:
+        new_user = create_user(db=db, user=user)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    audit_log.record(
+        INFO, "registration", "user_created",
+        f"New user registered: {new_user.email}", user_id=new_user.id,
+        details={"role": new_user.role.value}
+    )
+    return new_user
 
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Get all users with pagination"""
+    """Get all users with pagination (conditional: If-None-Match gets 304 while no user has changed)"""
+    # The version is read before the rows: a change landing in between costs the client
+    # one extra fetch on its next poll, but can never get it a 304 for rows it hasn't seen
+    unchanged = not_modified(request, response, weak_etag(USERS, get_version(db, USERS)))
+    if unchanged is not None:
+        return unchanged
     users = get_users(db, skip=skip, limit=limit)
     return users
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    """Get user by ID"""
+def get_user(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get user by ID (conditional: If-None-Match gets 304 while the user is unchanged)"""
+    version = get_version(db, USERS)
     user = get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    # updated_at alone may only have second resolution; the version tells apart changes within one second
+    unchanged = not_modified(request, response, weak_etag(user.id, user.updated_at, version))
+    if unchanged is not None:
+        return unchanged
     return user
 
 @router.patch("/{user_id}/role", response_model=UserResponse)
@@ -90,6 +182,11 @@ def update_user_role_endpoint(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    audit_log.record(
+        INFO, "user_management", "role_changed",
+        f"User role updated: {user.email} -> {role.value}", user_id=user.id,
+        details={"role": role.value}
+    )
     return user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -101,3 +198,4 @@ def delete_user_endpoint(user_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    audit_log.record(INFO, "user_management", "user_deleted", f"User {user_id} deleted", user_id=user_id)
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Pattern, Tuple
+from app.core.config import (
+    ADMISSION_ENABLED, ADMISSION_UPLOAD, ADMISSION_DOWNLOAD, ADMISSION_AUTH, ADMISSION_READ,
+    ADMISSION_WRITE, ADMISSION_ADMIN
+)
+
+UPLOAD = "upload"
+DOWNLOAD = "download"
+AUTH = "auth"
+READ = "read"
+WRITE = "write"
+ADMIN = "admin"
+
+_ANY = None
+# (methods, path pattern, class), first match wins; a class of None bypasses admission control
+ROUTE_RULES: List[Tuple[Optional[frozenset], Pattern, Optional[str]]] = [
+    # Long-lived streams would hold a slot for as long as the client stays connected
+    (_ANY, re.compile(r"^/api/v1/(events|logs)/stream$"), None),
+    # Each sub-request of a batch is admitted under its own class instead (see routes/batch.py)
+    (frozenset({"POST"}), re.compile(r"^/api/v1/batch$"), None),
+    (frozenset({"POST"}), re.compile(r"^/api/v1/files/upload(/batch)?$"), UPLOAD),
+    (frozenset({"POST"}), re.compile(r"^/api/v1/reports/render(/batch)?$"), UPLOAD),
+    (frozenset({"GET", "HEAD"}), re.compile(r"^/api/v1/files/\d+(/entries/\d+)?/download$"), DOWNLOAD),
+    (frozenset({"POST"}), re.compile(r"^/api/v1/users/(authenticate|refresh|logout|)$"), AUTH),
+    (_ANY, re.compile(r"^/api/v1/(logs|analytics|admission)(/|$)"), ADMIN),
+    (frozenset({"PATCH", "DELETE"}), re.compile(r"^/api/v1/users/\d+(/role)?$"), ADMIN),
+    (frozenset({"GET", "HEAD"}), re.compile(r"^/api/"), READ),
+    (_ANY, re.compile(r"^/api/"), WRITE),
+]
+
+def classify(method: str, path: str) -> Optional[str]:
+    """The route class of a request, or None if it isn't subject to admission control"""
+    for methods, pattern, route_class in ROUTE_RULES:
+        if (methods is None or method in methods) and pattern.match(path):
+            return route_class
+    return None
+
+def _parse_limits(spec: str) -> Tuple[int, int, float]:
+    """'<concurrent>,<queued>,<max wait seconds>' -> (limit, max_queued, max_wait)"""
+    limit, max_queued, max_wait = spec.split(",")
+    return max(1, int(limit)), max(0, int(max_queued)), float(max_wait)
+
+class AdmissionGate:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one route class.
+
+    A request that finds the queue full, or waits longer than max_wait for a
+    slot, is refused rather than left to add to everyone's latency. State is
+    per worker process and only touched from its event loop.
+    """
+
+    def __init__(self, name: str, limit: int, max_queued: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Metrics
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.queued_total = 0
+        self.admitted_after_wait = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting up to max_wait. Returns False if the request should be shed."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queued:
+            self.rejected_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued_total += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.rejected_timeout += 1
+            return False
+        except BaseException:
+            # Cancelled (e.g. client went away); hand back a slot that was already passed to us
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self.admitted_after_wait += 1
+        self.wait_seconds_total += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        # Pass the slot straight to the oldest live waiter, so it can't be taken by a newcomer
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+                return
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_queued": self.max_queued,
+            "max_wait_seconds": self.max_wait,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "queued_total": self.queued_total,
+            "avg_queue_wait_ms": (
+                round(1000 * self.wait_seconds_total / self.admitted_after_wait, 2) if self.admitted_after_wait else 0.0
+            ),
+            "max_queue_wait_ms": round(1000 * self.max_wait_seconds, 2),
+        }
+
+class AdmissionController:
+    """One AdmissionGate per route class."""
+
+    def __init__(self, limits: Dict[str, str]):
+        self.gates = {name: AdmissionGate(name, *_parse_limits(spec)) for name, spec in limits.items()}
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: gate.stats() for name, gate in self.gates.items()}
+
+admission = AdmissionController({
+    UPLOAD: ADMISSION_UPLOAD,
+    DOWNLOAD: ADMISSION_DOWNLOAD,
+    AUTH: ADMISSION_AUTH,
+    READ: ADMISSION_READ,
+    WRITE: ADMISSION_WRITE,
+    ADMIN: ADMISSION_ADMIN,
+})
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that runs each API request under its route class's AdmissionGate.
+
+    Slow uploads can then fill their own class without delaying cheap reads or
+    logins. A shed request gets 503 with Retry-After before any of its body is
+    read. The slot is held until the response, including a streamed body, is
+    complete.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        route_class = classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.controller.gates[route_class]
+        if not await gate.acquire():
+            await self._reject(send, route_class)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    @staticmethod
+    async def _reject(send, route_class: str) -> None:
+        print(f"🚦 Admission: Shed {route_class} request")
+        body = json.dumps({"detail": f"Server busy ({route_class}), try again later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Callable, List
+from starlette.concurrency import run_in_threadpool
+
+_tasks: List[asyncio.Task] = []
+
+def start_periodic(name: str, interval_seconds: float, job: Callable[[], None]) -> None:
+    """
+    Run a blocking job every `interval_seconds` on the threadpool for the lifetime of the app.
+    A non-positive interval disables the job. Must be called from the running event loop.
+    """
+    if interval_seconds <= 0:
+        print(f"⏱️ background: {name} disabled")
+        return
+
+    async def runner():
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await run_in_threadpool(job)
+            except Exception as e:
+                print(f"⏱️ background: {name} failed: {e}")
+
+    _tasks.append(asyncio.create_task(runner(), name=name))
+    print(f"⏱️ background: {name} scheduled every {interval_seconds}s")
+
+async def stop_all() -> None:
+    """Cancel every periodic job started with start_periodic."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
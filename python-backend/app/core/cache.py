@@ -0,0 +1,325 @@
+import enum
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import DateTime, Enum, event, inspect, text
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.core.config import CACHE_ENABLED, CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_SHARED_PATH, CACHE_TTL_SECONDS
+from app.core.database import engine
+from app.core.node_local import private_file
+from app.core.pg_listener import pg_listener
+
+# Postgres NOTIFY channel for cache invalidations. Payload: comma-separated keys ("user:12,file:7")
+INVALIDATION_CHANNEL = "cache_invalidate"
+
+class LocalCache:
+    """
+    Thread-safe in-process LRU cache with a per-entry TTL.
+
+    Keys are strings of the form "<namespace>:<id>". Values must be plain JSON data
+    (see cached_row), never ORM instances, which belong to one session.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def generation(self) -> int:
+        # Evictions from this worker are already counted by InvalidatingCache
+        return 0
+
+    def set(
+        self, key: str, value: Any, ttl_seconds: Optional[float] = None, generation: Optional[int] = None
+    ) -> None:
+        expires_at = time.monotonic() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class SharedCache:
+    """
+    Node-local cache shared by every worker process, kept in a SQLite file.
+
+    Same interface as LocalCache, so a deployment can pick either with CACHE_BACKEND.
+    With N workers, a row read by one worker is a hit for all of them, so a cold
+    start costs the database one miss per row rather than N. Entries expire after
+    their TTL; once more than max_entries are stored, those closest to expiry are
+    dropped first. Errors (e.g. a locked file) are treated as misses so the cache
+    never fails a request. Values are stored as JSON: the file is only readable by
+    the app's user, but reading it must never be able to run code either.
+
+    The file also holds a generation, bumped by every eviction from any worker.
+    A value read from the database before an eviction is not stored (see set).
+    """
+
+    # Expired/excess entries are pruned every this many writes by each process
+    PRUNE_EVERY = 200
+
+    def __init__(self, path: str = "", max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS):
+        # Cached rows include password hashes; only the app's user may read them
+        self.path = private_file("cache.sqlite", path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_expires_at ON cache (expires_at)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL)"
+        )
+        connection.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0)")
+        print(f"🗄️ SharedCache: Using {self.path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+            connection.execute("PRAGMA synchronous=OFF")  # Losing a cache on power loss is fine
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._connection().execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"🗄️ SharedCache: Read failed: {e}")
+            return None
+        if row is None or row[1] < time.time():
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None  # Written by an older version in another format
+
+    def generation(self) -> int:
+        """Take this before reading the row to be cached and pass it to set(); -1 if it can't be read"""
+        try:
+            return self._connection().execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"🗄️ SharedCache: Read failed: {e}")
+            return -1
+
+    def set(
+        self, key: str, value: Any, ttl_seconds: Optional[float] = None, generation: Optional[int] = None
+    ) -> None:
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        try:
+            connection = self._connection()
+            # Stored only if no worker has evicted anything since the caller took its generation
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) SELECT ?, ?, ? "
+                "WHERE ? IS NULL OR ? = (SELECT value FROM generation WHERE id = 0)",
+                (key, json.dumps(value), expires_at, generation, generation)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(connection)
+        except sqlite3.Error as e:
+            print(f"🗄️ SharedCache: Write failed: {e}")
+
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        connection.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        excess = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)", (excess,)
+            )
+
+    def _evict(self, statement: str, parameters: List[tuple]) -> None:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("UPDATE generation SET value = value + 1 WHERE id = 0")
+            connection.executemany(statement, parameters)
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        try:
+            self._evict("DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+        except sqlite3.Error as e:
+            # Can't risk serving the stale entries, so drop everything if the targeted delete failed
+            print(f"🗄️ SharedCache: Eviction failed, clearing: {e}")
+            self.clear()
+
+    def clear(self) -> None:
+        try:
+            self._evict("DELETE FROM cache", [()])
+        except sqlite3.Error as e:
+            print(f"🗄️ SharedCache: Clear failed: {e}")
+
+class InvalidatingCache:
+    """
+    Wraps a cache so entries are evicted on every worker when the rows behind them change.
+
+    Writers call invalidate(db, key) before committing. On PostgreSQL the keys are
+    sent with NOTIFY in the committing transaction, and every worker's listener
+    evicts them. A worker whose listener is down can't know what it missed, so it
+    bypasses the cache until the listener reconnects, then starts from empty.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        # Bumped on every eviction; a value read from the database before an eviction is not cached
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        pg_listener.add_handler(INVALIDATION_CHANNEL, self._on_notify)
+        pg_listener.on_connect(self.clear)
+
+    @property
+    def usable(self) -> bool:
+        return CACHE_ENABLED and (not pg_listener.enabled or pg_listener.connected)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.backend.get(key) if self.usable else None
+
+    def generation(self) -> Tuple[int, int]:
+        """Take this before reading the row to be cached and pass it to set()"""
+        return self._generation, self.backend.generation() if self.usable else -1
+
+    def set(self, key: str, value: Any, generation: Tuple[int, int], ttl_seconds: Optional[float] = None) -> None:
+        # An invalidation since the read may be for this very row, so the value could already be stale
+        local_generation, backend_generation = generation
+        if self.usable and local_generation == self._generation:
+            self.backend.set(key, value, ttl_seconds, generation=backend_generation)
+
+    def invalidate(self, db: Session, *keys: str) -> None:
+        """Evict keys on every worker once db commits"""
+        db.info.setdefault("pending_invalidations", set()).update(keys)
+
+    def evict(self, keys: Iterable[str]) -> None:
+        """Evict keys from this worker only"""
+        with self._generation_lock:
+            self._generation += 1
+        self.backend.delete_many(keys)
+
+    def clear(self) -> None:
+        with self._generation_lock:
+            self._generation += 1
+        self.backend.clear()
+
+    def _on_notify(self, payload: str) -> None:
+        self.evict(key for key in payload.split(",") if key)
+
+def cache_key(namespace: str, value: Hashable) -> str:
+    return f"{namespace}:{value}"
+
+def cached_row(obj) -> dict:
+    """The column values of an ORM object as plain JSON data: datetimes in ISO format, enums by name"""
+    values = {}
+    for attr in inspect(obj).mapper.column_attrs:
+        value = getattr(obj, attr.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.name
+        values[attr.key] = value
+    return values
+
+def _restore_types(model, values: dict) -> dict:
+    """Undo cached_row's conversions, going by the column types"""
+    columns = inspect(model).columns
+    restored = dict(values)
+    for key, value in values.items():
+        if value is None:
+            continue
+        column_type = columns[key].type
+        if isinstance(column_type, DateTime):
+            restored[key] = datetime.fromisoformat(value)
+        elif isinstance(column_type, Enum) and column_type.enum_class is not None:
+            restored[key] = column_type.enum_class[value]
+    return restored
+
+def load_cached(db: Session, model, values: dict):
+    """
+    Turn cached column values back into an instance attached to db, without a query.
+    The instance behaves as if it had been loaded by db (updates, deletes, relationships).
+    """
+    obj = model(**_restore_types(model, values))
+    make_transient_to_detached(obj)
+    existing = db.identity_map.get(inspect(obj).key)
+    if existing is not None:
+        return existing
+    return db.merge(obj, load=False)
+
+def _create_backend():
+    if CACHE_BACKEND == "shared":
+        return SharedCache(CACHE_SHARED_PATH)
+    if not pg_listener.enabled and engine.url.database not in (None, "", ":memory:"):
+        # Without NOTIFY one worker's evictions never reach the others' local caches,
+        # so a deleted or demoted user could keep authenticating there until the TTL ran out
+        print("🗄️ cache: No cross-worker invalidation without PostgreSQL, using the shared backend")
+        shared = SharedCache(CACHE_SHARED_PATH)
+        shared.clear()  # The database may have been changed while the app was down
+        return shared
+    return LocalCache()
+
+cache = InvalidatingCache(_create_backend())
+
+@event.listens_for(Session, "before_commit")
+def _notify_invalidations(session: Session) -> None:
+    """Broadcast pending invalidations as part of the committing transaction (PostgreSQL only)."""
+    pending: Set[str] = session.info.get("pending_invalidations")
+    if not pending or session.get_bind().dialect.name != "postgresql":
+        return
+    # Stay well under NOTIFY's 8000 byte payload limit
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for key in sorted(pending):
+        if current and size + len(key) > 7000:
+            chunks.append(",".join(current))
+            current, size = [], 0
+        current.append(key)
+        size += len(key) + 1
+    chunks.append(",".join(current))
+    session.execute(
+        text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+        {"channel": INVALIDATION_CHANNEL, "payloads": chunks}
+    )
+
+@event.listens_for(Session, "after_commit")
+def _evict_invalidations(session: Session) -> None:
+    """Evict locally as soon as the change is committed; other workers evict on NOTIFY."""
+    pending = session.info.pop("pending_invalidations", None)
+    if pending:
+        cache.evict(pending)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_invalidations(session: Session, previous_transaction) -> None:
+    session.info.pop("pending_invalidations", None)
@@ -15,7 +15,95 @@ DB_NAME = os.getenv("DB_NAME", "multitenant_app")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 
+# Read Replica Settings (comma-separated PostgreSQL URLs; empty = all reads go to DATABASE_URL)
+DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))  # Further behind than this: read from primary
+REPLICA_LAG_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL_SECONDS", 5))
+REPLICA_CONNECT_TIMEOUT_SECONDS = int(os.getenv("REPLICA_CONNECT_TIMEOUT_SECONDS", 3))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 10))  # Reads stay on primary after a write
+
+# SQLite Settings (used when DATABASE_URL is sqlite:///path/to/file.db)
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", 8))  # Writes always share one connection
+SQLITE_BUSY_TIMEOUT_SECONDS = float(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", 5))
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", 64))  # Page cache per connection
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", 256))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # FULL to survive power loss too
+
 # JWT Settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 5))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+
+# Password Hashing Settings (scrypt; changing the cost upgrades each hash at its next login)
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", 2 ** 14))  # CPU/memory cost, a power of two
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", 8))  # Block size; memory used is 128 * N * R bytes
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", 1))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))  # Processes hashing passwords
+PASSWORD_HASH_MAX_QUEUED = int(os.getenv("PASSWORD_HASH_MAX_QUEUED", 64))  # Logins waiting beyond this get 503
+
+# Tenant Settings
+DEFAULT_TENANT_ID = int(os.getenv("DEFAULT_TENANT_ID", 1))  # Tenant new users join
+FILES_PARTITIONS = int(os.getenv("FILES_PARTITIONS", 16))  # Hash partitions of files (PostgreSQL; fixed once created)
+
+# File Upload Settings
+UPLOADS_DIR = os.getenv("UPLOADS_DIR", "uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))  # bytes read per chunk while streaming
+UPLOAD_BATCH_MAX_FILES = int(os.getenv("UPLOAD_BATCH_MAX_FILES", 500))
+UPLOAD_BATCH_CONCURRENCY = int(os.getenv("UPLOAD_BATCH_CONCURRENCY", 8))
+
+# Storage Quota Settings
+USER_STORAGE_QUOTA_BYTES = int(os.getenv("USER_STORAGE_QUOTA_BYTES", 0))  # 0 = unlimited
+USAGE_RECONCILE_INTERVAL_SECONDS = int(os.getenv("USAGE_RECONCILE_INTERVAL_SECONDS", 3600))  # 0 = disabled
+
+# Storage Scrubber Settings
+SCRUB_INTERVAL_SECONDS = int(os.getenv("SCRUB_INTERVAL_SECONDS", 0))  # 0 = only run via scrub_storage.py
+SCRUB_BATCH_SIZE = int(os.getenv("SCRUB_BATCH_SIZE", 500))
+SCRUB_WORKERS = int(os.getenv("SCRUB_WORKERS", 2))
+SCRUB_MAX_BYTES_PER_SECOND = int(os.getenv("SCRUB_MAX_BYTES_PER_SECOND", 50 * 1024 * 1024))
+SCRUB_ORPHAN_GRACE_SECONDS = int(os.getenv("SCRUB_ORPHAN_GRACE_SECONDS", 3600))
+SCRUB_RECLAIM_ORPHANS = os.getenv("SCRUB_RECLAIM_ORPHANS", "false").lower() == "true"
+
+# Audit Log Settings
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", 1.0))
+AUDIT_MAX_PENDING = int(os.getenv("AUDIT_MAX_PENDING", 50000))  # Oldest unflushed events are dropped beyond this
+AUDIT_RING_SIZE = int(os.getenv("AUDIT_RING_SIZE", 1000))  # Recent events kept in memory for live tailing
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", 90))
+
+# Report Rendering Settings
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))  # Processes rendering PDFs
+REPORT_MAX_QUEUED = int(os.getenv("REPORT_MAX_QUEUED", 32))  # Renders waiting beyond this are refused with 503
+REPORT_BATCH_MAX = int(os.getenv("REPORT_BATCH_MAX", 500))
+REPORT_BATCH_CHUNK = int(os.getenv("REPORT_BATCH_CHUNK", 10))  # Reports rendered per worker call in batch mode
+
+# Request Batching Settings
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 50))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))  # Sub-requests (and sessions) run at once per batch
+BATCH_SUBREQUEST_TIMEOUT_SECONDS = float(os.getenv("BATCH_SUBREQUEST_TIMEOUT_SECONDS", 30))
+
+# Cache Settings
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")  # local (per worker) or shared (per node)
+CACHE_SHARED_PATH = os.getenv("CACHE_SHARED_PATH", "")  # SQLite file for the shared backend; default in a private directory in /dev/shm
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 300))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+
+# Admission Control Settings, per route class: "<concurrent>,<queued>,<max queue wait seconds>"
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_UPLOAD = os.getenv("ADMISSION_UPLOAD", "8,32,10")  # File uploads, report rendering
+ADMISSION_DOWNLOAD = os.getenv("ADMISSION_DOWNLOAD", "16,64,5")
+ADMISSION_AUTH = os.getenv("ADMISSION_AUTH", "16,128,3")  # Login, refresh, logout, signup
+ADMISSION_READ = os.getenv("ADMISSION_READ", "32,256,2")  # Every other GET
+ADMISSION_WRITE = os.getenv("ADMISSION_WRITE", "16,64,5")  # Every other write, including /batch
+ADMISSION_ADMIN = os.getenv("ADMISSION_ADMIN", "4,32,10")  # Logs, analytics, role changes, user deletion
+
+# Rate Limit Settings, per route: "<requests>/<seconds>" (empty = no limit)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")  # local (per worker) or shared (per node)
+RATE_LIMIT_SHARED_PATH = os.getenv("RATE_LIMIT_SHARED_PATH", "")  # SQLite file for the shared backend
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", 100000))
+RATE_LIMIT_AUTH_PER_IP = os.getenv("RATE_LIMIT_AUTH_PER_IP", "20/60")  # Login and signup
+RATE_LIMIT_REFRESH_PER_IP = os.getenv("RATE_LIMIT_REFRESH_PER_IP", "60/60")
+RATE_LIMIT_UPLOAD_PER_USER = os.getenv("RATE_LIMIT_UPLOAD_PER_USER", "60/60")
+RATE_LIMIT_UPLOAD_PER_IP = os.getenv("RATE_LIMIT_UPLOAD_PER_IP", "120/60")
+RATE_LIMIT_REPORT_PER_USER = os.getenv("RATE_LIMIT_REPORT_PER_USER", "30/60")
@@ -1,21 +1,219 @@
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import BigInteger, Column, String, Table, create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateColumn, CreateIndex
+from app.core.config import (
+    DATABASE_URL, SQLITE_READ_POOL_SIZE, SQLITE_BUSY_TIMEOUT_SECONDS, SQLITE_CACHE_SIZE_MB, SQLITE_MMAP_SIZE_MB,
+    SQLITE_SYNCHRONOUS
+)
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # Readers and the writer don't block each other
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")  # NORMAL is durable in WAL mode bar power loss
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_SECONDS * 1000)}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_MB * 1024}")  # Negative: in KiB rather than pages
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+def _create_sqlite_engines(url):
+    """
+    (writer, reader) engines for a SQLite database.
+
+    SQLite allows one writer at a time; letting every request's connection race
+    for the lock just turns into busy-waiting. Writes therefore share a single
+    connection (requests queue for it in the pool), while reads use a pool of
+    their own that WAL lets run alongside the writer.
+    """
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_SECONDS}
+    if url.database in (None, "", ":memory:"):
+        # An in-memory database exists per connection, so everything must share one
+        shared = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+        return shared, shared
+    writer = create_engine(url, connect_args=connect_args, pool_size=1, max_overflow=0, pool_timeout=30)
+    reader = create_engine(url, connect_args=connect_args, pool_size=SQLITE_READ_POOL_SIZE, max_overflow=0)
+    for sqlite_engine in (writer, reader):
+        event.listen(sqlite_engine, "connect", _set_sqlite_pragmas)
+    return writer, reader
+
+class RoutingSession(Session):
+    """
+    Sends reads to the reader pool and everything else to the single writer.
+
+    Once a transaction has written, the rest of it stays on the writer, so it
+    reads its own uncommitted changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        # is_select rather than isinstance(clause, Select), so lambda statements wrapping a select count as reads
+        if self.info.get("on_writer") or self._flushing or not getattr(clause, "is_select", False):
+            # Raw text() statements and session.connection() calls may write, so they go to the writer too
+            self.info["on_writer"] = True
+            return engine
+        return read_engine
+
+def _leave_writer(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop("on_writer", None)
+
+_url = make_url(DATABASE_URL)
+if _url.get_backend_name() == "sqlite":
+    # Create SQLAlchemy engines: `engine` is the writer (also used for DDL), `read_engine` serves reads
+    engine, read_engine = _create_sqlite_engines(_url)
+    session_class = RoutingSession if read_engine is not engine else Session
+    event.listen(RoutingSession, "after_transaction_end", _leave_writer)
+else:
+    # Create SQLAlchemy engine
+    engine = create_engine(DATABASE_URL)
+    read_engine = engine
+    session_class = Session
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=session_class, autocommit=False, autoflush=False, bind=engine)
 
 # Create Base class
 Base = declarative_base()
 
+# Stand-in for sequences where the database has none (SQLite); see reserve_ids
+id_counters = Table(
+    "id_counters", Base.metadata,
+    Column("name", String, primary_key=True),
+    Column("value", BigInteger, nullable=False)
+)
+
+def reserve_ids(db, model, count: int = 1, column: str = "id") -> Optional[range]:
+    """
+    Take `count` consecutive ids for new rows of a model on databases without
+    sequences, for models whose integer id is only part of a composite primary
+    key (which SQLite won't autoincrement). Returns None on PostgreSQL, where the
+    column's sequence numbers rows.
+
+    The counter is bumped with an upsert in the caller's transaction, which holds
+    SQLite's write lock until commit, so no two writers get the same ids. A
+    missing counter starts after the table's current maximum.
+    """
+    if (db.get_bind() if isinstance(db, Session) else db).dialect.name == "postgresql":
+        return None
+    table = model.__table__
+    stmt = _dialect_insert(db, id_counters).values(
+        name=table.name,
+        value=text(f"(SELECT COALESCE(MAX({table.c[column].name}), 0) FROM {table.name}) + {int(count)}")
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"], set_={"value": id_counters.c.value + count}
+    ).returning(id_counters.c.value)
+    last = db.execute(stmt).scalar_one()
+    return range(last - count + 1, last + 1)
+
+def number_with_counter(model, column: str = "id") -> None:
+    """Number rows the ORM inserts one by one with reserve_ids (bulk inserts must call it themselves)"""
+
+    def assign(mapper, connection, obj) -> None:
+        if getattr(obj, column) is None:
+            ids = reserve_ids(connection, model, column=column)
+            if ids is not None:
+                setattr(obj, column, ids[0])
+
+    event.listen(model, "before_insert", assign)
+
+def ensure_extensions(bind=engine) -> None:
+    """Create the Postgres extensions the search indexes rely on (no-op elsewhere)."""
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+
+def ensure_columns(bind=engine) -> None:
+    """
+    Add nullable columns declared on the models that are missing from the database.
+    Like indexes, create_all() only adds columns together with new tables. Adding a
+    nullable column without a default doesn't rewrite the table. NOT NULL columns
+    need their values filled in first, so those are left to a migration script.
+    """
+    with bind.begin() as conn:
+        existing_tables = set(inspect(conn).get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable or column.primary_key:
+                    continue
+                definition = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+                print(f"🔧 ensure_columns: Added {table.name}.{column.name}")
+
+# Indexes superseded by another one: dropped once their replacement exists
+REPLACED_INDEXES = {"ix_users_email_lower": "ix_users_email_lower_unique"}
+
+def ensure_indexes(bind=engine) -> None:
+    """
+    Create any index declared on the models that is missing from the database.
+    create_all() only creates indexes together with new tables, so this picks up
+    indexes added later to tables that already exist. A unique index the existing
+    rows violate is reported and skipped, so the app still starts.
+    """
+    created = set()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                # IF NOT EXISTS rather than checkfirst: SQLite can't reflect expression indexes, so they'd look missing
+                with bind.begin() as conn:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+                created.add(index.name)
+            except IntegrityError as e:
+                print(f"⚠️ ensure_indexes: Can't create unique index {index.name}, existing rows conflict: {e.orig}")
+    with bind.begin() as conn:
+        for old, new in REPLACED_INDEXES.items():
+            if new in created:
+                conn.execute(text(f"DROP INDEX IF EXISTS {old}"))
+
+# Set while a sub-request of POST /api/v1/batch runs, so it reuses a session the batch already holds
+batch_session: ContextVar[Optional[Session]] = ContextVar("batch_session", default=None)
+
 # Dependency to get database session
 def get_db():
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def _dialect_insert(db, model):
+    dialect = (db.get_bind() if isinstance(db, Session) else db).dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported for {dialect}")
+    return insert(model)
+
+def upsert_increment(db, model, keys: dict, increments: dict) -> None:
+    """
+    Insert a counter row or add to it if it already exists (INSERT ... ON CONFLICT DO UPDATE).
+    `keys` must match the table's primary key; `increments` are added to the stored values.
+    """
+    stmt = _dialect_insert(db, model).values(**keys, **increments)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: getattr(model, column) + stmt.excluded[column] for column in increments}
+    )
+    db.execute(stmt)
+
+def insert_ignore(db, model, values: dict) -> bool:
+    """Insert a row unless its key already exists. Returns True if a row was inserted."""
+    stmt = _dialect_insert(db, model).values(**values).on_conflict_do_nothing()
+    return db.execute(stmt).rowcount == 1
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Clients may keep the body but must revalidate it; shared caches must not keep it at all
+CACHE_CONTROL = "private, no-cache"
+# A browser's cached copy belongs to whoever was logged in when it was fetched
+VARY = "Authorization"
+
+def weak_etag(*parts) -> str:
+    """W/"a-b-c" from whatever identifies this version of the response (datetimes as timestamps)"""
+    values = [f"{part.timestamp():.6f}" if isinstance(part, datetime) else str(part) for part in parts]
+    return 'W/"' + "-".join(values) + '"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: the W/ prefix doesn't count
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in if_none_match.split(","))
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Answer a conditional GET: a bodiless 304 if the client already has this
+    version, otherwise None after putting the ETag on the response to be sent.
+
+    An ETag for something that depends on the caller must name the caller, e.g.
+    user_files(user_id): a tag taken from another user's response must never match.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": VARY}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
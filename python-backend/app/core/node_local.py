@@ -0,0 +1,43 @@
+import os
+import stat
+import tempfile
+
+def _private_directory() -> str:
+    """
+    A directory only this user can enter, on a RAM-backed filesystem where there is one.
+    /dev/shm and /tmp are world-writable, so a file at a fixed name there could be
+    created (or replaced) by anyone on the node first; inside this directory it can't.
+    """
+    # Prefer a RAM-backed filesystem so the node-local files never wait on disk
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    path = os.path.join(base, f"multitenant_app-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"{path} must be a directory owned by this user with mode 0700; remove it and restart")
+    return path
+
+def private_file(filename: str, configured_path: str = "") -> str:
+    """
+    Path of a node-local SQLite file shared by this app's workers, created 0600.
+
+    SQLite gives the -wal and -shm files it creates the mode of the database file,
+    so creating the file before SQLite opens it keeps those private too.
+    """
+    path = configured_path or os.path.join(_private_directory(), filename)
+    descriptor = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        info = os.fstat(descriptor)
+        if info.st_uid != os.getuid():
+            raise RuntimeError(f"{path} is owned by another user; refusing to use it")
+        os.fchmod(descriptor, 0o600)
+    finally:
+        os.close(descriptor)
+    for suffix in ("-wal", "-shm"):
+        # Left behind with a looser mode by an earlier version
+        if os.path.exists(path + suffix):
+            os.chmod(path + suffix, 0o600)
+    return path
@@ -0,0 +1,79 @@
+import base64
+import hashlib
+import hmac
+import os
+from typing import Optional, Tuple
+from anyio import from_thread
+from app.core.config import (
+    PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUED
+)
+from app.core.process_pool import BoundedProcessPool
+
+# scrypt is memory-hard and CPU-bound, so it runs on its own pool: a login storm
+# queues here (or is refused) instead of occupying the threads every sync route needs
+password_pool = BoundedProcessPool("password-hasher", PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUED)
+
+SCHEME = "scrypt"
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _unb64(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p, dklen=32,
+        maxmem=128 * r * (n + p + 2) + 1024 * 1024
+    )
+
+def hash_password(
+    password: str,
+    n: int = PASSWORD_SCRYPT_N,
+    r: int = PASSWORD_SCRYPT_R,
+    p: int = PASSWORD_SCRYPT_P
+) -> str:
+    """
+    Hash a password with scrypt and a random salt.
+    The cost parameters are stored with the hash: scrypt$<n>$<r>$<p>$<salt>$<hash>
+    """
+    salt = os.urandom(16)
+    return f"{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """Check a password against a stored scrypt hash, or a legacy unsalted SHA-256 hex digest"""
+    if hashed_password.startswith(SCHEME + "$"):
+        try:
+            _, n, r, p, salt, expected = hashed_password.split("$")
+            actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(actual, _unb64(expected))
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy, hashed_password)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True for legacy hashes and hashes made with other cost parameters than the configured ones"""
+    return not hashed_password.startswith(
+        f"{SCHEME}${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$"
+    )
+
+def verify_and_rehash(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify, and if the stored hash is outdated also hash the password again, in one job.
+    Returns (valid, new hash or None).
+    """
+    if not verify_password(password, hashed_password):
+        return False, None
+    return True, hash_password(password) if needs_rehash(hashed_password) else None
+
+# The pooled variants are for sync routes: the route's worker thread waits for the
+# pool while the event loop keeps serving, and so do the route's own database calls
+
+def hash_password_pooled(password: str) -> str:
+    """hash_password on the password pool. Raises PoolSaturatedError when it is full."""
+    return from_thread.run(password_pool.run, hash_password, password)
+
+def verify_and_rehash_pooled(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_rehash on the password pool. Raises PoolSaturatedError when it is full."""
+    return from_thread.run(password_pool.run, verify_and_rehash, password, hashed_password)
@@ -0,0 +1,80 @@
+import select
+import threading
+from typing import Callable, Dict, List, Optional
+from app.core.database import engine
+
+class PgListener:
+    """
+    One PostgreSQL LISTEN connection per worker, shared by everything that reacts to NOTIFY.
+
+    Handlers are registered per channel and called on the listener thread. The
+    connection is re-established automatically; because notifications sent while
+    it was down are lost, the on_connect callbacks run after every (re)connect so
+    consumers can resynchronise (e.g. flush a cache).
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._on_connect: List[Callable[[], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+
+    @property
+    def enabled(self) -> bool:
+        return engine.dialect.name == "postgresql"
+
+    def add_handler(self, channel: str, handler: Callable[[str], None]) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_connect(self, callback: Callable[[], None]) -> None:
+        self._on_connect.append(callback)
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            connection = None
+            try:
+                pooled = engine.raw_connection()
+                pooled.detach()  # Held for the app's lifetime, so don't take a slot from the pool
+                connection = pooled.driver_connection
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    for channel in self._handlers:
+                        cursor.execute(f"LISTEN {channel}")
+                self.connected = True
+                print(f"📣 PgListener: Listening on {', '.join(self._handlers)}")
+                for callback in self._on_connect:
+                    callback()
+                while not self._stop.is_set():
+                    if select.select([connection], [], [], 5)[0]:
+                        connection.poll()
+                        while connection.notifies:
+                            notify = connection.notifies.pop(0)
+                            for handler in self._handlers.get(notify.channel, ()):
+                                try:
+                                    handler(notify.payload)
+                                except Exception as e:
+                                    print(f"📣 PgListener: Handler for {notify.channel} failed: {e}")
+            except Exception as e:
+                print(f"📣 PgListener: Connection lost, reconnecting: {e}")
+                self._stop.wait(2)
+            finally:
+                self.connected = False
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+pg_listener = PgListener()
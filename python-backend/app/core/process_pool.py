@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional
+
+class PoolSaturatedError(Exception):
+    """Raised when a bounded pool already has as much work queued as it accepts."""
+
+class BoundedProcessPool:
+    """
+    A process pool with a cap on outstanding work.
+
+    CPU-bound jobs (PDF rendering, password hashing) run in worker processes so
+    they neither block the event loop nor contend for the GIL. At most
+    `workers + max_queued` jobs are accepted at once; beyond that `run` raises
+    PoolSaturatedError straight away (or waits, with wait=True) instead of
+    letting the backlog grow without limit. Workers start on first use.
+    """
+
+    _instances: List["BoundedProcessPool"] = []
+
+    def __init__(self, name: str, workers: int, max_queued: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, max_queued))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        BoundedProcessPool._instances.append(self)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                print(f"⚙️ {self.name}: Started {self.workers} worker processes")
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+        """Run fn(*args) in a worker process. fn and args must be picklable."""
+        if wait:
+            # Acquiring may block, so do it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._slots.acquire)
+        elif not self._slots.acquire(blocking=False):
+            raise PoolSaturatedError(f"{self.name} is busy, try again later")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    @classmethod
+    def shutdown_all(cls) -> None:
+        """Stop every pool's workers (called on application shutdown)."""
+        for pool in cls._instances:
+            pool.shutdown()
@@ -0,0 +1,216 @@
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+import jwt
+from fastapi import Header
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import (
+    DATABASE_REPLICA_URLS, REPLICA_MAX_LAG_SECONDS, REPLICA_CONNECT_TIMEOUT_SECONDS, READ_YOUR_WRITES_SECONDS
+)
+from app.core.database import SessionLocal, batch_session, engine
+from app.core.pg_listener import pg_listener
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received
+LAG_QUERY = text(
+    "SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)"
+)
+
+# Postgres NOTIFY channel announcing which user just committed a write
+RECENT_WRITES_CHANNEL = "recent_writes"
+
+class ReplicaSet:
+    """
+    Read replicas and how far each is behind the primary.
+
+    A replica only serves reads while its last lag check came in under
+    REPLICA_MAX_LAG_SECONDS. Until the first check, and whenever no replica
+    qualifies, reads go to the primary.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.engines = [self._create_engine(url) for url in urls]
+        self.lag: List[Optional[float]] = [None] * len(self.engines)  # None: unreachable or not checked yet
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        for index, replica_engine in enumerate(self.engines):
+            event.listen(replica_engine, "handle_error", self._on_error(index))
+
+    @staticmethod
+    def _create_engine(url: str):
+        connect_args = {}
+        if make_url(url).get_backend_name() == "postgresql":
+            connect_args["connect_timeout"] = REPLICA_CONNECT_TIMEOUT_SECONDS
+        return create_engine(url, pool_pre_ping=True, connect_args=connect_args)
+
+    def _on_error(self, index: int):
+        def handle_error(context) -> None:
+            # Stop routing to a replica that dropped its connection until the next check finds it back
+            if context.is_disconnect:
+                self.lag[index] = None
+        return handle_error
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self):
+        """Next replica within the lag limit (round robin), or None if there isn't one"""
+        usable = [
+            replica_engine for replica_engine, lag in zip(self.engines, self.lag)
+            if lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+        ]
+        if not usable:
+            return None
+        with self._lock:
+            turn = next(self._next)
+        return usable[turn % len(usable)]
+
+    def check(self) -> None:
+        """Measure each replica's lag; unreachable replicas are taken out of rotation"""
+        for index, replica_engine in enumerate(self.engines):
+            try:
+                with replica_engine.connect() as conn:
+                    lag = float(conn.execute(LAG_QUERY).scalar())
+            except Exception as e:
+                if self.lag[index] is not None:
+                    print(f"🗄️ replicas: {replica_engine.url.host} unreachable, reading from primary: {e}")
+                lag = None
+            was_usable = self.lag[index] is not None and self.lag[index] <= REPLICA_MAX_LAG_SECONDS
+            self.lag[index] = lag
+            if lag is not None and was_usable != (lag <= REPLICA_MAX_LAG_SECONDS):
+                state = "back in rotation" if not was_usable else "too far behind, reading from primary"
+                print(f"🗄️ replicas: {replica_engine.url.host} {state} (lag {lag:.1f}s)")
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "host": replica_engine.url.host,
+                "lag_seconds": lag,
+                "in_rotation": lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+            }
+            for replica_engine, lag in zip(self.engines, self.lag)
+        ]
+
+def _replica_urls() -> List[str]:
+    urls = [url.strip() for url in DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    if urls and engine.dialect.name != "postgresql":
+        print("🗄️ replicas: DATABASE_REPLICA_URLS is only supported with PostgreSQL, ignoring it")
+        return []
+    return urls
+
+replicas = ReplicaSet(_replica_urls())
+ReplicaSession = sessionmaker(autocommit=False, autoflush=False, info={"replica": True})
+
+class RecentWriters:
+    """
+    Users who committed a write within READ_YOUR_WRITES_SECONDS, as seen by this worker.
+
+    Writes are announced with NOTIFY in the committing transaction and every
+    worker, on every node, records them from its LISTEN connection. Notifications
+    sent while that connection is down are lost, so until it is back, and for
+    READ_YOUR_WRITES_SECONDS after, every user counts as a recent writer.
+    """
+
+    def __init__(self):
+        self._until: Dict[str, float] = {}
+        self._everyone_until = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, subject: str) -> None:
+        with self._lock:
+            self._until[subject] = time.monotonic() + READ_YOUR_WRITES_SECONDS
+
+    def resync(self) -> None:
+        with self._lock:
+            self._everyone_until = time.monotonic() + READ_YOUR_WRITES_SECONDS
+
+    def __contains__(self, subject: str) -> bool:
+        now = time.monotonic()
+        if not pg_listener.connected or now < self._everyone_until:
+            return True
+        return self._until.get(subject, 0.0) > now
+
+    def prune(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._until = {subject: until for subject, until in self._until.items() if until > now}
+
+recent_writers = RecentWriters()
+
+def check_replicas_job() -> None:
+    replicas.check()
+    recent_writers.prune()
+
+def _token_subject(authorization: Optional[str]) -> Optional[str]:
+    """
+    Who is asking, from the bearer token's subject. The signature isn't checked:
+    this only picks where to read from, and authentication happens separately.
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        return jwt.decode(authorization[7:], options={"verify_signature": False}).get("sub")
+    except jwt.PyJWTError:
+        return None
+
+def get_read_db(authorization: str = Header(None)):
+    """
+    Session for read-only routes: a replica within the lag limit, else the primary.
+
+    A user who wrote within the last READ_YOUR_WRITES_SECONDS reads from the
+    primary, so they see their own change even if the replicas haven't replayed
+    it yet. Never use this for a route that writes.
+    """
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
+    replica_engine = replicas.pick() if replicas.enabled else None
+    if replica_engine is not None:
+        subject = _token_subject(authorization)
+        if subject and subject in recent_writers:
+            replica_engine = None
+    db = ReplicaSession(bind=replica_engine) if replica_engine is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _mark_wrote(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+def _mark_bulk_write(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+def _announce_write(session: Session) -> None:
+    """Tell every worker the user is about to commit a write, in the same transaction (see get_read_db)"""
+    subject = session.info.get("subject")
+    # before_commit runs ahead of the final flush, so pending changes count as a write too
+    if subject and (session.info.pop("wrote", False) or session.new or session.dirty or session.deleted):
+        session.execute(text("SELECT pg_notify(:channel, :subject)"),
+                        {"channel": RECENT_WRITES_CHANNEL, "subject": subject})
+        session.info["announced"] = subject
+
+def _remember_write(session: Session) -> None:
+    """This worker's own record of the write, without waiting for the notification to come back"""
+    subject = session.info.pop("announced", None)
+    if subject:
+        recent_writers.add(subject)
+
+def _forget_write(session: Session, previous_transaction) -> None:
+    session.info.pop("wrote", None)
+    session.info.pop("announced", None)
+
+if replicas.enabled:
+    event.listen(Session, "after_flush", _mark_wrote)
+    event.listen(Session, "do_orm_execute", _mark_bulk_write)
+    event.listen(Session, "before_commit", _announce_write)
+    event.listen(Session, "after_commit", _remember_write)
+    pg_listener.add_handler(RECENT_WRITES_CHANNEL, recent_writers.add)
+    pg_listener.on_connect(recent_writers.resync)
+    event.listen(Session, "after_soft_rollback", _forget_write)
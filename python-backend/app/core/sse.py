@@ -0,0 +1,30 @@
+import json
+from datetime import date, datetime
+from typing import Any, Optional
+
+# Sent when a stream has been idle this long, so proxies don't close the connection
+HEARTBEAT_SECONDS = 15
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable nginx response buffering
+}
+
+def _default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def format_sse(data: dict, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Encode one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=_default)}")
+    return "\n".join(lines) + "\n\n"
+
+def heartbeat() -> str:
+    """An SSE comment line, ignored by clients."""
+    return ": keep-alive\n\n"
@@ -1,26 +1,49 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.routes import user
-from app.core.database import engine, Base, SessionLocal
-from app.core.config import APP_NAME, APP_VERSION, PORT
-from sqlalchemy import text
+from app.core.database import engine, Base, SessionLocal, ensure_columns, ensure_extensions, ensure_indexes
+from app.core.config import (
+    APP_NAME, APP_VERSION, PORT, USAGE_RECONCILE_INTERVAL_SECONDS, SCRUB_INTERVAL_SECONDS,
+    AUDIT_FLUSH_INTERVAL_SECONDS, REPLICA_LAG_CHECK_INTERVAL_SECONDS
+)
+from app.core import background
+from app.core.process_pool import BoundedProcessPool
+from app.core.admission import AdmissionControlMiddleware
+from app.core.pg_listener import pg_listener
+from app.core.replicas import replicas, check_replicas_job
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import inspect, text
 from app.api.v1 import api_router
 
 # Import models to ensure they are registered with SQLAlchemy
 from app.models.user import User
 from app.models.file import File
+from app.models.usage import StorageUsage
+from app.models.archive import ArchiveEntry
+from app.models.analytics import DailyUploadStat, DailySignupStat, DailyActiveUser, DailyActivityStat
+from app.models.audit import AuditEvent
+from app.models.report import RenderedReport
+from app.models.refresh_token import RefreshToken
+from app.models.collection_version import CollectionVersion
+from app.services.audit_log import audit_log, maintain_partitions
+from app.services.file_service import ensure_file_partitions
+from app.services.change_events import change_bus
 
 # Create database tables
 print("🔧 Creating database tables...")
+ensure_extensions()
 Base.metadata.create_all(bind=engine)
-print("✅ Database connected: multitenant_app")
+ensure_columns()
+ensure_file_partitions()
+ensure_indexes()
+maintain_partitions()
+print(f"✅ Database connected: {engine.url.database} ({engine.dialect.name})")
 print(f"PORT: {PORT}")
 
 # Verify tables exist
-with engine.connect() as conn:
-    result = conn.execute(text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"))
-    tables = [row[0] for row in result]
-    print(f"📋 Available tables: {tables}")
+tables = inspect(engine).get_table_names()
+print(f"📋 Available tables: {tables}")
 
 app = FastAPI(
     title=APP_NAME or "Multi-Tenant API",
@@ -34,6 +57,33 @@ async def startup_event():
     print(f"🚀 Server running on port {PORT}")
     print(f"📚 API Documentation: http://localhost:{PORT}/docs")
     print(f"🔍 Health Check: http://localhost:{PORT}/health")
+    
+    from app.services.usage_service import reconcile_usage_job
+    from app.services.storage_scrubber import scrub_storage_job
+    from app.services.refresh_token_service import purge_refresh_tokens_job
+    background.start_periodic("usage-reconcile", USAGE_RECONCILE_INTERVAL_SECONDS, reconcile_usage_job)
+    background.start_periodic("storage-scrub", SCRUB_INTERVAL_SECONDS, scrub_storage_job)
+    background.start_periodic("refresh-token-purge", 60 * 60, purge_refresh_tokens_job)
+    if replicas.enabled:
+        # Replicas stay out of rotation until a lag check has seen them
+        await run_in_threadpool(check_replicas_job)
+        background.start_periodic("replica-lag-check", REPLICA_LAG_CHECK_INTERVAL_SECONDS, check_replicas_job)
+    
+    audit_log.start(asyncio.get_running_loop())
+    change_bus.start(asyncio.get_running_loop())
+    pg_listener.start()
+    background.start_periodic("audit-flush", AUDIT_FLUSH_INTERVAL_SECONDS, audit_log.flush)
+    background.start_periodic("audit-partitions", 24 * 60 * 60, maintain_partitions)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await background.stop_all()
+    pg_listener.stop()
+    audit_log.flush()
+    BoundedProcessPool.shutdown_all()
+
+# Shed load per route class before it queues up; added first so CORS headers still reach shed requests
+app.add_middleware(AdmissionControlMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -57,6 +107,8 @@ def read_root():
 
 @app.get("/health")
 def health_check():
+    if replicas.enabled:
+        return {"status": "healthy", "replicas": replicas.stats()}
     return {"status": "healthy"}
 
 @app.get("/test-db")
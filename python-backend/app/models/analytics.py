@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, BigInteger, Date, ForeignKey, Enum
+from app.core.database import Base
+from app.models.file import FileType
+from app.models.user import UserRole
+
+# Pre-aggregated rollups for the analytics API. Each is updated incrementally by the
+# write path it summarises, so reads never touch the users/files tables.
+
+class DailyUploadStat(Base):
+    __tablename__ = "daily_upload_stats"
+
+    day = Column(Date, primary_key=True)
+    file_type = Column(Enum(FileType), primary_key=True)
+    upload_count = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+
+class DailySignupStat(Base):
+    __tablename__ = "daily_signup_stats"
+
+    day = Column(Date, primary_key=True)
+    role = Column(Enum(UserRole), primary_key=True)
+    signups = Column(Integer, nullable=False, default=0)
+
+class DailyActiveUser(Base):
+    """Which users were active on a day; only used to de-duplicate DailyActivityStat."""
+    __tablename__ = "daily_active_users"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+class DailyActivityStat(Base):
+    __tablename__ = "daily_activity_stats"
+
+    day = Column(Date, primary_key=True)
+    active_users = Column(Integer, nullable=False, default=0)
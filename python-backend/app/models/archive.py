@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKeyConstraint
+from app.core.database import Base
+
+class ArchiveEntry(Base):
+    """One member of an uploaded ZIP/TAR archive, as read from its directory/headers."""
+    __tablename__ = "archive_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(Integer, nullable=False, index=True)
+    tenant_id = Column(Integer, nullable=False)  # The file's tenant; files is keyed (and partitioned) by it
+    name = Column(String, nullable=False)  # Path of the member inside the archive
+    archive_format = Column(String, nullable=False)  # zip, tar, tar.gz, tar.bz2, tar.xz
+    size = Column(BigInteger, nullable=False)  # Uncompressed size in bytes
+    compressed_size = Column(BigInteger, nullable=False)
+    offset = Column(BigInteger, nullable=False)  # zip: local header offset, tar: data offset
+    compression = Column(Integer, nullable=True)  # zip compression method
+    is_dir = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        ForeignKeyConstraint(["file_id", "tenant_id"], ["files.id", "files.tenant_id"], ondelete="CASCADE"),
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, JSON, Index, Sequence
+from app.core.database import Base
+
+class AuditEvent(Base):
+    """
+    Append-only audit/event log. On PostgreSQL the table is range-partitioned by
+    month on created_at (see audit_log.maintain_partitions), so old months are
+    dropped as whole partitions instead of being deleted row by row.
+    """
+    __tablename__ = "audit_events"
+
+    id = Column(BigInteger, Sequence("audit_events_id_seq"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), primary_key=True)  # Partition key, so part of the PK
+    level = Column(String(16), nullable=False)  # INFO, WARNING, ERROR
+    source = Column(String(32), nullable=False)  # auth, files, user_management, ...
+    action = Column(String(64), nullable=False)
+    message = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=True)  # No FK: events outlive the users they mention
+    details = Column(JSON(none_as_null=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_audit_events_created_at", "created_at"),
+        Index("ix_audit_events_level_created_at", "level", "created_at"),
+        Index("ix_audit_events_source_created_at", "source", "created_at"),
+        Index("ix_audit_events_user_id_created_at", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
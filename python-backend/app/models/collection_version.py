@@ -0,0 +1,9 @@
+from sqlalchemy import Column, BigInteger, String
+from app.core.database import Base
+
+class CollectionVersion(Base):
+    """Change counter per collection (e.g. "users", "files:42"), bumped by every write to it; drives ETags."""
+    __tablename__ = "collection_versions"
+
+    name = Column(String(128), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index, Sequence
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, number_with_counter
 import enum
 
 class FileType(str, enum.Enum):
@@ -13,9 +13,15 @@ class FileType(str, enum.Enum):
     OTHER = "other"
 
 class File(Base):
+    """
+    An uploaded or generated file. On PostgreSQL the table is hash-partitioned by
+    tenant_id (see file_service.ensure_file_partitions), so queries that carry the
+    tenant only touch that tenant's partition.
+    """
     __tablename__ = "files"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, Sequence("files_id_seq"), primary_key=True, index=True)
+    tenant_id = Column(Integer, primary_key=True)  # Partition key, so part of the PK; always the owner's tenant
     filename = Column(String, nullable=False)  # Stored filename
     original_filename = Column(String, nullable=False)  # Original user filename
     file_type = Column(Enum(FileType), nullable=False)
@@ -23,9 +29,31 @@ class File(Base):
     file_size = Column(Integer, nullable=False)  # Size in bytes
     file_path = Column(String, nullable=False)  # Relative path from uploads directory
     mime_type = Column(String, nullable=False)
+    checksum = Column(String(64), nullable=True)  # SHA-256 of the stored bytes
+    entries_indexed_at = Column(DateTime(timezone=True), nullable=True)  # Archives only: when archive_entries was built
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationship
     user = relationship("User", back_populates="files")
+
+    __table_args__ = (
+        # Trigram index for filename search, scoped by user (needs pg_trgm + btree_gin)
+        Index(
+            "ix_files_user_original_filename_trgm",
+            "user_id",
+            "original_filename",
+            postgresql_using="gin",
+            postgresql_ops={"original_filename": "gin_trgm_ops"}
+        ),
+        # The storage scrubber looks up each batch of blobs it walks by path
+        Index("ix_files_file_path", "file_path"),
+        {"postgresql_partition_by": "HASH (tenant_id)"},
+    )
+
+    # Fetch server-generated timestamps in the INSERT/UPDATE itself (RETURNING), so change events can include them
+    __mapper_args__ = {"eager_defaults": True}
+
+# Without sequences, the id is only half of a composite key and nothing would number it
+number_with_counter(File)
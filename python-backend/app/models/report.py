@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, ForeignKeyConstraint, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class RenderedReport(Base):
+    """Cache of rendered report PDFs: a hash of the report input -> the user's stored file."""
+    __tablename__ = "rendered_reports"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    content_hash = Column(String(64), nullable=False)  # report_pdf.report_hash of the input
+    file_id = Column(Integer, nullable=False, index=True)
+    tenant_id = Column(Integer, nullable=False)  # The file's tenant; files is keyed (and partitioned) by it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "content_hash", name="uq_rendered_reports_user_hash"),
+        ForeignKeyConstraint(["file_id", "tenant_id"], ["files.id", "files.tenant_id"], ondelete="CASCADE"),
+    )
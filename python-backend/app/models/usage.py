@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, Enum
+from sqlalchemy.sql import func
+from app.core.database import Base
+from app.models.file import FileType
+
+class StorageUsage(Base):
+    """Materialized per-user, per-type storage counters kept in step with the files table."""
+    __tablename__ = "storage_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    file_type = Column(Enum(FileType), primary_key=True)
+    file_count = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from app.core.config import DEFAULT_TENANT_ID
 from app.core.database import Base
 import enum
 
@@ -21,8 +22,30 @@ class User(Base):
     password = Column(String, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.user, nullable=False)
     is_active = Column(Integer, default=1, nullable=False) # Using Integer for SQLite compatibility (0=False, 1=True)
+    tenant_id = Column(Integer, default=DEFAULT_TENANT_ID, server_default=str(DEFAULT_TENANT_ID), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
     files = relationship("File", back_populates="user", lazy="dynamic")
+
+    __table_args__ = (
+        # Case-insensitive email lookups and email prefix (type-ahead) searches. Unique, so
+        # addresses differing only in case can't both exist (the lookups pick exactly one row)
+        Index(
+            "ix_users_email_lower_unique",
+            func.lower(email).label("email_lower"),
+            unique=True,
+            postgresql_ops={"email_lower": "text_pattern_ops"}
+        ),
+        # Fuzzy/substring name search (needs pg_trgm)
+        Index(
+            "ix_users_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
+
+    # Fetch server-generated timestamps in the INSERT/UPDATE itself (RETURNING), so change events can include them
+    __mapper_args__ = {"eager_defaults": True}
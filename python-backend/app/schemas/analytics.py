@@ -0,0 +1,52 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import date
+from app.models.file import FileType
+from app.models.user import UserRole
+
+class DailyUploads(BaseModel):
+    day: date
+    file_type: FileType
+    upload_count: int
+    total_bytes: int
+
+    class Config:
+        from_attributes = True
+
+class DailySignups(BaseModel):
+    day: date
+    role: UserRole
+    signups: int
+
+    class Config:
+        from_attributes = True
+
+class DailyActiveUsers(BaseModel):
+    day: date
+    active_users: int
+
+    class Config:
+        from_attributes = True
+
+class UserStorage(BaseModel):
+    user_id: int
+    file_count: int
+    total_bytes: int
+
+class UploadAnalyticsResponse(BaseModel):
+    start: date
+    end: date
+    days: List[DailyUploads]
+
+class SignupAnalyticsResponse(BaseModel):
+    start: date
+    end: date
+    days: List[DailySignups]
+
+class ActiveUserAnalyticsResponse(BaseModel):
+    start: date
+    end: date
+    days: List[DailyActiveUsers]
+
+class StorageAnalyticsResponse(BaseModel):
+    users: List[UserStorage]
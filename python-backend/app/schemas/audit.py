@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class AuditEventResponse(BaseModel):
+    id: int
+    created_at: datetime
+    level: str
+    source: str
+    action: str
+    message: str
+    user_id: Optional[int]
+    details: Optional[Dict[str, Any]]
+
+    class Config:
+        from_attributes = True
+
+class AuditEventListResponse(BaseModel):
+    events: List[AuditEventResponse]
+    next_cursor: Optional[str]
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Any, List, Literal, Optional
+
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None  # Echoed back so the client can match responses
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(..., description="e.g. /api/v1/users/role/admin or /users/role/admin?limit=5")
+    body: Optional[Any] = None  # JSON body for POST/PUT/PATCH
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1)
+
+class BatchSubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
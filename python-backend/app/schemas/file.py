@@ -27,3 +27,47 @@ class FileUploadResponse(BaseModel):
 class FileListResponse(BaseModel):
     files: List[FileResponse]
     total: int
+
+class FileSearchResponse(BaseModel):
+    files: List[FileResponse]
+    next_cursor: Optional[str]
+
+class BatchUploadItem(BaseModel):
+    original_filename: str
+    success: bool
+    error: Optional[str] = None
+    file: Optional[FileResponse] = None
+
+class BatchUploadResponse(BaseModel):
+    message: str
+    uploaded: int
+    failed: int
+    results: List[BatchUploadItem]
+
+class FileTypeUsage(BaseModel):
+    file_type: FileType
+    file_count: int
+    total_bytes: int
+
+class StorageUsageResponse(BaseModel):
+    user_id: int
+    file_count: int
+    total_bytes: int
+    quota_bytes: Optional[int]
+    by_type: List[FileTypeUsage]
+
+class ArchiveEntryResponse(BaseModel):
+    id: int
+    name: str
+    size: int
+    compressed_size: int
+    is_dir: bool
+    url: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+class ArchiveEntryListResponse(BaseModel):
+    file_id: int
+    entries: List[ArchiveEntryResponse]
+    total: int
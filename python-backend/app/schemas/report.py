@@ -0,0 +1,58 @@
+from pydantic import BaseModel, Field
+from pydantic.alias_generators import to_camel
+from typing import List
+from app.schemas.file import FileResponse
+
+class _CamelModel(BaseModel):
+    """Accepts the camelCase JSON the frontend builds its reports with."""
+
+    class Config:
+        alias_generator = to_camel
+        populate_by_name = True
+
+class VitalSigns(_CamelModel):
+    blood_pressure: str
+    heart_rate: float
+    temperature: float
+    respiratory_rate: float
+    oxygen_saturation: float
+    weight: float
+    height: float
+    bmi: float
+
+class LabResults(_CamelModel):
+    hemoglobin: float
+    white_blood_cells: float
+    platelets: float
+    glucose: float
+    creatinine: float
+    cholesterol: float
+    sodium: float
+    potassium: float
+
+class MedicalReport(_CamelModel):
+    patient_id: str
+    patient_name: str
+    date_of_birth: str
+    gender: str
+    contact_number: str
+    email: str
+    address: str
+    report_date: str
+    vital_signs: VitalSigns
+    lab_results: LabResults
+    medical_notes: str = ""
+    diagnosis: str
+    treatment: str
+    medications: List[str] = []
+    follow_up_date: str
+    doctor_name: str
+    doctor_specialty: str
+
+class ReportBatchRequest(BaseModel):
+    reports: List[MedicalReport] = Field(..., min_length=1)
+
+class ReportRenderResponse(BaseModel):
+    message: str
+    cached: bool
+    file: FileResponse
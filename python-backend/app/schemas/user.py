@@ -38,3 +38,8 @@ class TokenData(BaseModel):
     user: UserResponse
     token: str
     expires_at: int
+    refresh_token: str
+    refresh_expires_at: int
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
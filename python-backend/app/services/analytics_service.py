@@ -0,0 +1,125 @@
+import threading
+from datetime import date, datetime
+from typing import List, Optional, Set, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal, insert_ignore, upsert_increment
+from app.models.analytics import DailyUploadStat, DailySignupStat, DailyActiveUser, DailyActivityStat
+from app.models.file import File, FileType
+from app.models.usage import StorageUsage
+from app.models.user import User, UserRole
+
+# (day, user_id) pairs this worker has already recorded, so activity is written at most once per user per day
+_active_seen: Set[Tuple[date, int]] = set()
+_active_lock = threading.Lock()
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+def record_upload(db: Session, file_type: FileType, upload_count: int, total_bytes: int) -> None:
+    """Count uploads towards today's rollup. Does not commit."""
+    upsert_increment(
+        db,
+        DailyUploadStat,
+        keys={"day": _today(), "file_type": file_type},
+        increments={"upload_count": upload_count, "total_bytes": total_bytes}
+    )
+
+def record_signup(db: Session, role: UserRole) -> None:
+    """Count a new user towards today's rollup. Does not commit."""
+    upsert_increment(
+        db,
+        DailySignupStat,
+        keys={"day": _today(), "role": role},
+        increments={"signups": 1}
+    )
+
+def record_activity(db: Session, user_id: int) -> None:
+    """Mark a user active today, bumping the daily count the first time. Does not commit."""
+    day = _today()
+    if insert_ignore(db, DailyActiveUser, {"day": day, "user_id": user_id}):
+        upsert_increment(db, DailyActivityStat, keys={"day": day}, increments={"active_users": 1})
+
+def mark_active(user_id: int) -> None:
+    """
+    Record activity for an authenticated request. Cheap after the first call per user
+    per day, and uses its own session so it never touches the request's transaction.
+    """
+    key = (_today(), user_id)
+    with _active_lock:
+        if key in _active_seen:
+            return
+        if len(_active_seen) > 100_000:
+            _active_seen.clear()
+        _active_seen.add(key)
+
+    db = SessionLocal()
+    try:
+        record_activity(db, user_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        with _active_lock:
+            _active_seen.discard(key)
+        print(f"📈 mark_active: Could not record activity for user {user_id}: {e}")
+    finally:
+        db.close()
+
+def get_upload_stats(
+    db: Session, start: date, end: date, file_type: Optional[FileType] = None
+) -> List[DailyUploadStat]:
+    """Get daily upload rollups in [start, end]"""
+    query = db.query(DailyUploadStat).filter(DailyUploadStat.day >= start, DailyUploadStat.day <= end)
+    if file_type:
+        query = query.filter(DailyUploadStat.file_type == file_type)
+    return query.order_by(DailyUploadStat.day, DailyUploadStat.file_type).all()
+
+def get_signup_stats(
+    db: Session, start: date, end: date, role: Optional[UserRole] = None
+) -> List[DailySignupStat]:
+    """Get daily sign-up rollups in [start, end]"""
+    query = db.query(DailySignupStat).filter(DailySignupStat.day >= start, DailySignupStat.day <= end)
+    if role:
+        query = query.filter(DailySignupStat.role == role)
+    return query.order_by(DailySignupStat.day, DailySignupStat.role).all()
+
+def get_activity_stats(db: Session, start: date, end: date) -> List[DailyActivityStat]:
+    """Get daily active user counts in [start, end]"""
+    return db.query(DailyActivityStat).filter(
+        DailyActivityStat.day >= start, DailyActivityStat.day <= end
+    ).order_by(DailyActivityStat.day).all()
+
+def get_top_storage_users(db: Session, limit: int = 10) -> List[Tuple[int, int, int]]:
+    """Get (user_id, file_count, total_bytes) for the users storing the most bytes"""
+    total_bytes = func.sum(StorageUsage.total_bytes)
+    return db.query(
+        StorageUsage.user_id, func.sum(StorageUsage.file_count), total_bytes
+    ).group_by(StorageUsage.user_id).order_by(total_bytes.desc()).limit(limit).all()
+
+def backfill_rollups(db: Session) -> None:
+    """
+    Fill upload and sign-up rollups for days that have no rollup rows yet, from the source
+    tables. Used once when the rollups are introduced on an existing database; days already
+    maintained incrementally are left untouched.
+    """
+    upload_day = func.date(File.created_at)
+    known_upload_days = {str(day) for day in db.scalars(select(DailyUploadStat.day).distinct())}
+    for day, file_type, count, size in db.execute(
+        select(upload_day, File.file_type, func.count(File.id), func.coalesce(func.sum(File.file_size), 0))
+        .group_by(upload_day, File.file_type)
+    ):
+        if day is not None and str(day) not in known_upload_days:
+            db.add(DailyUploadStat(
+                day=date.fromisoformat(str(day)), file_type=file_type, upload_count=count, total_bytes=size
+            ))
+
+    signup_day = func.date(User.created_at)
+    known_signup_days = {str(day) for day in db.scalars(select(DailySignupStat.day).distinct())}
+    for day, role, count in db.execute(
+        select(signup_day, User.role, func.count(User.id)).group_by(signup_day, User.role)
+    ):
+        if day is not None and str(day) not in known_signup_days:
+            db.add(DailySignupStat(day=date.fromisoformat(str(day)), role=role, signups=count))
+
+    db.commit()
+    print("📈 backfill_rollups: Analytics rollups backfilled")
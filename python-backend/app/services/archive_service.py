@@ -0,0 +1,226 @@
+import mmap
+import struct
+import tarfile
+import zipfile
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+from app.core.cache import cache, cache_key
+from app.core.config import UPLOADS_DIR
+from app.core.database import SessionLocal
+from app.models.archive import ArchiveEntry
+from app.models.file import File, FileType
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")  # signature, ..., name length, extra length
+_TAR_COMPRESSIONS = {b"\x1f\x8b": "gz", b"BZh": "bz2", b"\xfd7zXZ\x00": "xz"}
+
+class UnsupportedArchiveError(Exception):
+    """Raised for archives that can't be indexed (RAR, 7z, plain gzip, corrupt files)."""
+
+def _tar_compression(path: Path) -> Optional[str]:
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, compression in _TAR_COMPRESSIONS.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+def _zip_entries(file_id: int, path: Path) -> List[ArchiveEntry]:
+    """Read the central directory only, through a memory map so nothing else is paged in."""
+    if path.stat().st_size < mmap.PAGESIZE:
+        # zipfile seeks before the start of an archive with no members, which a file allows but a map doesn't
+        with zipfile.ZipFile(path) as archive:
+            return _zip_infos(file_id, archive)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with zipfile.ZipFile(mapped) as archive:
+            return _zip_infos(file_id, archive)
+
+def _zip_infos(file_id: int, archive: zipfile.ZipFile) -> List[ArchiveEntry]:
+    return [
+        ArchiveEntry(
+            file_id=file_id,
+            name=info.filename,
+            archive_format="zip",
+            size=info.file_size,
+            compressed_size=info.compress_size,
+            offset=info.header_offset,
+            compression=info.compress_type,
+            is_dir=info.is_dir()
+        )
+        for info in archive.infolist()
+    ]
+
+def _tar_entries(file_id: int, path: Path) -> List[ArchiveEntry]:
+    """Walk the tar headers. Uncompressed tars are mapped and member data is skipped by seeking."""
+    compression = _tar_compression(path)
+    archive_format = f"tar.{compression}" if compression else "tar"
+
+    def entries(archive: tarfile.TarFile) -> List[ArchiveEntry]:
+        return [
+            ArchiveEntry(
+                file_id=file_id,
+                name=member.name,
+                archive_format=archive_format,
+                size=member.size,
+                compressed_size=member.size,
+                offset=member.offset_data,
+                compression=None,
+                is_dir=member.isdir()
+            )
+            for member in archive
+            if member.isfile() or member.isdir()
+        ]
+
+    if compression:
+        # Compressed tars have no random access; stream through the headers once
+        with tarfile.open(path, mode=f"r|{compression}") as archive:
+            return entries(archive)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with tarfile.open(fileobj=mapped, mode="r:") as archive:
+            return entries(archive)
+
+def read_archive_entries(file_id: int, path: Path) -> List[ArchiveEntry]:
+    """Read the member list of a ZIP or TAR archive without extracting anything."""
+    try:
+        if path.stat().st_size == 0:
+            raise UnsupportedArchiveError("Archive is empty")
+        if zipfile.is_zipfile(path):
+            return _zip_entries(file_id, path)
+        if tarfile.is_tarfile(path):
+            return _tar_entries(file_id, path)
+    except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError, zlib.error) as e:
+        raise UnsupportedArchiveError(f"Archive could not be read: {e}")
+    raise UnsupportedArchiveError("Only ZIP and TAR archives can be indexed")
+
+def _claim(db: Session, file: File) -> bool:
+    """
+    Set the file's entries_indexed_at unless it is already set. The UPDATE holds the
+    file's row lock (SQLite: the write lock) until commit, so a second request for the
+    same archive waits for the first to finish and then finds nothing left to claim.
+    """
+    claimed = db.execute(
+        update(File)
+        .where(File.id == file.id, File.tenant_id == file.tenant_id, File.entries_indexed_at.is_(None))
+        # Indexing isn't a change to the file, so updated_at keeps its value
+        .values(entries_indexed_at=datetime.now(timezone.utc), updated_at=File.updated_at)
+    ).rowcount == 1
+    if claimed:
+        cache.invalidate(db, cache_key("file", file.id))
+    return claimed
+
+def index_archive(db: Session, file: File) -> bool:
+    """
+    Build the archive_entries rows for an uploaded archive, once. Returns False if it
+    was already indexed. If the archive can't be read nothing is recorded, so the
+    error is raised again on the next attempt.
+    """
+    if not _claim(db, file):
+        db.rollback()
+        return False
+    try:
+        entries = read_archive_entries(file.id, Path(UPLOADS_DIR) / file.file_path)
+    except UnsupportedArchiveError:
+        db.rollback()
+        raise
+    for entry in entries:
+        entry.tenant_id = file.tenant_id
+    # Rows from before entries_indexed_at was recorded
+    db.execute(delete(ArchiveEntry).where(ArchiveEntry.file_id == file.id))
+    db.add_all(entries)
+    db.commit()
+    print(f"🗜️ index_archive: Indexed {len(entries)} entries for file {file.id}")
+    return True
+
+def index_archive_job(file_id: int, tenant_id: int) -> None:
+    """Background entry point for index_archive with its own session"""
+    db = SessionLocal()
+    try:
+        file = db.query(File).filter(File.id == file_id, File.tenant_id == tenant_id).first()
+        if file is None or file.file_type != FileType.ARCHIVE:
+            return
+        index_archive(db, file)
+    except UnsupportedArchiveError as e:
+        print(f"🗜️ index_archive_job: Skipping file {file_id}: {e}")
+    finally:
+        db.close()
+
+def get_archive_entries(db: Session, file: File) -> List[ArchiveEntry]:
+    """
+    Get the members of an archive, indexing it now if the background indexer hasn't
+    yet. Reads the archive when it does, so call it from a worker thread.
+    """
+    if file.entries_indexed_at is None:
+        index_archive(db, file)
+    return db.query(ArchiveEntry).filter(ArchiveEntry.file_id == file.id).order_by(ArchiveEntry.id).all()
+
+def get_archive_entry(db: Session, file_id: int, entry_id: int) -> Optional[ArchiveEntry]:
+    """Get a single archive member"""
+    return db.query(ArchiveEntry).filter(
+        ArchiveEntry.id == entry_id,
+        ArchiveEntry.file_id == file_id
+    ).first()
+
+def _read_range(f, length: int) -> Iterator[bytes]:
+    while length > 0:
+        chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+        if not chunk:
+            raise UnsupportedArchiveError("Archive is truncated")
+        length -= len(chunk)
+        yield chunk
+
+def _stream_zip_member(path: Path, entry: ArchiveEntry) -> Iterator[bytes]:
+    if entry.compression not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        # Rare methods (bzip2, lzma): let zipfile handle them
+        with zipfile.ZipFile(path) as archive, archive.open(entry.name) as member:
+            yield from iter(lambda: member.read(STREAM_CHUNK_SIZE), b"")
+        return
+
+    with open(path, "rb") as f:
+        # Jump straight to the member's local header; its name/extra lengths give the data start
+        f.seek(entry.offset)
+        signature, name_length, extra_length = _ZIP_LOCAL_HEADER.unpack(f.read(_ZIP_LOCAL_HEADER.size))
+        if signature != b"PK\x03\x04":
+            raise UnsupportedArchiveError("Bad local file header")
+        f.seek(name_length + extra_length, 1)
+
+        if entry.compression == zipfile.ZIP_STORED:
+            yield from _read_range(f, entry.compressed_size)
+            return
+
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        for chunk in _read_range(f, entry.compressed_size):
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+def _stream_tar_member(path: Path, entry: ArchiveEntry) -> Iterator[bytes]:
+    if entry.archive_format == "tar":
+        with open(path, "rb") as f:
+            f.seek(entry.offset)
+            yield from _read_range(f, entry.size)
+        return
+
+    # Compressed tar: decompress up to the member, then stream it
+    compression = entry.archive_format.split(".", 1)[1]
+    with tarfile.open(path, mode=f"r|{compression}") as archive:
+        for member in archive:
+            if member.name == entry.name and member.isfile():
+                extracted = archive.extractfile(member)
+                yield from iter(lambda: extracted.read(STREAM_CHUNK_SIZE), b"")
+                return
+    raise UnsupportedArchiveError("Member not found in archive")
+
+def stream_archive_entry(file: File, entry: ArchiveEntry) -> Iterator[bytes]:
+    """Stream one member's bytes without extracting the rest of the archive"""
+    path = Path(UPLOADS_DIR) / file.file_path
+    if entry.archive_format == "zip":
+        return _stream_zip_member(path, entry)
+    return _stream_tar_member(path, entry)
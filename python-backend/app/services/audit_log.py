@@ -0,0 +1,254 @@
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Set
+from sqlalchemy import delete, text, tuple_
+from sqlalchemy.orm import Session
+from app.core.config import AUDIT_MAX_PENDING, AUDIT_RING_SIZE, AUDIT_RETENTION_DAYS
+from app.core.database import SessionLocal, engine, reserve_ids
+from app.core.pg_listener import pg_listener
+from app.models.audit import AuditEvent
+
+INFO = "INFO"
+WARNING = "WARNING"
+ERROR = "ERROR"
+
+# Postgres NOTIFY channel that carries events to the other workers' live tails
+CHANNEL = "audit_events"
+MAX_PAYLOAD_BYTES = 7900
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+class AuditLog:
+    """
+    Collects audit events off the request path.
+
+    record() only appends to in-memory buffers; a background job calls flush()
+    to write everything pending with one multi-row INSERT. Recent events are also
+    kept in a ring buffer and pushed to live subscribers (the SSE tail), so
+    tailing never polls the database.
+
+    Ring positions are numbered per process, so stream ids are "<epoch>:<seq>"
+    with an epoch drawn at startup; an id from another process (a restart, or
+    another worker) is not comparable and must not be resumed from. On
+    PostgreSQL each flush also NOTIFYs its events, so every worker's ring holds
+    every worker's events, a flush interval behind for events from elsewhere.
+    """
+
+    def __init__(self, ring_size: int = AUDIT_RING_SIZE, max_pending: int = AUDIT_MAX_PENDING):
+        self._lock = threading.Lock()
+        self._pending: List[dict] = []
+        self._max_pending = max_pending
+        self._ring = deque(maxlen=ring_size)
+        self._seq = 0
+        self.epoch = secrets.token_hex(4)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        pg_listener.add_handler(CHANNEL, self.receive)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Remember the event loop live subscribers are served from."""
+        self._loop = loop
+
+    def record(
+        self,
+        level: str,
+        source: str,
+        action: str,
+        message: str,
+        user_id: Optional[int] = None,
+        details: Optional[dict] = None
+    ) -> None:
+        """Queue an event. Safe to call from any thread; never touches the database."""
+        event = {
+            "created_at": datetime.now(timezone.utc),
+            "level": level,
+            "source": source,
+            "action": action,
+            "message": message,
+            "user_id": user_id,
+            "details": details,
+        }
+        with self._lock:
+            self._pending.append(event)
+            if len(self._pending) > self._max_pending:
+                dropped = len(self._pending) - self._max_pending
+                del self._pending[:dropped]
+                print(f"📝 AuditLog: Dropped {dropped} unflushed events")
+        self._publish(event)
+
+    def receive(self, payload: str) -> None:
+        """Add an event flushed by another worker to the live tail. Called on the listener thread."""
+        try:
+            origin, event = json.loads(payload)
+        except ValueError:
+            return
+        # This worker's own events went out when they were recorded
+        if origin != self.epoch:
+            self._publish(event)
+
+    def _publish(self, event: dict) -> None:
+        with self._lock:
+            self._seq += 1
+            live = {"seq": self._seq, **event}
+            self._ring.append(live)
+            subscribers = list(self._subscribers)
+
+        if subscribers and self._loop is not None and not self._loop.is_closed():
+            for queue in subscribers:
+                self._loop.call_soon_threadsafe(self._deliver, queue, live)
+
+    def event_id(self, event: dict) -> str:
+        """The SSE id of a ring event."""
+        return f"{self.epoch}:{event['seq']}"
+
+    def resume_point(self, last_event_id: Optional[str]) -> int:
+        """The ring seq a Last-Event-ID refers to, or 0 if it came from another process."""
+        epoch, _, seq = (last_event_id or "").partition(":")
+        if epoch != self.epoch or not seq.isdigit():
+            return 0
+        return int(seq)
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: dict) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client that can't keep up misses events rather than slowing everyone down
+            pass
+
+    def flush(self) -> int:
+        """Write every pending event in one INSERT. Returns the number written."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+
+        db = SessionLocal()
+        try:
+            # The id is only half of a composite key, so nothing but a sequence numbers it
+            ids = reserve_ids(db, AuditEvent, len(batch))
+            rows = batch if ids is None else [{**event, "id": id} for id, event in zip(ids, batch)]
+            db.execute(AuditEvent.__table__.insert(), rows)
+            if ids is None:
+                # PostgreSQL: NOTIFY in the same transaction, so a failed flush that is retried isn't announced twice
+                db.execute(
+                    text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                    {"channel": CHANNEL, "payloads": [self._notify_payload(event) for event in batch]}
+                )
+            db.commit()
+            return len(batch)
+        except Exception as e:
+            db.rollback()
+            print(f"📝 AuditLog: Flush of {len(batch)} events failed, will retry: {e}")
+            with self._lock:
+                self._pending[:0] = batch
+                del self._pending[:max(len(self._pending) - self._max_pending, 0)]
+            return 0
+        finally:
+            db.close()
+
+    def _notify_payload(self, event: dict) -> str:
+        payload = json.dumps([self.epoch, event], default=_json_default)
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            # Too big to NOTIFY: the tail gets the event without its details
+            payload = json.dumps([self.epoch, {**event, "details": None}], default=_json_default)
+        return payload
+
+    def subscribe(self, max_queued: int = 1000) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        with self._lock:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def recent(self, after_seq: int = 0) -> List[dict]:
+        """Events from the ring buffer newer than after_seq (used to resume a stream)."""
+        with self._lock:
+            return [event for event in self._ring if event["seq"] > after_seq]
+
+audit_log = AuditLog()
+
+def query_events(
+    db: Session,
+    level: Optional[str] = None,
+    source: Optional[str] = None,
+    action: Optional[str] = None,
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    before: Optional[tuple] = None,
+    limit: int = 50
+) -> List[AuditEvent]:
+    """Get events newest first. `before` is the (created_at, id) of the last event of the previous page."""
+    query = db.query(AuditEvent)
+    if level:
+        query = query.filter(AuditEvent.level == level)
+    if source:
+        query = query.filter(AuditEvent.source == source)
+    if action:
+        query = query.filter(AuditEvent.action == action)
+    if user_id is not None:
+        query = query.filter(AuditEvent.user_id == user_id)
+    if start:
+        query = query.filter(AuditEvent.created_at >= start)
+    if end:
+        query = query.filter(AuditEvent.created_at < end)
+    if before:
+        query = query.filter(tuple_(AuditEvent.created_at, AuditEvent.id) < tuple_(*before))
+    return query.order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(limit).all()
+
+def _month_start(day: date, months_ahead: int = 0) -> date:
+    month = day.month - 1 + months_ahead
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+def maintain_partitions(months_ahead: int = 2, retention_days: int = AUDIT_RETENTION_DAYS) -> None:
+    """
+    Keep monthly partitions created ahead of time and drop those past retention.
+    Outside PostgreSQL there are no partitions, so expired rows are deleted instead.
+    """
+    today = datetime.now(timezone.utc).date()
+    cutoff = today - timedelta(days=retention_days)
+
+    if engine.dialect.name != "postgresql":
+        db = SessionLocal()
+        try:
+            db.execute(delete(AuditEvent).where(AuditEvent.created_at < datetime.combine(cutoff, datetime.min.time())))
+            db.commit()
+        finally:
+            db.close()
+        return
+
+    with engine.begin() as conn:
+        for offset in range(-1, months_ahead + 1):
+            start = _month_start(today, offset)
+            end = _month_start(start, 1)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS audit_events_{start:%Y_%m} PARTITION OF audit_events "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+
+        partitions = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'audit_events'"
+        )).scalars().all()
+        for name in partitions:
+            try:
+                year, month = (int(part) for part in name.rsplit("_", 2)[-2:])
+            except ValueError:
+                continue
+            # A partition can go once every row in it is past retention
+            if _month_start(date(year, month, 1), 1) <= cutoff:
+                conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                print(f"📝 maintain_partitions: Dropped expired partition {name}")
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.core.pg_listener import pg_listener
+
+# Postgres NOTIFY channel; payloads must stay under its 8000 byte limit
+CHANNEL = "app_changes"
+MAX_PAYLOAD_BYTES = 7900
+
+FILE_CREATED = "file.created"
+FILE_DELETED = "file.deleted"
+USER_CREATED = "user.created"
+USER_ROLE_CHANGED = "user.role_changed"
+USER_DELETED = "user.deleted"
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+class ChangeBus:
+    """
+    Fans out small change events (file created, role changed, ...) to live SSE subscribers.
+
+    Events are queued on the session that made the change and only go out once it
+    commits. On PostgreSQL they are sent with NOTIFY inside the committing
+    transaction and every worker - this one included - receives them through a
+    LISTEN connection, so subscribers on any worker see every change. Elsewhere
+    (single process) they are delivered in-process after the commit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_user: Dict[int, Set[asyncio.Queue]] = {}
+        self._admins: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        pg_listener.add_handler(CHANNEL, self.dispatch)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Remember the event loop subscribers are served from."""
+        self._loop = loop
+
+    def subscribe(self, user_id: int, is_admin: bool, max_queued: int = 1000) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        with self._lock:
+            self._by_user.setdefault(user_id, set()).add(queue)
+            if is_admin:
+                self._admins.add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            queues = self._by_user.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._by_user[user_id]
+            self._admins.discard(queue)
+
+    def publish(self, db: Session, event_type: str, user_id: int, data: dict, admins: bool = False) -> None:
+        """
+        Queue a change on `db`; it is sent when the session commits and dropped if it rolls back.
+        The event reaches `user_id`'s subscribers, and every admin's when `admins` is set.
+        """
+        payload = json.dumps(
+            {"type": event_type, "user_id": user_id, "admins": admins, "data": data},
+            default=_json_default
+        )
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            # Too big to NOTIFY: send the ids only and let the client fetch the rest
+            payload = json.dumps(
+                {"type": event_type, "user_id": user_id, "admins": admins, "data": {"id": data.get("id")}}
+            )
+        db.info.setdefault("pending_changes", []).append(payload)
+
+    def dispatch(self, payload: str) -> None:
+        """Hand an event to the subscribers it is addressed to. Safe to call from any thread."""
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            return
+        with self._lock:
+            queues = set(self._by_user.get(change["user_id"], ()))
+            if change.get("admins"):
+                queues |= self._admins
+        if not queues or self._loop is None or self._loop.is_closed():
+            return
+        message = {"type": change["type"], "data": change["data"]}
+        for queue in queues:
+            self._loop.call_soon_threadsafe(self._deliver, queue, message)
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, message: dict) -> None:
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client that can't keep up misses events rather than slowing everyone down
+            pass
+
+change_bus = ChangeBus()
+
+@event.listens_for(Session, "before_commit")
+def _notify_pending_changes(session: Session) -> None:
+    """Send queued changes with NOTIFY as part of the committing transaction (PostgreSQL only)."""
+    pending: List[str] = session.info.get("pending_changes")
+    if not pending or session.get_bind().dialect.name != "postgresql":
+        return
+    session.info["pending_changes"] = []
+    # One statement for the whole batch, however many changes the transaction made
+    session.execute(
+        text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+        {"channel": CHANNEL, "payloads": pending}
+    )
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending_changes(session: Session) -> None:
+    """Without NOTIFY, deliver queued changes in-process once they are committed."""
+    pending = session.info.pop("pending_changes", None)
+    for payload in pending or ():
+        change_bus.dispatch(payload)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_changes(session: Session, previous_transaction) -> None:
+    session.info.pop("pending_changes", None)
@@ -0,0 +1,32 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.cache import cache, cache_key
+from app.core.database import upsert_increment
+from app.models.collection_version import CollectionVersion
+
+USERS = "users"
+
+def user_files(user_id: int) -> str:
+    """The collection of one user's files"""
+    return f"files:{user_id}"
+
+def bump_version(db: Session, collection: str) -> None:
+    """
+    Mark a collection as changed. Does not commit: call it inside the transaction
+    that makes the change, so a poll never sees the new version with the old rows.
+    """
+    upsert_increment(db, CollectionVersion, keys={"name": collection}, increments={"version": 1})
+    cache.invalidate(db, cache_key("version", collection))
+
+def get_version(db: Session, collection: str) -> int:
+    """Current version of a collection (0 until its first change); usually a cache hit"""
+    key = cache_key("version", collection)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    generation = cache.generation()
+    version = db.scalar(select(CollectionVersion.version).where(CollectionVersion.name == collection)) or 0
+    # A replica may not have replayed the latest bump yet; only the primary's answer is worth keeping
+    if not db.info.get("replica"):
+        cache.set(key, version, generation)
+    return version
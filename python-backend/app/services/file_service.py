@@ -1,48 +1,74 @@
 import os
 import uuid
-import mimetypes
+import asyncio
+import json
+import base64
+import hashlib
+import aiofiles
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from fastapi import UploadFile
+from sqlalchemy import REAL, and_, cast, func, insert, lambda_stmt, literal, or_, select, text
 from sqlalchemy.orm import Session
 from app.models.file import File, FileType
+from app.core.cache import cache, cache_key, cached_row, load_cached
+from app.core.config import UPLOADS_DIR, UPLOAD_CHUNK_SIZE, UPLOAD_BATCH_CONCURRENCY, FILES_PARTITIONS
+from app.core.database import engine, reserve_ids
+from app.services.file_types import SNIFF_BYTES, classify
+from app.services.usage_service import QuotaExceededError, get_remaining_quota, record_usage
+from app.services.analytics_service import record_upload
+from app.services.change_events import change_bus, FILE_CREATED, FILE_DELETED
+from app.services.collection_versions import bump_version, user_files
+
+class _QuotaBudget:
+    """Bytes a user may still store, shared by every stream of one upload request."""
+
+    def __init__(self, remaining: Optional[int]):
+        self.remaining = remaining
+
+    def consume(self, size: int) -> None:
+        if self.remaining is None:
+            return
+        if size > self.remaining:
+            raise QuotaExceededError("Storage quota exceeded")
+        self.remaining -= size
+
+    def release(self, size: int) -> None:
+        if self.remaining is not None:
+            self.remaining += size
+
+def _file_change(file: File) -> dict:
+    """The FileResponse fields of a file, for change events"""
+    return {
+        "id": file.id,
+        "filename": file.filename,
+        "original_filename": file.original_filename,
+        "file_type": file.file_type,
+        "file_extension": file.file_extension,
+        "file_size": file.file_size,
+        "file_path": file.file_path,
+        "mime_type": file.mime_type,
+        "user_id": file.user_id,
+        "created_at": file.created_at,
+        "updated_at": file.updated_at,
+        "url": f"/api/v1/files/{file.id}/download",
+    }
 
 class FileService:
-    def __init__(self, db: Session):
+    """
+    File storage for the users of one tenant. Every query carries tenant_id, so on
+    PostgreSQL it is pruned to that tenant's partition of files.
+    """
+
+    def __init__(self, db: Session, tenant_id: int):
         self.db = db
-        self.uploads_dir = Path("uploads")
+        self.tenant_id = tenant_id
+        self.uploads_dir = Path(UPLOADS_DIR)
         self.uploads_dir.mkdir(exist_ok=True)
         print(f"🔧 FileService: Uploads directory: {self.uploads_dir.absolute()}")
         print(f"🔧 FileService: Directory exists: {self.uploads_dir.exists()}")
         print(f"🔧 FileService: Directory writable: {os.access(self.uploads_dir, os.W_OK)}")
 
-    def _get_file_type(self, filename: str, mime_type: str) -> FileType:
-        """Determine file type based on extension and MIME type."""
-        extension = Path(filename).suffix.lower()
-        
-        # Image files
-        if extension in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'] or 'image/' in mime_type:
-            return FileType.IMAGE
-        
-        # Document files
-        elif extension in ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt'] or 'application/pdf' in mime_type or 'application/msword' in mime_type:
-            return FileType.DOCUMENT
-        
-        # Video files
-        elif extension in ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm'] or 'video/' in mime_type:
-            return FileType.VIDEO
-        
-        # Audio files
-        elif extension in ['.mp3', '.wav', '.flac', '.aac', '.ogg'] or 'audio/' in mime_type:
-            return FileType.AUDIO
-        
-        # Archive files
-        elif extension in ['.zip', '.rar', '.7z', '.tar', '.gz'] or 'application/zip' in mime_type:
-            return FileType.ARCHIVE
-        
-        else:
-            return FileType.OTHER
-
     def _create_user_directory(self, user_id: int, file_type: FileType) -> Path:
         """Create user-specific directory structure."""
         user_dir = self.uploads_dir / "user" / str(user_id) / file_type.value
@@ -55,61 +81,191 @@ class FileService:
         unique_id = str(uuid.uuid4())
         return f"{unique_id}{extension}"
 
-    async def upload_file(self, file: UploadFile, user_id: int) -> File:
-        """Upload a file and store metadata in database."""
-        print(f"🔧 FileService.upload_file: Starting upload for user {user_id}")
-        
-        # Read file content
-        content = await file.read()
-        file_size = len(content)
-        print(f"🔧 FileService.upload_file: File size: {file_size} bytes")
-        
-        # Determine file type
-        file_type = self._get_file_type(file.filename, file.content_type or "")
-        print(f"🔧 FileService.upload_file: File type: {file_type}")
-        
-        # Create user directory
+    async def _store_upload(self, file: UploadFile, user_id: int, budget: _QuotaBudget) -> dict:
+        """
+        Stream an upload to disk chunk by chunk and return the column values for its row.
+        Stops as soon as the user's quota budget runs out.
+        """
+        if file.size is not None and budget.remaining is not None and file.size > budget.remaining:
+            raise QuotaExceededError("Storage quota exceeded")
+
+        # The first chunk both decides the type (and so the directory) and is the first thing written
+        chunk = await file.read(max(UPLOAD_CHUNK_SIZE, SNIFF_BYTES))
+        file_type, mime_type = classify(chunk, file.filename, file.content_type or "")
         user_dir = self._create_user_directory(user_id, file_type)
-        print(f"🔧 FileService.upload_file: User directory: {user_dir}")
-        
-        # Generate unique filename
         stored_filename = self._generate_unique_filename(file.filename)
         file_path = user_dir / stored_filename
-        print(f"🔧 FileService.upload_file: File path: {file_path}")
-        
-        # Save file to disk
-        with open(file_path, "wb") as f:
-            f.write(content)
-        print(f"🔧 FileService.upload_file: File saved to disk")
-        
-        # Create relative path for database
-        relative_path = str(file_path.relative_to(self.uploads_dir))
-        print(f"🔧 FileService.upload_file: Relative path: {relative_path}")
-        
-        # Create database record
-        db_file = File(
-            filename=stored_filename,
-            original_filename=file.filename,
-            file_type=file_type,
-            file_extension=Path(file.filename).suffix.lower(),
-            file_size=file_size,
-            file_path=relative_path,
-            mime_type=file.content_type or "application/octet-stream",
-            user_id=user_id
-        )
-        
+
+        file_size = 0
+        checksum = hashlib.sha256()
+        try:
+            async with aiofiles.open(file_path, "wb") as out:
+                while chunk:
+                    budget.consume(len(chunk))
+                    file_size += len(chunk)
+                    checksum.update(chunk)
+                    await out.write(chunk)
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        except Exception:
+            # Never leave a partially written blob behind, and give its bytes back
+            budget.release(file_size)
+            if file_path.exists():
+                file_path.unlink()
+            raise
+
+        return {
+            "filename": stored_filename,
+            "original_filename": file.filename,
+            "file_type": file_type,
+            "file_extension": Path(file.filename).suffix.lower(),
+            "file_size": file_size,
+            "file_path": str(file_path.relative_to(self.uploads_dir)),
+            "mime_type": mime_type,
+            "checksum": checksum.hexdigest(),
+            "user_id": user_id,
+            "tenant_id": self.tenant_id,
+        }
+
+    async def save_generated(self, user_id: int, filename: str, data: bytes) -> File:
+        """
+        Store bytes produced by the server (e.g. a rendered report) as one of the user's files,
+        subject to the same quota, usage and analytics bookkeeping as an upload.
+        """
+        remaining = get_remaining_quota(self.db, user_id)
+        if remaining is not None and len(data) > remaining:
+            raise QuotaExceededError("Storage quota exceeded")
+
+        file_type, mime_type = classify(data[:SNIFF_BYTES], filename, "")
+        file_path = self._create_user_directory(user_id, file_type) / self._generate_unique_filename(filename)
+        async with aiofiles.open(file_path, "wb") as out:
+            await out.write(data)
+
+        values = {
+            "filename": file_path.name,
+            "original_filename": filename,
+            "file_type": file_type,
+            "file_extension": Path(filename).suffix.lower(),
+            "file_size": len(data),
+            "file_path": str(file_path.relative_to(self.uploads_dir)),
+            "mime_type": mime_type,
+            "checksum": hashlib.sha256(data).hexdigest(),
+            "user_id": user_id,
+            "tenant_id": self.tenant_id,
+        }
+        return self._commit_stored(values)
+
+    def _commit_stored(self, values: dict) -> File:
+        """Insert the row for a stored blob along with its usage counters and rollups, or remove the blob."""
+        db_file = File(**values)
         self.db.add(db_file)
-        self.db.commit()
+        record_usage(self.db, values["user_id"], values["file_type"], 1, values["file_size"])
+        record_upload(self.db, values["file_type"], 1, values["file_size"])
+        bump_version(self.db, user_files(values["user_id"]))
+        try:
+            self.db.flush()
+            change_bus.publish(self.db, FILE_CREATED, values["user_id"], _file_change(db_file))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            self._remove_stored(values["file_path"])
+            raise
         self.db.refresh(db_file)
+        return db_file
+
+    def _remove_stored(self, relative_path: str) -> None:
+        """Remove a stored blob, ignoring files that are already gone."""
+        full_path = self.uploads_dir / relative_path
+        if full_path.exists():
+            full_path.unlink()
+
+    async def upload_file(self, file: UploadFile, user_id: int) -> File:
+        """Upload a file and store metadata in database."""
+        print(f"🔧 FileService.upload_file: Starting upload for user {user_id}")
+        
+        # Stream file content to disk
+        budget = _QuotaBudget(get_remaining_quota(self.db, user_id))
+        values = await self._store_upload(file, user_id, budget)
+        print(f"🔧 FileService.upload_file: Saved {values['file_size']} bytes to {values['file_path']}")
+        
+        # Create database record and update usage counters and rollups in the same transaction
+        db_file = self._commit_stored(values)
         print(f"🔧 FileService.upload_file: Database record created, ID: {db_file.id}")
         
         return db_file
 
+    async def upload_files(
+        self, files: List[UploadFile], user_id: int
+    ) -> List[Tuple[UploadFile, Optional[File], Optional[str]]]:
+        """
+        Upload several files in one go.
+
+        Files are streamed to disk concurrently (bounded by UPLOAD_BATCH_CONCURRENCY)
+        and every successfully stored file is inserted with a single multi-row
+        INSERT ... RETURNING in one transaction. Returns one (upload, file, error)
+        tuple per input, in input order; a failed file does not fail the batch.
+        """
+        print(f"🔧 FileService.upload_files: Starting batch of {len(files)} files for user {user_id}")
+        semaphore = asyncio.Semaphore(UPLOAD_BATCH_CONCURRENCY)
+        budget = _QuotaBudget(get_remaining_quota(self.db, user_id))
+
+        async def store(upload: UploadFile):
+            async with semaphore:
+                try:
+                    return await self._store_upload(upload, user_id, budget), None
+                except Exception as e:
+                    print(f"🔧 FileService.upload_files: Failed to store {upload.filename}: {e}")
+                    return None, str(e)
+
+        stored = await asyncio.gather(*(store(upload) for upload in files))
+        rows = [values for values, _ in stored if values is not None]
+
+        inserted: List[File] = []
+        if rows:
+            try:
+                # Bulk inserts skip mapper events, so number the rows here where there's no sequence
+                ids = reserve_ids(self.db, File, len(rows))
+                if ids is not None:
+                    for values, file_id in zip(rows, ids):
+                        values["id"] = file_id
+                inserted = list(self.db.scalars(
+                    insert(File).returning(File, sort_by_parameter_order=True),
+                    rows
+                ).all())
+                # Detach the returned rows so the commit doesn't expire them and
+                # trigger a refresh query per file when the response is built
+                for db_file in inserted:
+                    self.db.expunge(db_file)
+                usage = {}
+                for values in rows:
+                    count, size = usage.get(values["file_type"], (0, 0))
+                    usage[values["file_type"]] = (count + 1, size + values["file_size"])
+                for file_type, (count, size) in usage.items():
+                    record_usage(self.db, user_id, file_type, count, size)
+                    record_upload(self.db, file_type, count, size)
+                bump_version(self.db, user_files(user_id))
+                for db_file in inserted:
+                    change_bus.publish(self.db, FILE_CREATED, user_id, _file_change(db_file))
+                self.db.commit()
+            except Exception as e:
+                # The rows go in together or not at all, so drop every blob we wrote
+                self.db.rollback()
+                for values in rows:
+                    self._remove_stored(values["file_path"])
+                print(f"🔧 FileService.upload_files: Database insert failed: {e}")
+                return [(upload, None, error or f"Database insert failed: {e}") for upload, (_, error) in zip(files, stored)]
+
+        inserted_iter = iter(inserted)
+        results = []
+        for upload, (values, error) in zip(files, stored):
+            results.append((upload, next(inserted_iter) if values is not None else None, error))
+        print(f"🔧 FileService.upload_files: Inserted {len(inserted)} of {len(files)} files")
+        return results
+
     def get_user_files(self, user_id: int, file_type: Optional[str] = None) -> List[File]:
         """Get all files for a user, optionally filtered by type."""
         print(f"🔧 FileService.get_user_files: user_id={user_id}, file_type={file_type}")
         
-        query = self.db.query(File).filter(File.user_id == user_id)
+        query = self.db.query(File).filter(File.tenant_id == self.tenant_id, File.user_id == user_id)
         
         if file_type:
             query = query.filter(File.file_type == file_type)
@@ -119,12 +275,75 @@ class FileService:
         
         return files
 
+    def search_files(
+        self,
+        user_id: int,
+        query: str,
+        file_type: Optional[FileType] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[File], Optional[str]]:
+        """
+        Search a user's files by original filename, best matches first.
+
+        On Postgres this is a substring/trigram-similarity match ranked by similarity
+        and served by the trigram index; elsewhere it falls back to a substring match
+        ordered newest first. Pagination is keyset based: pass the returned cursor
+        to get the next page. Raises ValueError for a malformed cursor.
+        """
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        name_matches = File.original_filename.ilike(f"%{escaped}%", escape="\\")
+        postgres = self.db.get_bind().dialect.name == "postgresql"
+
+        if postgres:
+            score = func.similarity(File.original_filename, query)
+            matches = or_(name_matches, File.original_filename.op("%")(query))
+        else:
+            score = literal(0.0)
+            matches = name_matches
+
+        stmt = self.db.query(File, score).filter(File.tenant_id == self.tenant_id, File.user_id == user_id, matches)
+        if file_type:
+            stmt = stmt.filter(File.file_type == file_type)
+
+        if cursor:
+            try:
+                last_score, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+                last_score, last_id = float(last_score), int(last_id)
+            except Exception:
+                raise ValueError("Invalid cursor")
+            if postgres:
+                # similarity() is a float4; compare against a float4 so ties on the score are exact
+                last_score = cast(last_score, REAL)
+                stmt = stmt.filter(or_(score < last_score, and_(score == last_score, File.id < last_id)))
+            else:
+                stmt = stmt.filter(File.id < last_id)
+
+        rows = stmt.order_by(score.desc(), File.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_file, last_score = rows[-1]
+            next_cursor = base64.urlsafe_b64encode(
+                json.dumps([float(last_score), last_file.id]).encode()
+            ).decode()
+
+        return [file for file, _ in rows], next_cursor
+
     def get_file_by_id(self, file_id: int, user_id: int) -> Optional[File]:
         """Get a specific file by ID, ensuring it belongs to the user."""
-        return self.db.query(File).filter(
-            File.id == file_id,
-            File.user_id == user_id
-        ).first()
+        values = cache.get(cache_key("file", file_id))
+        if values is not None:
+            return load_cached(self.db, File, values) if values["user_id"] == user_id else None
+        generation = cache.generation()
+        tenant_id = self.tenant_id  # Lambda statements track closure variables, not attributes of self
+        file = self.db.execute(
+            lambda_stmt(lambda: select(File).where(File.id == file_id, File.tenant_id == tenant_id).limit(1))
+        ).scalars().first()
+        if file is None:
+            return None
+        cache.set(cache_key("file", file.id), cached_row(file), generation)
+        return file if file.user_id == user_id else None
 
     def get_file_path(self, file_id: int, user_id: int) -> Optional[str]:
         """Get the full file path for a file."""
@@ -141,13 +360,52 @@ class FileService:
         if not file:
             return False
         
-        # Delete from storage
-        full_path = self.uploads_dir / file.file_path
-        if full_path.exists():
-            full_path.unlink()
+        relative_path = file.file_path
         
-        # Delete from database
+        # Delete from database and update usage counters in the same transaction
+        record_usage(self.db, user_id, file.file_type, -1, -file.file_size)
+        cache.invalidate(self.db, cache_key("file", file_id))
+        bump_version(self.db, user_files(user_id))
+        change_bus.publish(self.db, FILE_DELETED, user_id, {"id": file_id})
         self.db.delete(file)
         self.db.commit()
         
+        # Delete from storage only once the row is gone; a blob left behind by a
+        # crash here is an orphan that the storage scrubber reclaims
+        try:
+            self._remove_stored(relative_path)
+        except OSError as e:
+            print(f"🔧 FileService.delete_file: Could not remove {relative_path}: {e}")
+        
         return True
+
+def ensure_file_partitions(bind=engine, partitions: int = FILES_PARTITIONS) -> None:
+    """
+    Create the hash partitions of files (PostgreSQL only). The partition count is
+    fixed once files has partitions; a table created before partitioning is left
+    alone until partition_files.py moves it over.
+    """
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        partitioned = conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = 'files' AND c.relnamespace = 'public'::regnamespace"
+        )).first()
+        if partitioned is None:
+            print("📁 ensure_file_partitions: files is not partitioned yet; run partition_files.py to migrate it")
+            return
+        existing = conn.execute(text(
+            "SELECT count(*) FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'files' AND p.relnamespace = 'public'::regnamespace"
+        )).scalar()
+        if existing:
+            if existing != partitions:
+                print(f"📁 ensure_file_partitions: files has {existing} partitions, FILES_PARTITIONS={partitions} ignored")
+            return
+        for remainder in range(partitions):
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS files_p{remainder} PARTITION OF files "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            ))
+        print(f"📁 ensure_file_partitions: Created {partitions} hash partitions of files")
@@ -0,0 +1,188 @@
+"""
+File type classification.
+
+Uploads are classified from their leading bytes first, since the client-supplied
+MIME type and extension are often wrong. The extension and MIME type are only
+used when no signature matches. All lookups are dictionary based so the cost
+does not grow with the size of the tables.
+"""
+
+import mimetypes
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.models.file import FileType
+
+# Bytes needed to see every signature below (the tar magic sits at offset 257)
+SNIFF_BYTES = 262
+
+EXTENSION_TYPES: Dict[str, FileType] = {
+    **dict.fromkeys(
+        [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".svg", ".heic", ".heif", ".avif"], FileType.IMAGE
+    ),
+    **dict.fromkeys([".pdf", ".doc", ".docx", ".txt", ".rtf", ".odt"], FileType.DOCUMENT),
+    **dict.fromkeys([".mp4", ".avi", ".mov", ".wmv", ".flv", ".webm"], FileType.VIDEO),
+    **dict.fromkeys([".mp3", ".wav", ".flac", ".aac", ".ogg"], FileType.AUDIO),
+    **dict.fromkeys([".zip", ".rar", ".7z", ".tar", ".gz"], FileType.ARCHIVE),
+}
+
+MIME_TYPES: Dict[str, FileType] = {
+    "application/pdf": FileType.DOCUMENT,
+    "application/msword": FileType.DOCUMENT,
+    "application/zip": FileType.ARCHIVE,
+}
+
+MIME_MAJOR_TYPES: Dict[str, FileType] = {
+    "image": FileType.IMAGE,
+    "video": FileType.VIDEO,
+    "audio": FileType.AUDIO,
+}
+
+# Office formats are ZIP containers; their extension decides whether a ZIP is a document
+_ZIP_DOCUMENT_EXTENSIONS = {".docx", ".odt", ".xlsx", ".pptx", ".ods", ".odp"}
+
+# (offset, magic, file type, mime type). A mime type of None means "resolved by _refine".
+_SIGNATURES: List[Tuple[int, bytes, FileType, Optional[str]]] = [
+    (0, b"\x89PNG\r\n\x1a\n", FileType.IMAGE, "image/png"),
+    (0, b"\xff\xd8\xff", FileType.IMAGE, "image/jpeg"),
+    (0, b"GIF87a", FileType.IMAGE, "image/gif"),
+    (0, b"GIF89a", FileType.IMAGE, "image/gif"),
+    (0, b"BM", FileType.IMAGE, None),
+    (0, b"%PDF-", FileType.DOCUMENT, "application/pdf"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", FileType.DOCUMENT, None),
+    (0, b"{\\rtf", FileType.DOCUMENT, "application/rtf"),
+    (0, b"\x1a\x45\xdf\xa3", FileType.VIDEO, "video/webm"),
+    (0, b"FLV\x01", FileType.VIDEO, "video/x-flv"),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", FileType.VIDEO, "video/x-ms-wmv"),
+    (0, b"ID3", FileType.AUDIO, "audio/mpeg"),
+    (0, b"\xff\xfb", FileType.AUDIO, "audio/mpeg"),
+    (0, b"\xff\xf3", FileType.AUDIO, "audio/mpeg"),
+    (0, b"\xff\xf1", FileType.AUDIO, "audio/aac"),
+    (0, b"\xff\xf9", FileType.AUDIO, "audio/aac"),
+    (0, b"fLaC", FileType.AUDIO, "audio/flac"),
+    (0, b"OggS", FileType.AUDIO, "audio/ogg"),
+    (0, b"PK\x03\x04", FileType.ARCHIVE, None),
+    (0, b"PK\x05\x06", FileType.ARCHIVE, "application/zip"),
+    (0, b"Rar!\x1a\x07", FileType.ARCHIVE, "application/vnd.rar"),
+    (0, b"7z\xbc\xaf\x27\x1c", FileType.ARCHIVE, "application/x-7z-compressed"),
+    (0, b"\x1f\x8b", FileType.ARCHIVE, "application/gzip"),
+    (0, b"RIFF", FileType.OTHER, None),
+    (4, b"ftyp", FileType.OTHER, None),
+    (257, b"ustar", FileType.ARCHIVE, "application/x-tar"),
+]
+
+_RIFF_FORMATS: Dict[bytes, Tuple[FileType, str]] = {
+    b"WEBP": (FileType.IMAGE, "image/webp"),
+    b"WAVE": (FileType.AUDIO, "audio/wav"),
+    b"AVI ": (FileType.VIDEO, "video/x-msvideo"),
+}
+
+# ISO base media files (MP4, QuickTime, HEIF, AVIF, ...) all start with ftyp; the major brand says which.
+# Brands not listed here fall through to the extension and client MIME type.
+_FTYP_BRANDS: Dict[bytes, Tuple[FileType, str]] = {
+    **dict.fromkeys(
+        [b"isom", b"iso2", b"iso4", b"iso5", b"iso6", b"mp41", b"mp42", b"avc1", b"dash", b"M4V ", b"M4VP", b"mmp4"],
+        (FileType.VIDEO, "video/mp4"),
+    ),
+    **dict.fromkeys([b"3gp4", b"3gp5", b"3gp6", b"3ge6", b"3gg6"], (FileType.VIDEO, "video/3gpp")),
+    **dict.fromkeys([b"3g2a", b"3g2b", b"3g2c"], (FileType.VIDEO, "video/3gpp2")),
+    b"qt  ": (FileType.VIDEO, "video/quicktime"),
+    b"M4A ": (FileType.AUDIO, "audio/mp4"),
+    b"M4B ": (FileType.AUDIO, "audio/mp4"),
+    **dict.fromkeys([b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx"], (FileType.IMAGE, "image/heic")),
+    **dict.fromkeys([b"mif1", b"msf1"], (FileType.IMAGE, "image/heif")),
+    **dict.fromkeys([b"avif", b"avis"], (FileType.IMAGE, "image/avif")),
+}
+
+# OLE2 compound files hold Word, Excel, PowerPoint and Outlook items alike; the extension says which
+_OLE2_MIME_TYPES: Dict[str, str] = {
+    ".doc": "application/msword",
+    ".xls": "application/vnd.ms-excel",
+    ".ppt": "application/vnd.ms-powerpoint",
+    ".msg": "application/vnd.ms-outlook",
+}
+
+# BITMAPINFOHEADER and its variants, by header size
+_BMP_DIB_HEADER_SIZES = {12, 40, 52, 56, 64, 108, 124}
+
+def _compile(signatures):
+    """Index offset-0 signatures by first byte; keep the few others in a short list."""
+    by_first_byte: Dict[int, List[Tuple[bytes, FileType, Optional[str]]]] = {}
+    offset_signatures = []
+    for offset, magic, file_type, mime in signatures:
+        if offset == 0:
+            by_first_byte.setdefault(magic[0], []).append((magic, file_type, mime))
+        else:
+            offset_signatures.append((offset, magic, file_type, mime))
+    # Longest magic first so e.g. a full PNG header wins over a shorter prefix
+    for candidates in by_first_byte.values():
+        candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+    return by_first_byte, offset_signatures
+
+_BY_FIRST_BYTE, _OFFSET_SIGNATURES = _compile(_SIGNATURES)
+
+def _is_bmp(head: bytes) -> bool:
+    """Check the BITMAPFILEHEADER behind "BM", which on its own matches plenty of text files."""
+    if len(head) < 18:
+        return False
+    file_size, reserved, pixel_offset, dib_size = struct.unpack_from("<IIII", head, 2)
+    return (
+        reserved == 0
+        and dib_size in _BMP_DIB_HEADER_SIZES
+        and 14 + dib_size <= pixel_offset <= file_size
+    )
+
+def _refine(magic: bytes, head: bytes, extension: str) -> Optional[Tuple[FileType, Optional[str]]]:
+    """Resolve container formats whose type depends on bytes after the magic."""
+    if magic == b"RIFF":
+        return _RIFF_FORMATS.get(head[8:12])
+    if magic == b"ftyp":
+        return _FTYP_BRANDS.get(head[8:12])
+    if magic == b"BM":
+        return (FileType.IMAGE, "image/bmp") if _is_bmp(head) else None
+    if magic == b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1":
+        # Left to the client MIME type when the extension isn't a known one
+        return FileType.DOCUMENT, _OLE2_MIME_TYPES.get(extension)
+    if magic == b"PK\x03\x04":
+        if extension in _ZIP_DOCUMENT_EXTENSIONS:
+            # Leave the precise office MIME type to the client / extension
+            return FileType.DOCUMENT, None
+        return FileType.ARCHIVE, "application/zip"
+    return None
+
+def sniff(head: bytes, extension: str = "") -> Optional[Tuple[FileType, Optional[str]]]:
+    """Match the leading bytes of a file against the signature table."""
+    if not head:
+        return None
+    for magic, file_type, mime in _BY_FIRST_BYTE.get(head[0], ()):
+        if head.startswith(magic):
+            if mime is None:
+                return _refine(magic, head, extension)
+            return file_type, mime
+    for offset, magic, file_type, mime in _OFFSET_SIGNATURES:
+        if head.startswith(magic, offset):
+            if mime is None:
+                return _refine(magic, head, extension)
+            return file_type, mime
+    return None
+
+def classify(head: bytes, filename: str, mime_type: str) -> Tuple[FileType, str]:
+    """
+    Classify an upload from its first bytes, falling back to the extension and then
+    the client MIME type. Returns the file type and the MIME type to store.
+    """
+    extension = Path(filename or "").suffix.lower()
+    mime_type = (mime_type or "").lower()
+    stored_mime = mime_type or mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+
+    sniffed = sniff(head, extension)
+    if sniffed is not None:
+        file_type, sniffed_mime = sniffed
+        return file_type, sniffed_mime or stored_mime
+
+    file_type = EXTENSION_TYPES.get(extension)
+    if file_type is None:
+        file_type = MIME_TYPES.get(mime_type)
+    if file_type is None:
+        file_type = MIME_MAJOR_TYPES.get(mime_type.split("/", 1)[0], FileType.OTHER)
+    return file_type, stored_mime
@@ -0,0 +1,158 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
+from app.core.config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_BACKEND, RATE_LIMIT_SHARED_PATH, RATE_LIMIT_MAX_BUCKETS
+)
+from app.core.node_local import private_file
+from app.models.user import User
+from app.services.user_service import get_current_user
+
+class LocalBuckets:
+    """
+    Token buckets in this worker's memory. A take() is a dict lookup and some
+    arithmetic under a lock, a microsecond or two. Limits hold per worker: with N
+    workers a client can get up to N times the configured rate.
+    """
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Take one token. Returns 0 if allowed, else the seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_buckets:
+                # The least recently seen client has the fullest bucket anyway
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / rate
+
+class SharedBuckets:
+    """
+    Token buckets in a SQLite file shared by every worker on the node, so limits
+    hold across workers. A take() is one UPSERT on a RAM-backed file, tens of
+    microseconds. If the file can't be written the request is allowed.
+    """
+
+    def __init__(self, path: str = "", max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.path = private_file("rate_limit.sqlite", path)
+        self.max_buckets = max_buckets
+        self._local = threading.local()
+        self._takes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, allowed INTEGER NOT NULL)"
+        )
+        print(f"🚦 SharedBuckets: Using {self.path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=0.5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        # Wall clock, since the timestamps are compared across processes
+        now = time.time()
+        try:
+            connection = self._connection()
+            # Refill and take in one atomic statement
+            tokens, allowed = connection.execute(
+                """
+                INSERT INTO buckets (key, tokens, updated_at, allowed) VALUES (:key, :burst - 1, :now, 1)
+                ON CONFLICT (key) DO UPDATE SET
+                    tokens = min(:burst, tokens + (:now - updated_at) * :rate)
+                        - (min(:burst, tokens + (:now - updated_at) * :rate) >= 1),
+                    allowed = min(:burst, tokens + (:now - updated_at) * :rate) >= 1,
+                    updated_at = :now
+                RETURNING tokens, allowed
+                """,
+                {"key": key, "burst": burst, "rate": rate, "now": now}
+            ).fetchone()
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                self._prune(connection)
+        except sqlite3.Error as e:
+            print(f"🚦 SharedBuckets: Failed, allowing request: {e}")
+            return 0.0
+        return 0.0 if allowed else (1 - tokens) / rate
+
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        excess = connection.execute("SELECT COUNT(*) FROM buckets").fetchone()[0] - self.max_buckets
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM buckets WHERE key IN (SELECT key FROM buckets ORDER BY updated_at LIMIT ?)", (excess,)
+            )
+
+def _create_backend():
+    if RATE_LIMIT_BACKEND == "shared":
+        return SharedBuckets(RATE_LIMIT_SHARED_PATH)
+    return LocalBuckets()
+
+buckets = _create_backend()
+
+def parse_limit(spec: str) -> Optional[Tuple[float, float]]:
+    """'<requests>/<seconds>' -> (tokens per second, burst), or None for an empty spec (no limit)"""
+    if not spec:
+        return None
+    requests, seconds = spec.split("/")
+    return float(requests) / float(seconds), float(requests)
+
+def _check(key: str, limit: Optional[Tuple[float, float]]) -> None:
+    if limit is None:
+        return
+    rate, burst = limit
+    retry_after = buckets.take(key, rate, burst)
+    if retry_after > 0:
+        print(f"🚦 rate_limit: Limited {key}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, slow down",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the real client
+    return request.client.host if request.client else "unknown"
+
+def limit_per_ip(name: str, spec: str):
+    """Dependency: at most `spec` ('<requests>/<seconds>') requests per client IP to routes named `name`"""
+    limit = parse_limit(spec)
+
+    def dependency(request: Request) -> None:
+        if RATE_LIMIT_ENABLED:
+            _check(f"{name}:ip:{client_ip(request)}", limit)
+
+    return dependency
+
+def limit_per_user(name: str, user_spec: str, ip_spec: str = ""):
+    """
+    Dependency: at most `user_spec` requests per authenticated user (and `ip_spec`
+    per client IP, if given) to routes named `name`. Reuses the route's own
+    get_current_user, so the user is looked up once per request.
+    """
+    user_limit = parse_limit(user_spec)
+    ip_limit = parse_limit(ip_spec)
+
+    def dependency(request: Request, current_user: User = Depends(get_current_user)) -> None:
+        if RATE_LIMIT_ENABLED:
+            _check(f"{name}:ip:{client_ip(request)}", ip_limit)
+            _check(f"{name}:user:{current_user.id}", user_limit)
+
+    return dependency
@@ -0,0 +1,125 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import REFRESH_TOKEN_EXPIRE_DAYS
+from app.core.database import SessionLocal
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.services.audit_log import audit_log, WARNING
+from app.services.user_service import get_user_by_id
+
+def _hash_token(token: str) -> str:
+    # Tokens are 256 random bits, so a fast unsalted hash is enough and keeps the lookup indexable
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> Tuple[str, int]:
+    """
+    Create a refresh token for the user, starting a new family unless one is given.
+    The caller commits. Returns (token, expires_at in milliseconds).
+    """
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(RefreshToken(
+        user_id=user_id,
+        family_id=family_id or secrets.token_hex(16),
+        token_hash=_hash_token(token),
+        expires_at=expires_at
+    ))
+    return token, int(expires_at.timestamp() * 1000)
+
+def _revoke_family(db: Session, family_id: str) -> int:
+    return db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.now(timezone.utc)}, synchronize_session=False)
+
+def rotate_refresh_token(db: Session, token: str) -> Optional[Tuple[User, str, int]]:
+    """
+    Exchange a refresh token for a new one in the same family.
+
+    One indexed lookup by token hash, plus the (cached) user; no password hashing.
+    A token that was already rotated or revoked revokes its whole family.
+    Returns (user, new token, expires_at in milliseconds), or None if the token can't be used.
+    """
+    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash_token(token)).first()
+    if stored is None:
+        print("🔐 rotate_refresh_token: Unknown refresh token")
+        return None
+
+    now = datetime.now(timezone.utc)
+    if stored.used_at is None and stored.revoked_at is None:
+        # Claim the token atomically, so two concurrent refreshes can't both rotate it
+        claimed = db.query(RefreshToken).filter(
+            RefreshToken.id == stored.id,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.used_at: now}, synchronize_session=False)
+    else:
+        claimed = 0
+
+    if not claimed:
+        revoked = _revoke_family(db, stored.family_id)
+        db.commit()
+        if revoked:
+            print(f"🔐 rotate_refresh_token: Reuse detected, revoked family {stored.family_id} of user {stored.user_id}")
+            audit_log.record(
+                WARNING, "auth", "refresh_token_reused",
+                f"Refresh token reused; revoked {revoked} session token(s)", user_id=stored.user_id,
+                details={"family_id": stored.family_id}
+            )
+        return None
+
+    if _as_utc(stored.expires_at) <= now:
+        db.commit()
+        print(f"🔐 rotate_refresh_token: Refresh token expired for user {stored.user_id}")
+        return None
+
+    user = get_user_by_id(db, stored.user_id)
+    if user is None or user.is_active != 1:
+        _revoke_family(db, stored.family_id)
+        db.commit()
+        return None
+
+    new_token, expires_at = issue_refresh_token(db, user.id, stored.family_id)
+    db.commit()
+    return user, new_token, expires_at
+
+def revoke_refresh_token(db: Session, token: str) -> bool:
+    """Log out: revoke the token's family. Returns False for an unknown token."""
+    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash_token(token)).first()
+    if stored is None:
+        return False
+    _revoke_family(db, stored.family_id)
+    db.commit()
+    return True
+
+def revoke_user_refresh_tokens(db: Session, user_id: int) -> None:
+    """Revoke every refresh token of the user (e.g. after a password change). The caller commits."""
+    db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.now(timezone.utc)}, synchronize_session=False)
+
+def purge_refresh_tokens(db: Session) -> int:
+    """Delete expired tokens. Rotated/revoked ones are kept until expiry for reuse detection."""
+    deleted = db.query(RefreshToken).filter(
+        RefreshToken.expires_at < datetime.now(timezone.utc)
+    ).delete(synchronize_session=False)
+    db.commit()
+    if deleted:
+        print(f"🔐 purge_refresh_tokens: Deleted {deleted} expired refresh tokens")
+    return deleted
+
+def purge_refresh_tokens_job() -> None:
+    """Periodic entry point for purge_refresh_tokens with its own session"""
+    db = SessionLocal()
+    try:
+        purge_refresh_tokens(db)
+    finally:
+        db.close()
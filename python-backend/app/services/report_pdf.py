@@ -0,0 +1,292 @@
+"""
+Medical report PDF rendering.
+
+A small, dependency-free PDF writer for the fixed report layout the admin
+create-data pages used to produce in the browser. It only uses the standard
+Helvetica fonts (nothing is embedded) and compresses page content, so reports
+are a few KB. Output is deterministic - no timestamps or random ids - so equal
+input always yields identical bytes, which is what makes caching by a hash of
+the input safe.
+
+Everything here runs inside worker processes, so it only deals in plain dicts
+and bytes.
+"""
+
+import hashlib
+import json
+import zlib
+from typing import Dict, List, Tuple
+
+# Bump when the layout changes so cached renders are not reused
+RENDERER_VERSION = "1"
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+HOSPITAL_NAME = "Evergreen Wellness Hospital"
+HOSPITAL_ADDRESS = "123 Harmony Street Sunnyville, CA 90210 USA"
+FOOTER_LINES = [
+    "For inquiries and appointments, feel free to contact us.",
+    "phone: +1 (555) 123-4567, email: info@EvergreenWellnessHospital.com",
+    "www.EvergreenWellnessHospital.com",
+]
+
+GREEN = (0.09, 0.64, 0.29)
+DARK = (0.12, 0.16, 0.22)
+GRAY = (0.29, 0.33, 0.39)
+
+# Advance widths (1/1000 em) of printable ASCII, from the Helvetica AFM files
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+_FONTS = {"F1": ("Helvetica", _HELVETICA), "F2": ("Helvetica-Bold", _HELVETICA_BOLD)}
+
+def report_hash(report: dict) -> str:
+    """Content hash of a report: canonical JSON of the input plus the renderer version."""
+    canonical = json.dumps(report, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{RENDERER_VERSION}:{canonical}".encode("utf-8")).hexdigest()
+
+def _encode(text: str) -> bytes:
+    return str(text).encode("cp1252", errors="replace")
+
+def _text_width(text: str, font: str, size: float) -> float:
+    widths = _FONTS[font][1]
+    total = 0
+    for byte in _encode(text):
+        total += widths[byte - 32] if 32 <= byte <= 126 else 556
+    return total * size / 1000
+
+def _wrap(text: str, font: str, size: float, width: float) -> List[str]:
+    lines: List[str] = []
+    for paragraph in str(text).splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and _text_width(candidate, font, size) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+def _escape(data: bytes) -> bytes:
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").replace(b"\r", b"")
+
+class _Layout:
+    """Lays text out top to bottom, starting a new page when one is full."""
+
+    def __init__(self):
+        self.pages: List[List[bytes]] = []
+        self._new_page()
+
+    def _new_page(self) -> None:
+        self.ops: List[bytes] = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def _ensure(self, height: float) -> None:
+        if self.y - height < MARGIN + 60:  # Keep clear of the footer
+            self._new_page()
+
+    def text(self, text: str, font: str = "F1", size: float = 10, color=DARK, x: float = MARGIN, center: bool = False) -> None:
+        if center:
+            x = (PAGE_WIDTH - _text_width(text, font, size)) / 2
+        self.ops.append(
+            b"BT /%s %.1f Tf %.3f %.3f %.3f rg %.2f %.2f Td (%s) Tj ET" % (
+                font.encode(), size, *color, x, self.y, _escape(_encode(text))
+            )
+        )
+
+    def line(self, text: str, font: str = "F1", size: float = 10, color=DARK, gap: float = 4, center: bool = False) -> None:
+        self._ensure(size + gap)
+        self.y -= size
+        self.text(text, font, size, color, center=center)
+        self.y -= gap
+
+    def paragraph(self, text: str, size: float = 10, color=DARK) -> None:
+        for line in _wrap(text, "F1", size, CONTENT_WIDTH):
+            self.line(line, size=size, color=color, gap=4)
+
+    def heading(self, text: str) -> None:
+        self._ensure(60)  # Don't leave a heading alone at the bottom of a page
+        self.y -= 10
+        self.line(text, "F2", 13, GREEN, gap=6)
+
+    def fields(self, pairs: List[Tuple[str, str]], columns: int = 2) -> None:
+        column_width = CONTENT_WIDTH / columns
+        for row in range(0, len(pairs), columns):
+            self._ensure(14)
+            self.y -= 10
+            for column, (label, value) in enumerate(pairs[row:row + columns]):
+                x = MARGIN + column * column_width
+                label = f"{label}: "
+                self.text(label, "F2", 10, x=x)
+                self.text(str(value), "F1", 10, GRAY, x=x + _text_width(label, "F2", 10))
+            self.y -= 4
+
+    def rule(self) -> None:
+        self._ensure(12)
+        self.y -= 6
+        self.ops.append(b"0.85 0.85 0.85 RG 0.8 w %d %.2f m %d %.2f l S" % (MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y))
+        self.y -= 6
+
+def _dotted_date(value: str) -> str:
+    """YYYY-MM-DD -> DD.MM.YYYY, as the browser version printed dates"""
+    parts = str(value).split("-")
+    return ".".join(reversed(parts)) if len(parts) == 3 else str(value)
+
+def _plain(value):
+    """Print 72.0 as 72, as the browser did for whole-number readings"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _layout_report(report: dict) -> _Layout:
+    layout = _Layout()
+    layout.line(HOSPITAL_NAME, "F2", 18, GREEN, gap=6, center=True)
+    layout.line(HOSPITAL_ADDRESS, "F1", 9, GRAY, gap=12, center=True)
+    layout.line("MEDICAL REPORT", "F2", 22, DARK, gap=8, center=True)
+    layout.rule()
+
+    layout.heading("Visit Info")
+    layout.fields([
+        ("Doctor's Name", report["doctor_name"]),
+        ("Specialization", report["doctor_specialty"]),
+        ("Visit Date", _dotted_date(report["report_date"])),
+        ("Follow-up", _dotted_date(report["follow_up_date"])),
+    ])
+
+    layout.heading("Patient Info")
+    layout.fields([
+        ("Full Name", report["patient_name"]),
+        ("Birth Date", _dotted_date(report["date_of_birth"])),
+        ("Med. Number", report["patient_id"]),
+        ("Gender", report["gender"]),
+        ("Phone", report["contact_number"]),
+        ("Email", report["email"]),
+    ])
+    layout.fields([("Address", report["address"])], columns=1)
+
+    vitals = {key: _plain(value) for key, value in report["vital_signs"].items()}
+    layout.heading("Vital Signs")
+    layout.fields([
+        ("Blood Pressure", vitals["blood_pressure"]),
+        ("Heart Rate", f"{vitals['heart_rate']} bpm"),
+        ("Temperature", f"{vitals['temperature']} °F"),
+        ("Respiratory Rate", f"{vitals['respiratory_rate']} /min"),
+        ("Oxygen Saturation", f"{vitals['oxygen_saturation']} %"),
+        ("BMI", vitals["bmi"]),
+        ("Weight", f"{vitals['weight']} kg"),
+        ("Height", f"{vitals['height']} cm"),
+    ])
+
+    labs = {key: _plain(value) for key, value in report["lab_results"].items()}
+    layout.heading("Lab Results")
+    layout.fields([
+        ("Hemoglobin", f"{labs['hemoglobin']} g/dL"),
+        ("White Blood Cells", f"{labs['white_blood_cells']} K/uL"),
+        ("Platelets", f"{labs['platelets']} K/uL"),
+        ("Glucose", f"{labs['glucose']} mg/dL"),
+        ("Creatinine", f"{labs['creatinine']} mg/dL"),
+        ("Cholesterol", f"{labs['cholesterol']} mg/dL"),
+        ("Sodium", f"{labs['sodium']} mmol/L"),
+        ("Potassium", f"{labs['potassium']} mmol/L"),
+    ])
+
+    layout.heading("Diagnosis")
+    layout.paragraph(report["diagnosis"])
+    layout.heading("Treatment")
+    layout.paragraph(report["treatment"])
+
+    layout.heading("Prescription")
+    medications = [medication for medication in report["medications"] if medication]
+    if not medications or "No medications" in medications:
+        layout.paragraph("No prescription is necessary at this time.")
+    else:
+        layout.paragraph(
+            f"Prescribed medications: {', '.join(medications)}. "
+            "Follow the dosage instructions as directed by your healthcare provider."
+        )
+
+    if report.get("medical_notes"):
+        layout.heading("Medical Notes")
+        layout.paragraph(report["medical_notes"])
+    return layout
+
+def _footer(page_number: int, page_count: int) -> bytes:
+    ops = []
+    y = MARGIN + 30
+    for text in FOOTER_LINES:
+        x = (PAGE_WIDTH - _text_width(text, "F1", 8)) / 2
+        ops.append(b"BT /F1 8 Tf %.3f %.3f %.3f rg %.2f %.2f Td (%s) Tj ET" % (*GRAY, x, y, _escape(_encode(text))))
+        y -= 11
+    page_label = f"Page {page_number} of {page_count}"
+    x = PAGE_WIDTH - MARGIN - _text_width(page_label, "F1", 8)
+    ops.append(b"BT /F1 8 Tf %.3f %.3f %.3f rg %.2f %.2f Td (%s) Tj ET" % (*GRAY, x, y, _encode(page_label)))
+    return b"\n".join(ops)
+
+def _write_pdf(pages: List[bytes]) -> bytes:
+    """Serialise page content streams into a PDF with a cross-reference table."""
+    objects: Dict[int, bytes] = {}
+    font_ids = {name: 3 + index for index, name in enumerate(_FONTS)}
+    for name, object_id in font_ids.items():
+        objects[object_id] = (
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % _FONTS[name][0].encode()
+        )
+    fonts = b" ".join(b"/%s %d 0 R" % (name.encode(), object_id) for name, object_id in font_ids.items())
+
+    next_id = 3 + len(_FONTS)
+    page_ids = []
+    for content in pages:
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        compressed = zlib.compress(content, 9)
+        objects[content_id] = b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(compressed), compressed)
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << %s >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, fonts, content_id)
+        )
+        page_ids.append(page_id)
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id])
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for object_id in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[object_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def render_report_pdf(report: dict) -> bytes:
+    """Render one report (the snake_case dict of a MedicalReport) to PDF bytes."""
+    layout = _layout_report(report)
+    page_count = len(layout.pages)
+    pages = [
+        b"\n".join(ops) + b"\n" + _footer(number, page_count)
+        for number, ops in enumerate(layout.pages, start=1)
+    ]
+    return _write_pdf(pages)
+
+def render_report_batch(reports: List[dict]) -> List[bytes]:
+    """Render several reports in one worker call, to amortise the round trip for small reports."""
+    return [render_report_pdf(report) for report in reports]
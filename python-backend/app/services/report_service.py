@@ -0,0 +1,151 @@
+import asyncio
+import re
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import UPLOADS_DIR, REPORT_WORKERS, REPORT_MAX_QUEUED, REPORT_BATCH_CHUNK
+from app.core.process_pool import BoundedProcessPool
+from app.models.file import File
+from app.models.report import RenderedReport
+from app.models.user import User
+from app.services.file_service import FileService
+from app.services.report_pdf import render_report_pdf, render_report_batch, report_hash
+
+report_pool = BoundedProcessPool("report-renderer", REPORT_WORKERS, REPORT_MAX_QUEUED)
+
+def report_filename(report: dict) -> str:
+    """medical-report-<patient id>-<report date>.pdf, limited to filename-safe characters"""
+    stem = f"medical-report-{report['patient_id']}-{report['report_date']}"
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", stem)[:120] + ".pdf"
+
+def get_cached_reports(db: Session, user_id: int, hashes: List[str]) -> Dict[str, File]:
+    """Map content hash -> stored file for the reports this user has already rendered"""
+    if not hashes:
+        return {}
+    rows = db.query(RenderedReport.content_hash, File).join(
+        File, and_(File.id == RenderedReport.file_id, File.tenant_id == RenderedReport.tenant_id)
+    ).filter(
+        RenderedReport.user_id == user_id,
+        RenderedReport.content_hash.in_(hashes)
+    ).all()
+    return {content_hash: file for content_hash, file in rows}
+
+async def render_report(db: Session, user: User, report: dict) -> Tuple[File, bool]:
+    """
+    Render a report to PDF and store it as one of the user's files.
+
+    Rendering runs on the bounded report pool; PoolSaturatedError is raised when it is full.
+    A report identical to one the user already rendered returns the stored file without
+    rendering again. Returns (file, cached).
+    """
+    user_id = user.id
+    content_hash = report_hash(report)
+    file_service = FileService(db, user.tenant_id)
+    cached = get_cached_reports(db, user_id, [content_hash]).get(content_hash)
+    if cached is not None and (file_service.uploads_dir / cached.file_path).exists():
+        print(f"📄 render_report: Cache hit {content_hash[:12]} for user {user_id}")
+        return cached, True
+
+    pdf = await report_pool.run(render_report_pdf, report)
+    stored = await file_service.save_generated(user_id, report_filename(report), pdf)
+    try:
+        db.query(RenderedReport).filter(
+            RenderedReport.user_id == user_id,
+            RenderedReport.content_hash == content_hash
+        ).delete()  # A stale entry whose blob went missing
+        db.add(RenderedReport(user_id=user_id, content_hash=content_hash, file_id=stored.id, tenant_id=stored.tenant_id))
+        db.commit()
+    except IntegrityError:
+        # A concurrent request rendered the same report first; keep its file, not a duplicate
+        db.rollback()
+        winner = get_cached_reports(db, user_id, [content_hash]).get(content_hash)
+        if winner is not None:
+            file_service.delete_file(stored.id, user_id)
+            return winner, True
+        raise
+    print(f"📄 render_report: Rendered {content_hash[:12]} ({len(pdf)} bytes) for user {user_id}")
+    return stored, False
+
+class _ZipStream:
+    """Write-only sink for zipfile that hands back what was written so far."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def stream_report_batch(db: Session, user_id: int, reports: List[dict]) -> AsyncIterator[bytes]:
+    """
+    Render many reports and stream them back as one ZIP archive.
+
+    Reports the user already rendered come from the cache; the rest are rendered in
+    chunks of REPORT_BATCH_CHUNK across the report pool, and each PDF is written to
+    the archive as soon as its chunk finishes, so the first bytes go out long before
+    the last report is done. Failures are listed in errors.txt instead of failing
+    the whole archive. Batch output is not stored as files.
+    """
+    names = [f"{index + 1:04d}-{report_filename(report)}" for index, report in enumerate(reports)]
+    hashes = [report_hash(report) for report in reports]
+    uploads_dir = Path(UPLOADS_DIR)
+    cached = get_cached_reports(db, user_id, list(set(hashes)))
+    cached_paths = {content_hash: uploads_dir / file.file_path for content_hash, file in cached.items()}
+    # The database isn't needed past this point; release the connection for the rest of the stream
+    db.close()
+
+    sink = _ZipStream()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)  # PDF content is already compressed
+    errors: List[str] = []
+
+    pending: List[int] = []
+    for index, content_hash in enumerate(hashes):
+        path = cached_paths.get(content_hash)
+        if path is not None and path.exists():
+            archive.writestr(names[index], path.read_bytes())
+            yield sink.drain()
+        else:
+            pending.append(index)
+    print(f"📄 stream_report_batch: {len(reports) - len(pending)} cached, {len(pending)} to render for user {user_id}")
+
+    # At most one chunk per worker is outstanding, so a large batch never floods the pool's queue
+    slots = asyncio.Semaphore(report_pool.workers)
+
+    async def render_chunk(indexes: List[int]) -> Tuple[List[int], Optional[List[bytes]], Optional[str]]:
+        async with slots:
+            try:
+                return indexes, await report_pool.run(render_report_batch, [reports[i] for i in indexes], wait=True), None
+            except Exception as e:
+                return indexes, None, str(e)
+
+    chunks = [pending[i:i + REPORT_BATCH_CHUNK] for i in range(0, len(pending), REPORT_BATCH_CHUNK)]
+    tasks = [asyncio.ensure_future(render_chunk(chunk)) for chunk in chunks]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            indexes, pdfs, error = await finished
+            if error is not None:
+                errors.extend(f"{names[i]}: {error}" for i in indexes)
+                continue
+            for index, pdf in zip(indexes, pdfs):
+                archive.writestr(names[index], pdf)
+                yield sink.drain()
+    finally:
+        # Client went away mid-stream: don't keep rendering for nobody
+        for task in tasks:
+            task.cancel()
+
+    if errors:
+        archive.writestr("errors.txt", "\n".join(errors) + "\n")
+    archive.close()
+    yield sink.drain()
@@ -0,0 +1,213 @@
+import os
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import List, Optional, Tuple
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+from app.core.config import (
+    UPLOADS_DIR, SCRUB_BATCH_SIZE, SCRUB_WORKERS, SCRUB_MAX_BYTES_PER_SECOND,
+    SCRUB_ORPHAN_GRACE_SECONDS, SCRUB_RECLAIM_ORPHANS
+)
+from app.core.cache import cache, cache_key
+from app.core.database import SessionLocal
+from app.models.file import File
+
+# Cap on how many ids/paths each report list keeps, so a badly broken store doesn't blow up memory
+MAX_REPORTED_ITEMS = 1000
+
+def _inspect_blob(path: str) -> Tuple[Optional[int], Optional[str]]:
+    """Return (size, sha256) of a blob, or (None, None) if it is missing. Runs in a worker process."""
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                size += len(chunk)
+                digest.update(chunk)
+        return size, digest.hexdigest()
+    except FileNotFoundError:
+        return None, None
+
+class _IOThrottle:
+    """Token bucket over bytes read, so a scrub can run alongside production traffic."""
+
+    def __init__(self, bytes_per_second: int):
+        self.rate = bytes_per_second
+        self.allowance = float(bytes_per_second)
+        self.last = time.monotonic()
+
+    def wait(self, size: int) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.allowance = min(self.allowance + (now - self.last) * self.rate, float(self.rate))
+        self.last = now
+        self.allowance -= size
+        if self.allowance < 0:
+            time.sleep(-self.allowance / self.rate)
+
+@dataclass
+class ScrubReport:
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    rows_checked: int = 0
+    blobs_checked: int = 0
+    bytes_read: int = 0
+    checksums_backfilled: int = 0
+    missing_blobs: List[int] = field(default_factory=list)
+    checksum_mismatches: List[int] = field(default_factory=list)
+    size_mismatches: List[int] = field(default_factory=list)
+    orphans: List[str] = field(default_factory=list)
+    orphans_reclaimed: int = 0
+    bytes_reclaimed: int = 0
+
+    def note(self, items: list, item) -> None:
+        if len(items) < MAX_REPORTED_ITEMS:
+            items.append(item)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (
+            f"rows={self.rows_checked} missing={len(self.missing_blobs)} "
+            f"checksum_mismatch={len(self.checksum_mismatches)} size_mismatch={len(self.size_mismatches)} "
+            f"orphans={len(self.orphans)} reclaimed={self.orphans_reclaimed} ({self.bytes_reclaimed} bytes) "
+            f"backfilled={self.checksums_backfilled} read={self.bytes_read} bytes"
+        )
+
+class StorageScrubber:
+    """
+    Cross-checks the files table against the uploads directory:
+
+    * rows whose blob is missing,
+    * blobs whose size or SHA-256 no longer match the row (rows uploaded before
+      checksums were recorded get theirs backfilled),
+    * blobs with no row (orphans), optionally deleted to reclaim space.
+
+    Both sides are walked in batches; hashing runs on a process pool and total
+    read throughput is capped by a token bucket.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        uploads_dir: str = UPLOADS_DIR,
+        batch_size: int = SCRUB_BATCH_SIZE,
+        workers: int = SCRUB_WORKERS,
+        max_bytes_per_second: int = SCRUB_MAX_BYTES_PER_SECOND,
+        orphan_grace_seconds: int = SCRUB_ORPHAN_GRACE_SECONDS,
+        reclaim_orphans: bool = SCRUB_RECLAIM_ORPHANS,
+    ):
+        self.db = db
+        self.uploads_dir = Path(uploads_dir)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.throttle = _IOThrottle(max_bytes_per_second)
+        self.orphan_grace_seconds = orphan_grace_seconds
+        self.reclaim_orphans = reclaim_orphans
+
+    def run(self) -> ScrubReport:
+        """Run a full scrub and return its report."""
+        report = ScrubReport()
+        print(f"🧽 StorageScrubber: Starting scrub of {self.uploads_dir.absolute()}")
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self._check_rows(pool, report)
+        self._find_orphans(report)
+        report.finished_at = time.time()
+        print(f"🧽 StorageScrubber: Finished in {report.finished_at - report.started_at:.1f}s: {report.summary()}")
+        return report
+
+    def _check_rows(self, pool: ProcessPoolExecutor, report: ScrubReport) -> None:
+        last_id = 0
+        while True:
+            rows = self.db.execute(
+                select(File.id, File.file_path, File.file_size, File.checksum)
+                .where(File.id > last_id)
+                .order_by(File.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+
+            # Throttle on the expected bytes before handing the batch to the pool
+            for row in rows:
+                self.throttle.wait(row.file_size)
+            paths = [str(self.uploads_dir / row.file_path) for row in rows]
+            results = pool.map(_inspect_blob, paths, chunksize=max(1, len(paths) // (self.workers * 4)))
+
+            backfill = []
+            for row, (size, checksum) in zip(rows, results):
+                report.rows_checked += 1
+                if size is None:
+                    report.note(report.missing_blobs, row.id)
+                    continue
+                report.blobs_checked += 1
+                report.bytes_read += size
+                if size != row.file_size:
+                    report.note(report.size_mismatches, row.id)
+                elif row.checksum is None:
+                    backfill.append({"row_id": row.id, "checksum": checksum})
+                elif checksum != row.checksum:
+                    report.note(report.checksum_mismatches, row.id)
+
+            if backfill:
+                self.db.connection().execute(
+                    update(File.__table__)
+                    .where(File.__table__.c.id == bindparam("row_id"))
+                    .values(checksum=bindparam("checksum")),
+                    backfill
+                )
+                cache.invalidate(self.db, *(cache_key("file", item["row_id"]) for item in backfill))
+                report.checksums_backfilled += len(backfill)
+            # End the transaction per batch so a long scrub never pins an old snapshot
+            self.db.commit()
+
+    def _find_orphans(self, report: ScrubReport) -> None:
+        user_root = self.uploads_dir / "user"
+        if not user_root.exists():
+            return
+        cutoff = time.time() - self.orphan_grace_seconds
+        batch: List[Path] = []
+        for dirpath, _, filenames in os.walk(user_root):
+            for name in filenames:
+                batch.append(Path(dirpath) / name)
+                if len(batch) >= self.batch_size:
+                    self._check_orphan_batch(batch, cutoff, report)
+                    batch = []
+        if batch:
+            self._check_orphan_batch(batch, cutoff, report)
+
+    def _check_orphan_batch(self, paths: List[Path], cutoff: float, report: ScrubReport) -> None:
+        relative = {str(path.relative_to(self.uploads_dir)): path for path in paths}
+        known = set(self.db.scalars(select(File.file_path).where(File.file_path.in_(list(relative)))))
+        for relative_path, path in relative.items():
+            if relative_path in known:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            # Skip blobs young enough to belong to an upload that hasn't committed yet
+            if stat.st_mtime > cutoff:
+                continue
+            report.note(report.orphans, relative_path)
+            if self.reclaim_orphans:
+                try:
+                    path.unlink()
+                    report.orphans_reclaimed += 1
+                    report.bytes_reclaimed += stat.st_size
+                except OSError as e:
+                    print(f"🧽 StorageScrubber: Could not remove orphan {relative_path}: {e}")
+
+def scrub_storage_job() -> None:
+    """Periodic entry point for the scrubber with its own session"""
+    db = SessionLocal()
+    try:
+        StorageScrubber(db).run()
+    finally:
+        db.close()
@@ -0,0 +1,70 @@
+from typing import List, Optional
+from sqlalchemy import func, delete, insert, select
+from sqlalchemy.orm import Session
+from app.core.config import USER_STORAGE_QUOTA_BYTES
+from app.core.database import SessionLocal, upsert_increment
+from app.models.file import File, FileType
+from app.models.usage import StorageUsage
+
+class QuotaExceededError(Exception):
+    """Raised when an upload would take a user over their storage quota."""
+
+def record_usage(db: Session, user_id: int, file_type: FileType, file_count: int, total_bytes: int) -> None:
+    """
+    Add (or with negative values, subtract) to a user's usage counters.
+    Does not commit: call it inside the transaction that writes the files rows.
+    """
+    upsert_increment(
+        db,
+        StorageUsage,
+        keys={"user_id": user_id, "file_type": file_type},
+        increments={"file_count": file_count, "total_bytes": total_bytes}
+    )
+
+def get_usage(db: Session, user_id: int) -> List[StorageUsage]:
+    """Get a user's usage counters, one row per file type"""
+    return db.query(StorageUsage).filter(StorageUsage.user_id == user_id).all()
+
+def get_total_bytes(db: Session, user_id: int) -> int:
+    """Get the total number of bytes a user currently stores"""
+    total = db.query(func.coalesce(func.sum(StorageUsage.total_bytes), 0)).filter(
+        StorageUsage.user_id == user_id
+    ).scalar()
+    return int(total)
+
+def get_remaining_quota(db: Session, user_id: int) -> Optional[int]:
+    """Get how many more bytes a user may store, or None when quotas are disabled"""
+    if USER_STORAGE_QUOTA_BYTES <= 0:
+        return None
+    return max(USER_STORAGE_QUOTA_BYTES - get_total_bytes(db, user_id), 0)
+
+def reconcile_usage(db: Session) -> int:
+    """
+    Rebuild every usage counter from the files table in one transaction.
+    Corrects drift from crashes or out-of-band changes. Returns the number of counter rows.
+    """
+    totals = select(
+        File.user_id,
+        File.file_type,
+        func.count(File.id),
+        func.coalesce(func.sum(File.file_size), 0)
+    ).group_by(File.user_id, File.file_type)
+
+    db.execute(delete(StorageUsage))
+    db.execute(
+        insert(StorageUsage).from_select(
+            ["user_id", "file_type", "file_count", "total_bytes"], totals
+        )
+    )
+    db.commit()
+    rows = db.query(func.count()).select_from(StorageUsage).scalar()
+    print(f"📊 reconcile_usage: Rebuilt {rows} usage rows")
+    return rows
+
+def reconcile_usage_job() -> None:
+    """Periodic entry point for reconcile_usage with its own session"""
+    db = SessionLocal()
+    try:
+        reconcile_usage(db)
+    finally:
+        db.close()
@@ -1,22 +1,28 @@
+from contextvars import ContextVar
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, case, func, lambda_stmt, literal, or_, select
 from app.models.user import User, UserRole
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import UserCreate, UserUpdate, UserResponse
 from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 import jwt
-import hashlib
 from datetime import datetime, timedelta
-from typing import List, Optional
-from fastapi import Depends, HTTPException, status, Header
+from typing import List, Optional, Tuple
+from fastapi import Depends, HTTPException, status, Header, Query
+from app.core.cache import cache, cache_key, cached_row, load_cached
+from app.core.passwords import hash_password, verify_password, hash_password_pooled, verify_and_rehash_pooled
 from app.core.database import get_db
+from app.services.analytics_service import mark_active, record_signup
+from app.services.change_events import change_bus, USER_CREATED, USER_ROLE_CHANGED, USER_DELETED
+from app.services.collection_versions import USERS, bump_version
 
-def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# Set while a sub-request of POST /api/v1/batch runs: the user the batch already authenticated
+batch_user: ContextVar[Optional[User]] = ContextVar("batch_user", default=None)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    return hash_password(plain_password) == hashed_password
+def _publish_user_change(db: Session, event_type: str, user: User) -> None:
+    """Tell the user and every admin about a change to the user (sent on commit)"""
+    db.flush()
+    data = UserResponse.model_validate(user).model_dump(mode="json")
+    change_bus.publish(db, event_type, user.id, data, admins=True)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
@@ -54,27 +60,57 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 def create_user(db: Session, user: UserCreate) -> User:
-    """Create a new user"""
-    hashed_password = hash_password(user.password)
+    """Create a new user. Hashing runs on the password pool; raises PoolSaturatedError when it is full."""
+    hashed_password = hash_password_pooled(user.password)
     db_user = User(
         name=user.name,
-        email=user.email,
+        email=user.email.lower(),
         password=hashed_password,
         role=user.role,
         is_active=user.is_active
     )
     db.add(db_user)
+    record_signup(db, user.role)
+    bump_version(db, USERS)
+    _publish_user_change(db, USER_CREATED, db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
+def _cache_user(user: User, generation: Tuple[int, int]) -> None:
+    cache.set(cache_key("user", user.id), cached_row(user), generation)
+    cache.set(cache_key("user_email", user.email.lower()), user.id, generation)
+
+def _invalidate_user(db: Session, user: User) -> None:
+    cache.invalidate(db, cache_key("user", user.id), cache_key("user_email", user.email.lower()))
+
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
-    """Get user by email"""
-    return db.query(User).filter(User.email == email).first()
+    """Get user by email (case-insensitive, served by the lower(email) index, cached)"""
+    email = email.lower()
+    user_id = cache.get(cache_key("user_email", email))
+    if user_id is not None:
+        user = get_user_by_id(db, user_id)
+        if user is not None and user.email.lower() == email:
+            return user
+    generation = cache.generation()
+    # A lambda statement is built and compiled once; later calls only swap in the new email
+    user = db.execute(
+        lambda_stmt(lambda: select(User).where(func.lower(User.email) == email).limit(1))
+    ).scalars().first()
+    if user is not None:
+        _cache_user(user, generation)
+    return user
 
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
-    """Get user by ID"""
-    return db.query(User).filter(User.id == user_id).first()
+    """Get user by ID (cached)"""
+    values = cache.get(cache_key("user", user_id))
+    if values is not None:
+        return load_cached(db, User, values)
+    generation = cache.generation()
+    user = db.execute(lambda_stmt(lambda: select(User).where(User.id == user_id).limit(1))).scalars().first()
+    if user is not None:
+        _cache_user(user, generation)
+    return user
 
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
     """Get all users with pagination"""
@@ -84,17 +120,61 @@ def get_users_by_role(db: Session, role: UserRole, skip: int = 0, limit: int = 1
     """Get users by role with pagination"""
     return db.query(User).filter(User.role == role).offset(skip).limit(limit).all()
 
+def search_users(
+    db: Session,
+    query: str,
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    limit: int = 10
+) -> List[User]:
+    """
+    Type-ahead user search over name and email.
+    Email prefix matches rank first, then name prefix matches, then fuzzy name matches.
+    """
+    term = query.strip().lower()
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    email_prefix = func.lower(User.email).like(f"{escaped}%", escape="\\")
+    name_prefix = User.name.ilike(f"{escaped}%", escape="\\")
+
+    if "@" in term:
+        # Looks like an email: only the email index is useful
+        matches = email_prefix
+        score = literal(1.0)
+    else:
+        name_contains = User.name.ilike(f"%{escaped}%", escape="\\")
+        if db.get_bind().dialect.name == "postgresql":
+            matches = or_(email_prefix, name_contains, User.name.op("%")(term))
+            fuzzy = func.similarity(User.name, term)
+        else:
+            matches = or_(email_prefix, name_contains)
+            fuzzy = literal(0.0)
+        score = case((email_prefix, 3.0), (name_prefix, 2.0), else_=fuzzy)
+
+    stmt = db.query(User).filter(matches)
+    if role is not None:
+        stmt = stmt.filter(User.role == role)
+    if is_active is not None:
+        stmt = stmt.filter(User.is_active == (1 if is_active else 0))
+    return stmt.order_by(score.desc(), User.name, User.id).limit(limit).all()
+
 def update_user_role(db: Session, user_id: int, new_role: UserRole) -> Optional[User]:
     """Update user role"""
     user = get_user_by_id(db, user_id)
     if user:
         user.role = new_role
+        _invalidate_user(db, user)
+        bump_version(db, USERS)
+        _publish_user_change(db, USER_ROLE_CHANGED, user)
         db.commit()
         db.refresh(user)
     return user
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate user with email and password"""
+    """
+    Authenticate user with email and password.
+    Verification runs on the password pool (PoolSaturatedError when it is full); a legacy or
+    outdated hash is replaced by one with the current cost parameters once the password checks out.
+    """
     print(f"🔐 authenticate_user: Attempting authentication for email: {email}")
     user = get_user_by_email(db, email)
     if not user:
@@ -102,7 +182,8 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
         return None
     print(f"🔐 authenticate_user: User found - ID: {user.id}, Email: {user.email}, Active: {user.is_active}")
     
-    if not verify_password(password, user.password):
+    valid, upgraded_hash = verify_and_rehash_pooled(password, user.password)
+    if not valid:
         print(f"🔐 authenticate_user: Password verification failed for user: {email}")
         return None
     
@@ -110,6 +191,12 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
         print(f"🔐 authenticate_user: User is not active: {email}, is_active: {user.is_active}")
         return None
     
+    if upgraded_hash is not None:
+        user.password = upgraded_hash
+        _invalidate_user(db, user)
+        db.commit()
+        print(f"🔐 authenticate_user: Upgraded password hash for user: {email}")
+
     print(f"🔐 authenticate_user: Authentication successful for user: {email}")
     return user
 
@@ -117,6 +204,9 @@ def delete_user(db: Session, user_id: int) -> bool:
     """Delete user by ID"""
     user = get_user_by_id(db, user_id)
     if user:
+        _invalidate_user(db, user)
+        bump_version(db, USERS)
+        change_bus.publish(db, USER_DELETED, user.id, {"id": user.id}, admins=True)
         db.delete(user)
         db.commit()
         return True
@@ -124,6 +214,10 @@ def delete_user(db: Session, user_id: int) -> bool:
 
 def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)) -> User:
     """Get current authenticated user from token"""
+    authenticated = batch_user.get()
+    if authenticated is not None:
+        return authenticated
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -167,7 +261,29 @@ def get_current_user(authorization: str = Header(None), db: Session = Depends(ge
             raise credentials_exception
         
         print(f"🔐 get_current_user: User found: {user.email}")
+        # Lets a write made in this session keep the user's reads on the primary (see get_read_db)
+        db.info["subject"] = email
+        mark_active(user.id)
         return user
     except Exception as e:
         print(f"🔐 get_current_user: Exception: {e}")
         raise credentials_exception
+
+def get_current_user_for_stream(
+    authorization: str = Header(None),
+    access_token: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+) -> User:
+    """Like get_current_user, but also accepts ?access_token= since EventSource can't send headers"""
+    if not authorization and access_token:
+        authorization = f"Bearer {access_token}"
+    return get_current_user(authorization=authorization, db=db)
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Dependency that only lets admins through"""
+    if current_user.role != UserRole.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Load-test and benchmark suite for the API
+
+Boots the app with uvicorn against DATABASE_URL (or targets --base-url), drives
+each scenario at a fixed request rate and prints throughput and latency
+percentiles as JSON. Latency is measured from when a request was scheduled to be
+sent, not when it was, so a server that falls behind is not flattered by the
+client waiting for it (no coordinated omission).
+
+    python bench_api.py --rate 50 --duration 20 --output bench_results.json
+    python bench_api.py --save-baseline bench_baseline.json
+    python bench_api.py --baseline bench_baseline.json   # exits 1 on a regression
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+import httpx
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+class Context:
+    """What the scenarios share: the client, a logged-in user and the files set up for them"""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.headers: Dict[str, str] = {}
+        self.user_id: Optional[int] = None
+        self.download_id: Optional[int] = None
+        self.download_size = 0
+        self.upload_payload = self.random.randbytes(int(args.upload_mb * 1024 * 1024))
+        self.uploaded_ids: List[int] = []
+
+    async def setup(self) -> None:
+        credentials = {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+        response = await self.client.post("/api/v1/users/authenticate", json=credentials)
+        if response.status_code == 401:
+            signup = {"name": "Bench User", "is_active": True, "role": "user", **credentials}
+            (await self.client.post("/api/v1/users/", json=signup)).raise_for_status()
+            response = await self.client.post("/api/v1/users/authenticate", json=credentials)
+        response.raise_for_status()
+        body = response.json()
+        self.headers = {"Authorization": f"Bearer {body['token']}"}
+        self.user_id = body["user"]["id"]
+
+        data = self.random.randbytes(int(self.args.download_mb * 1024 * 1024))
+        response = await self.client.post(
+            "/api/v1/files/upload", headers=self.headers,
+            files={"file": ("bench-download.bin", data, "application/octet-stream")}
+        )
+        response.raise_for_status()
+        self.download_id = response.json()["file"]["id"]
+        self.download_size = len(data)
+
+    async def teardown(self) -> None:
+        for file_id in self.uploaded_ids + [self.download_id]:
+            if file_id is not None:
+                await self.client.delete(f"/api/v1/files/{file_id}", headers=self.headers)
+
+async def login(ctx: Context) -> int:
+    response = await ctx.client.post(
+        "/api/v1/users/authenticate", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+    )
+    return response.status_code
+
+async def get_user(ctx: Context) -> int:
+    return (await ctx.client.get(f"/api/v1/users/{ctx.user_id}", headers=ctx.headers)).status_code
+
+async def list_files(ctx: Context) -> int:
+    return (await ctx.client.get("/api/v1/files/", headers=ctx.headers)).status_code
+
+async def paginated_users(ctx: Context) -> int:
+    skip = ctx.random.randrange(0, ctx.args.max_skip + 1, 100)
+    response = await ctx.client.get("/api/v1/users/", params={"skip": skip, "limit": 100}, headers=ctx.headers)
+    return response.status_code
+
+async def upload(ctx: Context) -> int:
+    response = await ctx.client.post(
+        "/api/v1/files/upload", headers=ctx.headers,
+        files={"file": ("bench-upload.bin", ctx.upload_payload, "application/octet-stream")}
+    )
+    if response.status_code == 200:
+        ctx.uploaded_ids.append(response.json()["file"]["id"])
+    return response.status_code
+
+async def download_range(ctx: Context) -> int:
+    length = min(ctx.args.range_kb * 1024, ctx.download_size)
+    start = ctx.random.randrange(0, ctx.download_size - length + 1)
+    headers = {**ctx.headers, "Range": f"bytes={start}-{start + length - 1}"}
+    async with ctx.client.stream("GET", f"/api/v1/files/{ctx.download_id}/download", headers=headers) as response:
+        async for _ in response.aiter_bytes():
+            pass
+        return response.status_code
+
+# Relative weights of the mixed scenario: mostly cheap reads, some logins and a few uploads
+MIX = [(get_user, 40), (list_files, 25), (paginated_users, 15), (download_range, 10), (login, 5), (upload, 5)]
+
+async def mixed(ctx: Context) -> int:
+    scenario = ctx.random.choices([fn for fn, _ in MIX], weights=[weight for _, weight in MIX])[0]
+    return await scenario(ctx)
+
+SCENARIOS: Dict[str, Callable[[Context], Awaitable[int]]] = {
+    "login": login,
+    "get_user": get_user,
+    "list_files": list_files,
+    "paginated_users": paginated_users,
+    "upload": upload,
+    "download_range": download_range,
+    "mixed": mixed,
+}
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+async def run_scenario(ctx: Context, name: str, rate: float, duration: float) -> dict:
+    """Send `rate` requests per second for `duration` seconds (open loop) and summarise them"""
+    scenario = SCENARIOS[name]
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(ctx.args.max_in_flight)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def one(scheduled: float) -> None:
+        async with in_flight:
+            try:
+                status = str(await scenario(ctx))
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+        latencies.append(loop.time() - scheduled)
+        statuses[status] += 1
+
+    total = max(1, int(rate * duration))
+    started = loop.time()
+    tasks = []
+    for i in range(total):
+        scheduled = started + i / rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    return {
+        "requests": total,
+        "ok": ok,
+        "errors": total - ok,
+        "statuses": dict(sorted(statuses.items())),
+        "target_rps": rate,
+        "throughput_rps": round(ok / elapsed, 2),
+        "latency_ms": {
+            "mean": round(1000 * sum(latencies) / len(latencies), 2),
+            "p50": round(1000 * percentile(latencies, 0.50), 2),
+            "p95": round(1000 * percentile(latencies, 0.95), 2),
+            "p99": round(1000 * percentile(latencies, 0.99), 2),
+            "max": round(1000 * latencies[-1], 2),
+        },
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions against a baseline run: p95/p99 up, throughput down or errors up by more than `tolerance`"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        for key in ("p95", "p99"):
+            before, after = previous["latency_ms"][key], current["latency_ms"][key]
+            if after > before * (1 + tolerance):
+                regressions.append(f"{name}: {key} {before}ms -> {after}ms")
+        before, after = previous["throughput_rps"], current["throughput_rps"]
+        if after < before * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before} -> {after} req/s")
+        before_rate = previous["errors"] / max(1, previous["requests"])
+        after_rate = current["errors"] / max(1, current["requests"])
+        if after_rate > before_rate + tolerance / 10:
+            regressions.append(f"{name}: error rate {before_rate:.1%} -> {after_rate:.1%}")
+    return regressions
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def boot_server(args: argparse.Namespace) -> subprocess.Popen:
+    """Start the app with uvicorn and wait until /health answers"""
+    env = dict(os.environ)
+    if not args.keep_limits:
+        # Measure the server, not the limits meant to protect it from a single client
+        env["RATE_LIMIT_ENABLED"] = "false"
+        env["ADMISSION_ENABLED"] = "false"
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"
+    ]
+    print(f"🏁 bench_api: Starting {' '.join(command[2:])}", file=sys.stderr)
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise SystemExit("Server did not become healthy within 60s")
+
+async def run(args: argparse.Namespace) -> dict:
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        ctx = Context(client, args)
+        await ctx.setup()
+        results = {}
+        try:
+            for name in args.scenarios:
+                print(f"🏁 bench_api: {name} at {args.rate} req/s for {args.duration}s", file=sys.stderr)
+                results[name] = await run_scenario(ctx, name, args.rate, args.duration)
+        finally:
+            await ctx.teardown()
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "rate": args.rate,
+            "duration": args.duration,
+            "workers": args.workers,
+            "upload_mb": args.upload_mb,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "scenarios": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API and compare against a baseline")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of booting one")
+    parser.add_argument("--port", type=int, default=0, help="Port for the booted server (default: any free port)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the booted server")
+    parser.add_argument("--keep-limits", action="store_true", help="Leave rate limiting and admission control on")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--rate", type=float, default=20, help="Requests per second per scenario")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Cap on concurrent requests")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--upload-mb", type=float, default=1, help="Size of each uploaded file")
+    parser.add_argument("--download-mb", type=float, default=8, help="Size of the file downloaded with Range")
+    parser.add_argument("--range-kb", type=int, default=256, help="Bytes requested per Range download")
+    parser.add_argument("--max-skip", type=int, default=1000, help="Largest offset used by paginated_users")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for payloads and scenario choices")
+    parser.add_argument("--output", help="Write the results here as well as to stdout")
+    parser.add_argument("--baseline", help="Compare against this results file; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change before flagging")
+    parser.add_argument("--save-baseline", help="Write the results to this file as the new baseline")
+    args = parser.parse_args()
+
+    server = None
+    if not args.base_url:
+        args.port = args.port or _free_port()
+        args.base_url = f"http://127.0.0.1:{args.port}"
+        server = boot_server(args)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for upload file type classification
+"""
+
+import io
+import tarfile
+import timeit
+import zipfile
+from pathlib import Path
+from app.models.file import FileType
+from app.services.file_types import SNIFF_BYTES, classify
+
+def legacy_get_file_type(filename: str, mime_type: str) -> FileType:
+    """The extension/MIME chain classification used before content sniffing"""
+    extension = Path(filename).suffix.lower()
+    if extension in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'] or 'image/' in mime_type:
+        return FileType.IMAGE
+    elif extension in ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt'] or 'application/pdf' in mime_type or 'application/msword' in mime_type:
+        return FileType.DOCUMENT
+    elif extension in ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm'] or 'video/' in mime_type:
+        return FileType.VIDEO
+    elif extension in ['.mp3', '.wav', '.flac', '.aac', '.ogg'] or 'audio/' in mime_type:
+        return FileType.AUDIO
+    elif extension in ['.zip', '.rar', '.7z', '.tar', '.gz'] or 'application/zip' in mime_type:
+        return FileType.ARCHIVE
+    return FileType.OTHER
+
+def _tar_head() -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        info = tarfile.TarInfo("hello.txt")
+        info.size = 5
+        tar.addfile(info, io.BytesIO(b"hello"))
+    return buffer.getvalue()[:SNIFF_BYTES]
+
+def _zip_head() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("hello.txt", "hello")
+    return buffer.getvalue()[:SNIFF_BYTES]
+
+# (head, filename, client MIME type, expected type) - several deliberately mislabelled
+SAMPLES = [
+    (b"\x89PNG\r\n\x1a\n" + b"\0" * 64, "photo.png", "image/png", FileType.IMAGE),
+    (b"\xff\xd8\xff\xe0" + b"\0" * 64, "scan.bin", "application/octet-stream", FileType.IMAGE),
+    (b"%PDF-1.7\n" + b"\0" * 64, "report.pdf", "application/pdf", FileType.DOCUMENT),
+    (b"%PDF-1.4\n" + b"\0" * 64, "invoice", "text/plain", FileType.DOCUMENT),
+    (b"\0\0\0\x18ftypmp42" + b"\0" * 64, "clip.mov", "application/octet-stream", FileType.VIDEO),
+    (b"RIFF\0\0\0\0WAVEfmt " + b"\0" * 64, "voice.dat", "", FileType.AUDIO),
+    (_zip_head(), "photos.zip", "application/zip", FileType.ARCHIVE),
+    (_zip_head(), "letter.docx", "application/octet-stream", FileType.DOCUMENT),
+    (_tar_head(), "backup", "application/octet-stream", FileType.ARCHIVE),
+    (b"plain old text\n" * 8, "notes.txt", "text/plain", FileType.DOCUMENT),
+    (b"\0\1\2\3" * 16, "data.bin", "application/octet-stream", FileType.OTHER),
+]
+
+def main():
+    print("Accuracy (expected / content sniffing / legacy):")
+    for head, filename, mime, expected in SAMPLES:
+        sniffed = classify(head, filename, mime)[0]
+        legacy = legacy_get_file_type(filename, mime)
+        flag = "" if sniffed == expected else "  <-- MISMATCH"
+        print(f"  {filename:<14} {expected.value:<9} {sniffed.value:<9} {legacy.value:<9}{flag}")
+
+    number = 20000
+    calls = number * len(SAMPLES)
+    sniff_time = timeit.timeit(
+        lambda: [classify(head, filename, mime) for head, filename, mime, _ in SAMPLES], number=number
+    )
+    legacy_time = timeit.timeit(
+        lambda: [legacy_get_file_type(filename, mime) for _, filename, mime, _ in SAMPLES], number=number
+    )
+    print(f"\nclassify():             {sniff_time / calls * 1e6:.2f} µs/call")
+    print(f"legacy _get_file_type:  {legacy_time / calls * 1e6:.2f} µs/call")
+
+if __name__ == "__main__":
+    main()
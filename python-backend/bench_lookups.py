@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the per-request lookups on the auth and download paths
+
+Times get_user_by_email (every authenticated request), get_user_by_id (token
+refresh) and FileService.get_file_by_id (downloads) against the ORM Query
+versions they replaced, with the cache off so every call reaches the database.
+Reports process CPU time per call.
+
+    python bench_lookups.py                                    # seeded in-memory SQLite
+    python bench_lookups.py --database-url postgresql://...    # existing rows of a real database
+"""
+
+import argparse
+import os
+import sys
+import time
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Per-call CPU of the hot user and file lookups")
+    parser.add_argument("--database-url", default="sqlite://",
+                        help="Database to query; the default in-memory SQLite is created and seeded")
+    parser.add_argument("--number", type=int, default=20000, help="Calls per lookup")
+    return parser.parse_args()
+
+args = parse_args()
+# Both are read when the app is imported, so they have to be set first
+os.environ["DATABASE_URL"] = args.database_url
+os.environ["CACHE_ENABLED"] = "false"
+
+from sqlalchemy import func
+from app.core.database import Base, SessionLocal, engine
+from app.models.user import User, UserRole
+from app.models.file import File, FileType
+from app.services.file_service import FileService, ensure_file_partitions
+from app.services.user_service import get_user_by_email, get_user_by_id
+
+def legacy_get_user_by_email(db, email: str):
+    return db.query(User).filter(func.lower(User.email) == email.lower()).first()
+
+def legacy_get_user_by_id(db, user_id: int):
+    return db.query(User).filter(User.id == user_id).first()
+
+def legacy_get_file_by_id(db, tenant_id: int, file_id: int, user_id: int):
+    file = db.query(File).filter(File.id == file_id, File.tenant_id == tenant_id).first()
+    return file if file is not None and file.user_id == user_id else None
+
+def seed() -> None:
+    Base.metadata.create_all(bind=engine)
+    ensure_file_partitions()
+    db = SessionLocal()
+    try:
+        user = User(name="Bench User", email="bench@example.com", password="x", role=UserRole.user, is_active=1)
+        db.add(user)
+        db.flush()
+        db.add(File(
+            filename="bench.bin", original_filename="bench.bin", file_path="bench.bin", file_extension=".bin",
+            file_size=1, mime_type="application/octet-stream", file_type=FileType.OTHER, user_id=user.id,
+            tenant_id=user.tenant_id
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+def cpu_per_call(fn, number: int) -> float:
+    """Microseconds of process CPU per call"""
+    fn()  # The first call compiles the statement; only the steady state is of interest
+    started = time.process_time()
+    for _ in range(number):
+        fn()
+    return (time.process_time() - started) / number * 1e6
+
+def main():
+    if args.database_url == "sqlite://":
+        seed()
+    db = SessionLocal()
+    try:
+        file = db.query(File).order_by(File.id).first()
+        if file is None:
+            sys.exit("No files in this database; upload one or run generate_dataset.py first")
+        user = db.get(User, file.user_id)
+        service = FileService(db, file.tenant_id)
+
+        cases = [
+            ("get_user_by_email", lambda: legacy_get_user_by_email(db, user.email),
+             lambda: get_user_by_email(db, user.email)),
+            ("get_user_by_id", lambda: legacy_get_user_by_id(db, user.id),
+             lambda: get_user_by_id(db, user.id)),
+            ("get_file_by_id", lambda: legacy_get_file_by_id(db, file.tenant_id, file.id, user.id),
+             lambda: service.get_file_by_id(file.id, user.id)),
+        ]
+        print(f"{engine.dialect.name}, {args.number:,} calls each, µs of CPU per call:")
+        print(f"  {'lookup':<20} {'Query':>8} {'lambda':>8} {'saved':>8}")
+        for name, legacy, current in cases:
+            legacy_time = cpu_per_call(legacy, args.number)
+            current_time = cpu_per_call(current, args.number)
+            saved = (legacy_time - current_time) / legacy_time * 100
+            print(f"  {name:<20} {legacy_time:>8.1f} {current_time:>8.1f} {saved:>7.0f}%")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
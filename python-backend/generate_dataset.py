@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Synthetic scale dataset: bulk-loads users and files so queries can be measured at production size
+
+Rows are written with COPY over several connections in parallel. The data is
+deterministic for a given --seed: each chunk of ids draws from its own random
+generator, so the result doesn't depend on --workers or on which chunk finishes
+first. Every generated user's password is --password.
+
+    python generate_dataset.py --users 1000000 --files 50000000 --workers 8 --defer-indexes
+"""
+
+import argparse
+import csv
+import io
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from multiprocessing import Pool
+from pathlib import Path
+from typing import List, Optional, Tuple
+import psycopg2
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from app.core.config import DATABASE_URL, UPLOADS_DIR, DEFAULT_TENANT_ID
+from app.core.database import Base, SessionLocal, engine, ensure_extensions, ensure_indexes
+from app.core.passwords import hash_password
+from app.models.user import User, UserRole
+from app.models.file import File, FileType
+from app.services.analytics_service import backfill_rollups
+from app.services.file_service import ensure_file_partitions
+from app.services.usage_service import reconcile_usage
+
+FIRST_NAMES = [
+    "Aarav", "Aisha", "Alex", "Ana", "Ben", "Carlos", "Chen", "Chloe", "Daniel", "Elena", "Emma", "Fatima",
+    "Grace", "Hiro", "Ivan", "Jack", "Julia", "Kavya", "Liam", "Lucia", "Maya", "Mohammed", "Nina", "Noah",
+    "Olivia", "Omar", "Priya", "Rahul", "Sara", "Sofia", "Tom", "Wei", "Yuki", "Zara",
+]
+LAST_NAMES = [
+    "Ahmed", "Brown", "Chen", "Costa", "Dubois", "Garcia", "Gupta", "Ivanova", "Jones", "Kim", "Kowalski",
+    "Lee", "Martin", "Mehta", "Muller", "Nguyen", "Okafor", "Patel", "Rossi", "Sato", "Silva", "Singh",
+    "Smith", "Tanaka", "Wang", "Williams", "Yadav", "Zhang",
+]
+FILENAME_WORDS = [
+    "invoice", "report", "holiday", "scan", "contract", "meeting", "notes", "budget", "photo", "summary",
+    "presentation", "draft", "final", "backup", "recording", "lab", "results", "xray", "prescription", "receipt",
+]
+
+# file type: (share of files, median size in bytes, lognormal sigma, [(extension, mime type), ...])
+FILE_PROFILES = {
+    FileType.IMAGE: (0.40, 1_500_000, 1.0, [(".jpg", "image/jpeg"), (".png", "image/png"), (".webp", "image/webp")]),
+    FileType.DOCUMENT: (0.30, 200_000, 1.3, [
+        (".pdf", "application/pdf"), (".docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+        (".txt", "text/plain"),
+    ]),
+    FileType.VIDEO: (0.05, 50_000_000, 1.2, [(".mp4", "video/mp4"), (".mov", "video/quicktime")]),
+    FileType.AUDIO: (0.05, 5_000_000, 0.8, [(".mp3", "audio/mpeg"), (".wav", "audio/wav")]),
+    FileType.ARCHIVE: (0.05, 20_000_000, 1.5, [(".zip", "application/zip"), (".tar", "application/x-tar")]),
+    FileType.OTHER: (0.15, 100_000, 2.0, [(".bin", "application/octet-stream"), (".csv", "text/csv")]),
+}
+FILE_TYPES = list(FILE_PROFILES)
+FILE_TYPE_WEIGHTS = [FILE_PROFILES[file_type][0] for file_type in FILE_TYPES]
+MAX_FILE_SIZE = 2 ** 31 - 1  # files.file_size is an INTEGER
+
+USER_COLUMNS = "id, name, email, password, role, is_active, tenant_id, created_at, updated_at"
+FILE_COLUMNS = (
+    "id, tenant_id, filename, original_filename, file_type, file_extension, file_size, file_path, mime_type, "
+    "checksum, user_id, created_at, updated_at"
+)
+
+class Plan:
+    """Everything a worker needs to generate and load its chunk"""
+
+    def __init__(self, args: argparse.Namespace, first_user_id: int, first_file_id: int, password_hash: str):
+        self.dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.seed = args.seed
+        self.users = args.users
+        self.files = args.files
+        self.chunk_size = args.chunk_size
+        self.first_user_id = first_user_id
+        self.first_file_id = first_file_id
+        self.password_hash = password_hash
+        self.start = args.start_date
+        self.end = args.end_date
+        self.roles = [role for role, _ in args.roles]
+        self.role_weights = [weight for _, weight in args.roles]
+        self.active_ratio = args.active_ratio
+        self.user_skew = args.user_skew
+        self.tenants = args.tenants
+        self.blobs = args.blobs
+        self.uploads_dir = Path(UPLOADS_DIR)
+
+    def tenant_of(self, user_id: int) -> int:
+        return DEFAULT_TENANT_ID + (user_id - self.first_user_id) % self.tenants
+
+    def user_created_at(self, user_id: int) -> datetime:
+        # Users sign up in id order, at a rate that grows over time
+        position = (user_id - self.first_user_id + 1) / max(1, self.users)
+        return self.start + (self.end - self.start) * math.sqrt(position)
+
+_plan: Optional[Plan] = None
+
+def _init_worker(plan: Plan) -> None:
+    global _plan
+    _plan = plan
+
+def _user_rows(plan: Plan, chunk: int) -> List[tuple]:
+    rng = random.Random(f"{plan.seed}:users:{chunk}")
+    first = plan.first_user_id + chunk * plan.chunk_size
+    last = min(plan.first_user_id + plan.users, first + plan.chunk_size)
+    rows = []
+    for user_id in range(first, last):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = plan.user_created_at(user_id).isoformat()
+        rows.append((
+            user_id,
+            f"{first_name} {last_name}",
+            f"{first_name}.{last_name}.{user_id}@example.com".lower(),
+            plan.password_hash,
+            rng.choices(plan.roles, weights=plan.role_weights)[0].name,
+            1 if rng.random() < plan.active_ratio else 0,
+            plan.tenant_of(user_id),
+            created_at,
+            created_at,
+        ))
+    return rows
+
+def _file_rows(plan: Plan, chunk: int) -> List[tuple]:
+    rng = random.Random(f"{plan.seed}:files:{chunk}")
+    first = plan.first_file_id + chunk * plan.chunk_size
+    last = min(plan.first_file_id + plan.files, first + plan.chunk_size)
+    rows = []
+    for file_id in range(first, last):
+        # Heavy-tailed: a small share of users owns most of the files
+        user_id = plan.first_user_id + min(plan.users - 1, int(plan.users * rng.random() ** plan.user_skew))
+        file_type = rng.choices(FILE_TYPES, weights=FILE_TYPE_WEIGHTS)[0]
+        _, median, sigma, formats = FILE_PROFILES[file_type]
+        extension, mime_type = rng.choice(formats)
+        size = max(1, min(MAX_FILE_SIZE, int(rng.lognormvariate(math.log(median), sigma))))
+        stored = f"{uuid.UUID(int=rng.getrandbits(128), version=4)}{extension}"
+        original = f"{rng.choice(FILENAME_WORDS)}_{rng.choice(FILENAME_WORDS)}_{rng.randrange(10000)}{extension}"
+        user_created_at = plan.user_created_at(user_id)
+        # Uploads lean towards recent dates, and never predate the owner
+        created_at = user_created_at + (plan.end - user_created_at) * (1 - rng.random() ** 2)
+        rows.append((
+            file_id, plan.tenant_of(user_id), stored, original, file_type.name, extension, size,
+            f"user/{user_id}/{file_type.value}/{stored}", mime_type,
+            None, user_id, created_at.isoformat(), None,
+        ))
+    return rows
+
+def _copy(connection, table: str, columns: str, rows: List[tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)  # None becomes an empty unquoted field, which COPY reads as NULL
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def _write_blobs(plan: Plan, rows: List[tuple]) -> None:
+    """Sparse placeholder files of the recorded size: they take almost no disk space"""
+    names = [column.strip() for column in FILE_COLUMNS.split(",")]
+    for row in rows:
+        file = dict(zip(names, row))
+        path = plan.uploads_dir / file["file_path"]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as blob:
+            blob.truncate(file["file_size"])
+
+def _load_chunk(task: Tuple[str, int]) -> Tuple[str, int]:
+    table, chunk = task
+    rows = _user_rows(_plan, chunk) if table == "users" else _file_rows(_plan, chunk)
+    connection = psycopg2.connect(_plan.dsn)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SET synchronous_commit = off")
+        _copy(connection, table, USER_COLUMNS if table == "users" else FILE_COLUMNS, rows)
+        connection.commit()
+    finally:
+        connection.close()
+    if table == "files" and _plan.blobs:
+        _write_blobs(_plan, rows)
+    return table, len(rows)
+
+def _load(pool: Pool, table: str, total: int, chunk_size: int) -> None:
+    chunks = math.ceil(total / chunk_size)
+    started = time.monotonic()
+    loaded = 0
+    for _, rows in pool.imap_unordered(_load_chunk, [(table, chunk) for chunk in range(chunks)]):
+        loaded += rows
+        elapsed = time.monotonic() - started
+        print(f"🌱 generate_dataset: {table} {loaded:,}/{total:,} ({loaded / max(elapsed, 1e-9):,.0f} rows/s)")
+
+def _parse_roles(spec: str) -> List[Tuple[UserRole, float]]:
+    """'admin=0.001,tenant=0.05,user=0.949' -> [(UserRole.admin, 0.001), ...]"""
+    roles = []
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        roles.append((UserRole(name.strip()), float(weight)))
+    return roles
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a deterministic synthetic dataset (PostgreSQL)")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parallel COPY streams")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows per COPY")
+    parser.add_argument("--roles", type=_parse_roles, default="admin=0.001,tenant=0.05,user=0.949",
+                        help="Role weights, e.g. admin=0.001,tenant=0.05,user=0.949")
+    parser.add_argument("--tenants", type=int, default=1,
+                        help=f"Spread users round robin over this many tenants, from id {DEFAULT_TENANT_ID}")
+    parser.add_argument("--active-ratio", type=float, default=0.95, help="Share of users that are active")
+    parser.add_argument("--user-skew", type=float, default=2.0,
+                        help="How unevenly files are spread over users (1 = evenly)")
+    parser.add_argument("--start-date", type=_parse_date, default="2020-01-01")
+    parser.add_argument("--end-date", type=_parse_date, default=datetime.now(timezone.utc).date().isoformat())
+    parser.add_argument("--password", default="password123", help="Password of every generated user")
+    parser.add_argument("--blobs", action="store_true", help=f"Also write sparse placeholder files under {UPLOADS_DIR}/")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="Drop secondary indexes on users/files during the load and rebuild them after")
+    parser.add_argument("--skip-rollups", action="store_true", help="Don't rebuild usage counters and analytics rollups")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        sys.exit("generate_dataset.py loads with COPY and needs PostgreSQL")
+    if args.files and not args.users:
+        sys.exit("--files needs --users: files are spread over the users generated in the same run")
+
+    ensure_extensions()
+    Base.metadata.create_all(bind=engine)
+    ensure_file_partitions()
+    with engine.connect() as conn:
+        first_user_id = conn.execute(text("SELECT coalesce(max(id), 0) + 1 FROM users")).scalar()
+        first_file_id = conn.execute(text("SELECT coalesce(max(id), 0) + 1 FROM files")).scalar()
+    # Hashing is deliberately slow, so every generated user shares one hash
+    plan = Plan(args, first_user_id, first_file_id, hash_password(args.password))
+    print(f"🌱 generate_dataset: {args.users:,} users from id {first_user_id}, {args.files:,} files from id "
+          f"{first_file_id}, seed {args.seed}, {args.workers} streams")
+
+    tables = [User.__table__, File.__table__]
+    if args.defer_indexes:
+        for table in tables:
+            for index in table.indexes:
+                index.drop(bind=engine, checkfirst=True)
+        print("🌱 generate_dataset: Dropped secondary indexes on users and files")
+
+    started = time.monotonic()
+    with Pool(args.workers, initializer=_init_worker, initargs=(plan,)) as pool:
+        if args.users:
+            _load(pool, "users", args.users, args.chunk_size)
+        if args.files:
+            _load(pool, "files", args.files, args.chunk_size)
+    print(f"🌱 generate_dataset: Loaded in {time.monotonic() - started:.0f}s")
+
+    if args.defer_indexes:
+        print("🌱 generate_dataset: Rebuilding indexes...")
+        ensure_indexes()
+    with engine.begin() as conn:
+        # Ids were assigned here, not by the sequences; move them past the new rows.
+        # files.id isn't a serial column (it's half of the partitioned PK), so its sequence is looked up by name
+        for table in ("users", "files"):
+            conn.execute(text(
+                f"SELECT setval(coalesce(pg_get_serial_sequence('{table}', 'id'), '{table}_id_seq'), "
+                f"(SELECT coalesce(max(id), 1) FROM {table}))"
+            ))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE users"))
+        conn.execute(text("ANALYZE files"))
+
+    if not args.skip_rollups:
+        print("🌱 generate_dataset: Rebuilding usage counters and analytics rollups...")
+        db = SessionLocal()
+        try:
+            reconcile_usage(db)
+            backfill_rollups(db)
+        finally:
+            db.close()
+    print(f"✅ generate_dataset: Done in {time.monotonic() - started:.0f}s; every generated user's password is "
+          f"'{args.password}'")
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,32 @@ Database initialization script for Multi-Tenant Application
 import os
 import sys
 from sqlalchemy import create_engine, text
-from app.core.database import SessionLocal, Base, engine
+from app.core.database import SessionLocal, Base, engine, ensure_columns, ensure_extensions, ensure_indexes
 from app.models.user import User, UserRole
 from app.models.file import File
+from app.models.usage import StorageUsage
+from app.models.archive import ArchiveEntry
+from app.models.analytics import DailyUploadStat, DailySignupStat, DailyActiveUser, DailyActivityStat
+from app.models.audit import AuditEvent
+from app.models.report import RenderedReport
+from app.models.refresh_token import RefreshToken
+from app.models.collection_version import CollectionVersion
+from app.services.audit_log import maintain_partitions
+from app.services.file_service import ensure_file_partitions
 from app.services.user_service import hash_password
+from app.services.analytics_service import backfill_rollups
 
 def init_database():
     """Initialize the database with tables and sample data"""
     
     # Create all tables
     print("Creating database tables...")
+    ensure_extensions()
     Base.metadata.create_all(bind=engine)
+    ensure_columns()
+    ensure_file_partitions()
+    ensure_indexes()
+    maintain_partitions()
     print("✅ Database tables created successfully!")
     
     # Create database session
@@ -73,6 +88,9 @@ def init_database():
         
         # Commit all changes
         db.commit()
+        
+        # Fill analytics rollups for history that predates them
+        backfill_rollups(db)
         print("\n🎉 Database initialization completed successfully!")
         print("\nDefault users created:")
         print("  Admin:    admin@example.com / admin123")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Moves an existing database to tenant-keyed files while the app keeps running
+
+Adds tenant_id to users, files, archive_entries and rendered_reports (every
+existing row joins DEFAULT_TENANT_ID). On PostgreSQL it then moves files into a
+table hash-partitioned by tenant_id:
+
+    prepare  create files_partitioned and a trigger on files that mirrors every
+             insert, update and delete into it
+    copy     copy the existing rows across in id-ordered batches; re-runnable,
+             rows already copied are skipped
+    cutover  one short transaction: swap the tables' names and re-point the
+             foreign keys from archive_entries and rendered_reports at the new table
+
+    python partition_files.py                      # every step
+    python partition_files.py --step copy --start-id 20000000
+    python partition_files.py --step cutover --drop-old
+
+Run the columns step before deploying the new app, which expects the tenant_id
+columns to exist. The old app doesn't set tenant_id, so the columns keep their
+default until the cutover drops it; only run prepare, copy and cutover once no
+old app is left running. The default "all" is for an upgrade with the app stopped.
+"""
+
+import argparse
+import sys
+import time
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+from app.core.config import DEFAULT_TENANT_ID, FILES_PARTITIONS
+from app.core.database import engine
+from app.models.user import User
+from app.models.file import File
+
+TENANT_TABLES = ("users", "files", "archive_entries", "rendered_reports")
+# Tables whose foreign key to files(id) becomes one to files(id, tenant_id)
+CHILD_TABLES = ("archive_entries", "rendered_reports")
+NEW_TABLE = "files_partitioned"
+OLD_TABLE = "files_unpartitioned"
+MIRROR = "files_partition_mirror"
+COLUMNS = [column.name for column in File.__table__.columns]
+
+def _is_partitioned(conn) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'files' AND c.relnamespace = 'public'::regnamespace"
+    )).first() is not None
+
+def add_tenant_columns() -> None:
+    """
+    Add tenant_id wherever it's missing; with a constant default this doesn't rewrite
+    the tables. The default also lets the old app keep inserting rows until the cutover.
+    """
+    with engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        for table in TENANT_TABLES:
+            if table not in existing:
+                continue
+            if "tenant_id" in {column["name"] for column in inspect(conn).get_columns(table)}:
+                continue
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN tenant_id INTEGER NOT NULL DEFAULT {DEFAULT_TENANT_ID}"
+            ))
+            print(f"🗂️ partition_files: Added {table}.tenant_id")
+
+def prepare(partitions: int) -> None:
+    """Create the partitioned table and start mirroring writes into it"""
+    metadata = MetaData()
+    User.__table__.to_metadata(metadata)  # So the user_id foreign key resolves
+    new_table = File.__table__.to_metadata(metadata, name=NEW_TABLE)
+    with engine.begin() as conn:
+        if not inspect(conn).has_table(NEW_TABLE):
+            conn.execute(CreateTable(new_table))
+            for remainder in range(partitions):
+                conn.execute(text(
+                    f"CREATE TABLE files_p{remainder} PARTITION OF {NEW_TABLE} "
+                    f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+                ))
+            # Index names are per schema, so these carry a suffix until the cutover
+            for index in new_table.indexes:
+                # Auto-named indexes (index=True) were renamed after the new table; go back to the original name
+                index.name = f"{index.name.replace(NEW_TABLE, 'files')}_partitioned"
+                conn.execute(CreateIndex(index))
+            print(f"🗂️ partition_files: Created {NEW_TABLE} with {partitions} hash partitions")
+
+        columns = ", ".join(COLUMNS)
+        values = ", ".join(f"NEW.{column}" for column in COLUMNS)
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION {MIRROR}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP <> 'INSERT' THEN
+                    DELETE FROM {NEW_TABLE} WHERE id = OLD.id AND tenant_id = OLD.tenant_id;
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    INSERT INTO {NEW_TABLE} ({columns}) VALUES ({values});
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """))
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {MIRROR} ON files"))
+        conn.execute(text(
+            f"CREATE TRIGGER {MIRROR} AFTER INSERT OR UPDATE OR DELETE ON files "
+            f"FOR EACH ROW EXECUTE FUNCTION {MIRROR}()"
+        ))
+    print("🗂️ partition_files: Mirroring writes on files into the partitioned table")
+
+def copy_rows(start_id: int, batch_size: int, pause_seconds: float) -> None:
+    """
+    Copy existing rows in batches of ids. Each batch share-locks its source rows,
+    so a concurrent update or delete of one of them waits for the batch to commit
+    and its mirrored change then applies on top of the copy, never under it.
+    """
+    with engine.connect() as conn:
+        last_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM files")).scalar()
+    columns = ", ".join(COLUMNS)
+    copy = text(
+        f"WITH batch AS (SELECT {columns} FROM files WHERE id >= :lower AND id < :upper FOR SHARE) "
+        f"INSERT INTO {NEW_TABLE} ({columns}) SELECT {columns} FROM batch ON CONFLICT DO NOTHING"
+    )
+    started = time.monotonic()
+    copied = 0
+    lower = start_id
+    while lower <= last_id:
+        with engine.begin() as conn:
+            copied += conn.execute(copy, {"lower": lower, "upper": lower + batch_size}).rowcount
+        lower += batch_size
+        print(f"🗂️ partition_files: Copied up to id {min(lower - 1, last_id):,} of {last_id:,} ({copied:,} rows)")
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    print(f"🗂️ partition_files: Copy finished in {time.monotonic() - started:.0f}s")
+
+def _check_copy() -> None:
+    """Both tables must hold the same rows; the trigger keeps any one snapshot consistent"""
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        old = conn.execute(text("SELECT count(*) FROM files")).scalar()
+        new = conn.execute(text(f"SELECT count(*) FROM {NEW_TABLE}")).scalar()
+    if old != new:
+        sys.exit(f"files has {old:,} rows but {NEW_TABLE} has {new:,}; run --step copy first")
+
+def cutover(lock_timeout_seconds: float, drop_old: bool) -> None:
+    """
+    Swap the tables. Writes to files wait for at most the length of this one transaction.
+    The new app sets every row's tenant, so the tenant_id defaults go here too: the
+    partitioned table never had one, and archive_entries and rendered_reports lose theirs.
+    """
+    _check_copy()
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{int(lock_timeout_seconds * 1000)}ms'"))
+        conn.execute(text("LOCK TABLE files IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text(f"DROP TRIGGER {MIRROR} ON files"))
+        conn.execute(text(f"DROP FUNCTION {MIRROR}()"))
+
+        for child in CHILD_TABLES:
+            for (name,) in conn.execute(text(
+                "SELECT conname FROM pg_constraint WHERE contype = 'f' "
+                "AND conrelid = CAST(:child AS regclass) AND confrelid = 'files'::regclass"
+            ), {"child": child}):
+                conn.execute(text(f'ALTER TABLE {child} DROP CONSTRAINT "{name}"'))
+
+        old_pkey = conn.execute(text(
+            "SELECT conname FROM pg_constraint WHERE contype = 'p' AND conrelid = 'files'::regclass"
+        )).scalar()
+        conn.execute(text(f"ALTER TABLE files RENAME TO {OLD_TABLE}"))
+        conn.execute(text(f'ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT "{old_pkey}" TO {OLD_TABLE}_pkey'))
+        for index in File.__table__.indexes:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_unpartitioned"))
+            conn.execute(text(f"ALTER INDEX {index.name}_partitioned RENAME TO {index.name}"))
+        conn.execute(text(f"ALTER TABLE {NEW_TABLE} RENAME TO files"))
+        conn.execute(text(f"ALTER TABLE files RENAME CONSTRAINT {NEW_TABLE}_pkey TO files_pkey"))
+        # Otherwise dropping the old table would drop the sequence with it
+        conn.execute(text("ALTER SEQUENCE files_id_seq OWNED BY files.id"))
+
+        for child in CHILD_TABLES:
+            conn.execute(text(f"ALTER TABLE {child} ALTER COLUMN tenant_id DROP DEFAULT"))
+            conn.execute(text(
+                f"ALTER TABLE {child} ADD CONSTRAINT {child}_file_id_tenant_id_fkey "
+                f"FOREIGN KEY (file_id, tenant_id) REFERENCES files (id, tenant_id) ON DELETE CASCADE NOT VALID"
+            ))
+    print("🗂️ partition_files: files is now partitioned by tenant_id")
+
+    # Checking existing rows against the new keys doesn't block writes, so it happens after the swap
+    with engine.begin() as conn:
+        for child in CHILD_TABLES:
+            conn.execute(text(f"ALTER TABLE {child} VALIDATE CONSTRAINT {child}_file_id_tenant_id_fkey"))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE files"))
+        if drop_old:
+            conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+            print(f"🗂️ partition_files: Dropped {OLD_TABLE}")
+        else:
+            print(f"🗂️ partition_files: The old table is kept as {OLD_TABLE}; drop it once you're satisfied")
+
+def main():
+    parser = argparse.ArgumentParser(description="Add tenant_id and move files to a table partitioned by it")
+    parser.add_argument("--step", choices=["all", "columns", "prepare", "copy", "cutover"], default="all")
+    parser.add_argument("--partitions", type=int, default=FILES_PARTITIONS, help="Hash partitions to create")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Ids copied per transaction")
+    parser.add_argument("--start-id", type=int, default=1, help="Resume the copy from this id")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--lock-timeout", type=float, default=5.0,
+                        help="Give up the cutover rather than queue writes behind it for longer than this")
+    parser.add_argument("--drop-old", action="store_true", help="Drop the unpartitioned table after the cutover")
+    args = parser.parse_args()
+
+    if not inspect(engine).has_table("files"):
+        sys.exit("No files table: this is a fresh database, run init_db.py instead")
+
+    if args.step in ("all", "columns"):
+        add_tenant_columns()
+    if engine.dialect.name != "postgresql":
+        print(f"✅ partition_files: Done; {engine.dialect.name} has no partitioning, so files stays one table")
+        return
+    with engine.connect() as conn:
+        if _is_partitioned(conn):
+            print("✅ partition_files: files is already partitioned")
+            return
+
+    if args.step in ("all", "prepare"):
+        prepare(args.partitions)
+    if args.step in ("all", "copy"):
+        copy_rows(args.start_id, args.batch_size, args.pause)
+    if args.step in ("all", "cutover"):
+        cutover(args.lock_timeout, args.drop_old)
+    print("✅ partition_files: Done")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Storage scrubber: finds missing blobs, checksum drift and orphaned files
+"""
+
+import argparse
+import json
+import sys
+from app.core.config import (
+    SCRUB_BATCH_SIZE, SCRUB_WORKERS, SCRUB_MAX_BYTES_PER_SECOND, SCRUB_ORPHAN_GRACE_SECONDS
+)
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.models.file import File
+from app.services.storage_scrubber import StorageScrubber
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify uploaded files against the database")
+    parser.add_argument("--reclaim", action="store_true", help="Delete orphaned blobs")
+    parser.add_argument("--batch-size", type=int, default=SCRUB_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=SCRUB_WORKERS)
+    parser.add_argument("--max-mb-per-second", type=float, default=SCRUB_MAX_BYTES_PER_SECOND / (1024 * 1024),
+                        help="Read throughput cap (0 = unthrottled)")
+    parser.add_argument("--grace-seconds", type=int, default=SCRUB_ORPHAN_GRACE_SECONDS,
+                        help="Ignore blobs newer than this when looking for orphans")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = StorageScrubber(
+            db,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            max_bytes_per_second=int(args.max_mb_per_second * 1024 * 1024),
+            orphan_grace_seconds=args.grace_seconds,
+            reclaim_orphans=args.reclaim
+        ).run()
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+
+    problems = len(report.missing_blobs) + len(report.checksum_mismatches) + len(report.size_mismatches)
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test SQLite mode's read/write routing
+
+Logs in against a throwaway SQLite file with the cache off, then checks that an
+authenticated read (user lookup by email, file lookup by id, file list) never
+checks out the single writer connection, and so never waits behind it.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+directory = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{directory}/app.db"
+os.environ["UPLOADS_DIR"] = os.path.join(directory, "uploads")
+os.environ["CACHE_ENABLED"] = "false"  # Every lookup below must reach the database
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.core.database import engine, read_engine
+
+def main():
+    if engine is read_engine:
+        sys.exit("❌ Writer and reader are the same engine; is DATABASE_URL a SQLite file?")
+    writer_checkouts = []
+    event.listen(engine.pool, "checkout", lambda *args: writer_checkouts.append(time.monotonic()))
+
+    with TestClient(app) as client:
+        user = {"name": "Routing", "email": "routing@example.com", "password": "routing123", "role": "user"}
+        assert client.post("/api/v1/users/", json=user).status_code == 201
+        started = time.monotonic()
+        credentials = {"email": user["email"], "password": user["password"]}
+        response = client.post("/api/v1/users/authenticate", json=credentials)
+        login_seconds = time.monotonic() - started
+        assert response.status_code == 200, response.text
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        upload = client.post(
+            "/api/v1/files/upload", headers=headers, files={"file": ("a.txt", b"hello", "text/plain")}
+        )
+        assert upload.status_code == 200, upload.text
+        file_id = upload.json()["file"]["id"]
+        print(f"Login took {login_seconds:.2f}s")
+        assert login_seconds < 5, "login waited for the writer"
+
+        for path in ("/api/v1/files/", f"/api/v1/files/{file_id}", f"/api/v1/files/{file_id}/download"):
+            writer_checkouts.clear()
+            started = time.monotonic()
+            response = client.get(path, headers=headers)
+            elapsed = time.monotonic() - started
+            print(f"GET {path}: {response.status_code} in {elapsed:.2f}s, writer checkouts: {len(writer_checkouts)}")
+            assert response.status_code == 200, response.text
+            assert not writer_checkouts, f"GET {path} checked out the writer"
+
+    print("✅ Cache-missing authenticated reads stay off the writer")
+
+if __name__ == "__main__":
+    main()